@@ -0,0 +1,92 @@
+# benchmarks/bench_cold_start.py
+# Cold-start benchmark: fresh interpreters importing main.py and building AIManager.
+# Reports per-phase startup time, RSS and which provider SDKs got imported.
+#
+# Run from the repo root:
+#   python benchmarks/bench_cold_start.py [--runs 5] [--out cold-start.json]
+#
+# Provider keys come from the environment, so export e.g. GEMINI_API_KEY to measure
+# a Gemini-only setup.
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+# Modules that mean a provider SDK was imported
+SDK_MODULES = ["aisuite", "google.generativeai", "openai", "anthropic", "huggingface_hub"]
+
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, {here!r})
+from _offline import isolate, rss_mb
+isolate({{"LOG_LEVEL": "ERROR"}})
+rss_start = rss_mb()
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+from hangfm_bot.ai import AIManager
+ai = AIManager()
+t2 = time.perf_counter()
+from hangfm_bot.startup import STARTUP
+print(json.dumps({{
+    "import_main_ms": (t1 - t0) * 1000,
+    "phases_ms": {{name: secs * 1000 for name, secs in STARTUP.durations()}},
+    "ai_manager_init_ms": (t2 - t1) * 1000,
+    "rss_start_mb": rss_start,
+    "rss_mb": rss_mb(),
+    "models": ai.valid_models,
+    "sdks_imported": [m for m in {sdks!r} if m in sys.modules],
+}}))
+"""
+
+
+def run_once() -> dict:
+    code = CHILD.format(here=str(HERE), sdks=SDK_MODULES)
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=120)
+    if proc.returncode != 0:
+        raise SystemExit(f"Child failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+
+    def median(key):
+        return round(statistics.median(r[key] for r in runs), 1)
+
+    phases = {}
+    for name in runs[0]["phases_ms"]:
+        phases[name] = round(statistics.median(r["phases_ms"].get(name, 0.0) for r in runs), 1)
+
+    result = {
+        "benchmark": "cold_start",
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "results": {
+            "import_main_ms": median("import_main_ms"),
+            "phases_ms": phases,
+            "ai_manager_init_ms": median("ai_manager_init_ms"),
+            "rss_mb": median("rss_mb"),
+            "rss_growth_mb": round(statistics.median(r["rss_mb"] - r["rss_start_mb"] for r in runs), 1),
+            "models": runs[0]["models"],
+            "sdks_imported": runs[0]["sdks_imported"],
+        },
+    }
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.out:
+        args.out.write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
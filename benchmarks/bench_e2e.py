@@ -0,0 +1,346 @@
+# benchmarks/bench_e2e.py
+# End-to-end benchmark: runs the real main() wiring against local fakes of the Node relay,
+# the CometChat REST API and an OpenAI-compatible AI provider, then measures event
+# throughput, command round trips, chat-poll round trips, AI reply latency and RSS.
+#
+# Run from the repo root:
+#   python benchmarks/bench_e2e.py --out bench-results.json
+#   python benchmarks/bench_e2e.py --ai-latency-ms 800 --error-rate 0.05
+#
+# Compare two runs by diffing their JSON (results.* are the numbers to watch).
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from _offline import REPO_ROOT, isolate, percentile, rss_mb
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class FakeServices:
+    """
+    One aiohttp app standing in for everything the bot talks to:
+      relay:      POST /send, GET /roomstate (posts a roomStateUpdated back like relay.js), GET /health
+      CometChat:  POST /v3.0/messages, GET /v3/groups/{id}/messages, GET /v3/users/{uid}
+      AI:         POST /v1/chat/completions (OpenAI-compatible)
+    """
+
+    def __init__(self, port: int, webhook: str, latency: float, error_rate: float, ai_latency: float, ai_error_rate: float, seed: int = 1):
+        from aiohttp import web
+
+        self.port = port
+        self.webhook = webhook
+        self.latency = latency
+        self.error_rate = error_rate
+        self.ai_latency = ai_latency
+        self.ai_error_rate = ai_error_rate
+        self.rng = random.Random(seed)
+        self.sent = asyncio.Queue()  # (time, text) of every message the bot posted
+        self.feed = []  # Chat messages served to the bot's poller, oldest first
+        self.next_id = 1000
+        self.counts = {"send": 0, "roomstate": 0, "messages_post": 0, "messages_get": 0, "ai": 0, "errors": 0}
+        self.session = None
+
+        app = web.Application()
+        app.router.add_post("/send", self.relay_send)
+        app.router.add_get("/roomstate", self.relay_roomstate)
+        app.router.add_get("/health", self.relay_health)
+        app.router.add_post("/v3.0/messages", self.chat_post)
+        app.router.add_get("/v3/groups/{group}/messages", self.chat_get)
+        app.router.add_get("/v3/users/{uid}", self.chat_user)
+        app.router.add_post("/v1/chat/completions", self.ai_complete)
+        self.app = app
+        self.web = web
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self):
+        import aiohttp
+
+        self.session = aiohttp.ClientSession()
+        self.runner = self.web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await self.web.TCPSite(self.runner, "127.0.0.1", self.port).start()
+
+    async def stop(self):
+        await self.session.close()
+        await self.runner.cleanup()
+
+    async def _delay(self, latency: float, error_rate: float) -> bool:
+        """Simulated service time; False means this request should fail"""
+        if latency:
+            await asyncio.sleep(latency * self.rng.uniform(0.8, 1.2))
+        if error_rate and self.rng.random() < error_rate:
+            self.counts["errors"] += 1
+            return False
+        return True
+
+    # relay
+    async def relay_send(self, request):
+        self.counts["send"] += 1
+        body = await request.json()
+        if not await self._delay(self.latency, self.error_rate):
+            return self.web.json_response({"ok": False, "error": "socket not connected"}, status=503)
+        return self.web.json_response({"ok": True, "ack": {"event": body.get("event")}} if body.get("expectAck") else {"ok": True})
+
+    async def relay_roomstate(self, request):
+        self.counts["roomstate"] += 1
+        await self._delay(self.latency, 0)
+        state = {"currentSong": {"artistName": "Slowdive", "trackName": "Alison", "djName": "Listener1"}, "djs": [{"name": "Listener1"}, {"name": "Listener2"}], "users": [{"name": f"Listener{i}"} for i in range(20)]}
+        async with self.session.post(self.webhook, json={"event": "roomStateUpdated", "payload": state}) as resp:
+            return self.web.json_response({"ok": resp.status == 200, "forwarded": True})
+
+    async def relay_health(self, request):
+        return self.web.json_response({"ok": True, "socketConnected": True})
+
+    # CometChat
+    async def chat_post(self, request):
+        self.counts["messages_post"] += 1
+        body = await request.json()
+        if not await self._delay(self.latency, self.error_rate):
+            return self.web.json_response({"error": "fake failure"}, status=500)
+        self.sent.put_nowait((time.perf_counter(), (body.get("data") or {}).get("text", "")))
+        return self.web.json_response({"data": {"id": str(self.next_id)}})
+
+    async def chat_get(self, request):
+        self.counts["messages_get"] += 1
+        await self._delay(self.latency, 0)
+        limit = int(request.query.get("limit", "10"))
+        return self.web.json_response({"data": list(reversed(self.feed[-limit:]))})  # newest first, like the real API
+
+    async def chat_user(self, request):
+        return self.web.json_response({"data": {"uid": request.match_info["uid"], "status": "online"}})
+
+    def add_chat(self, uid: str, name: str, text: str):
+        self.next_id += 1
+        self.feed.append({"id": str(self.next_id), "type": "text", "sender": {"uid": uid, "name": name}, "data": {"text": text}})
+
+    # AI
+    async def ai_complete(self, request):
+        self.counts["ai"] += 1
+        await request.json()
+        if not await self._delay(self.ai_latency, self.ai_error_rate):
+            return self.web.json_response({"error": {"message": "fake overload"}}, status=529)
+        return self.web.json_response({
+            "id": "bench", "object": "chat.completion", "created": int(time.time()), "model": "bench",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "fake reply"}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3},
+        })
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ""
+
+
+async def run(args) -> dict:
+    import aiohttp
+
+    fake_port, bot_port = free_port(), free_port()
+    isolate({
+        "LOG_LEVEL": "WARNING",
+        "RELAY_URL": f"http://127.0.0.1:{fake_port}",
+        "RELAY_RECEIVER_PORT": str(bot_port),
+        "COMETCHAT_BASE_URL": f"http://127.0.0.1:{fake_port}",
+        "HTTP_POLL_INTERVAL_MS": str(args.poll_ms),
+        "METADATA_SOURCES": "",
+        "SPOTIFY_CLIENT_ID": "",
+        "SPOTIFY_CLIENT_SECRET": "",
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+        # Synthetic listeners chat far faster than people - measure the pipeline, not the flood limits
+        "FLOOD_USER_MESSAGES": "0",
+        "FLOOD_AI_LIMIT": "0",
+        "FLOOD_ROOM_ACTIONS": "0",
+    })
+
+    fake = FakeServices(
+        fake_port, f"http://127.0.0.1:{bot_port}/events",
+        args.latency_ms / 1000, args.error_rate, args.ai_latency_ms / 1000, args.ai_error_rate,
+    )
+    await fake.start()
+
+    rss_before = rss_mb()
+    boot_started = time.perf_counter()
+    import main as bot
+    from hangfm_bot import __version__, metrics
+
+    bot_task = asyncio.create_task(bot.main())
+    events_url = f"http://127.0.0.1:{bot_port}/events"
+    session = aiohttp.ClientSession()
+
+    # Boot: wait for the webhook to answer
+    while True:
+        if bot_task.done():
+            bot_task.result()
+        try:
+            async with session.get(f"http://127.0.0.1:{bot_port}/metrics") as resp:
+                if resp.status == 200:
+                    break
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.02)
+    boot_sec = time.perf_counter() - boot_started
+    await asyncio.sleep(0.5)  # let the greeting and room state settle
+    rss_booted = rss_mb()
+
+    def events_done() -> int:
+        return sum(child.count for _, child in metrics.EVENT_SECONDS.children())
+
+    def drain():
+        while not fake.sent.empty():
+            fake.sent.get_nowait()
+
+    async def wait_reply(timeout: float = 10.0):
+        try:
+            return await asyncio.wait_for(fake.sent.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    # 1. Event throughput through POST /events (what relay.js does)
+    rng = random.Random(2)
+    def relay_event(i):
+        roll = rng.random()
+        if roll < 0.4:
+            return {"event": "playedSong", "payload": {"artistName": f"Artist {rng.randint(1, 300)}", "trackName": f"Track {i}", "djName": f"Listener{rng.randint(1, 5)}"}}
+        if roll < 0.7:
+            return {"event": "statefulMessage", "payload": {"text": "great tune", "sender": {"uid": f"user-{i % 40}", "name": f"Listener{i % 40}"}}}
+        return {"event": rng.choice(["userJoined", "userLeft", "addedDj", "removedDj"]), "payload": {"name": f"Listener{i % 40}"}}
+
+    baseline = events_done()
+    payloads = [relay_event(i) for i in range(args.events)]
+    started = time.perf_counter()
+
+    async def post_all(chunk):
+        for body in chunk:
+            async with session.post(events_url, json=body) as resp:
+                await resp.read()
+
+    await asyncio.gather(*(post_all(payloads[i::args.concurrency]) for i in range(args.concurrency)))
+    while events_done() - baseline < args.events:
+        await asyncio.sleep(0.005)
+    throughput_sec = time.perf_counter() - started
+
+    # 2. Command round trip: relay event in -> CometChat reply out
+    async def probe(send, count):
+        latencies, failures = [], 0
+        for _ in range(count):
+            drain()
+            t0 = time.perf_counter()
+            await send()
+            reply = await wait_reply()
+            if reply is None:
+                failures += 1
+            else:
+                latencies.append(reply[0] - t0)
+        return latencies, failures
+
+    async def relay_command():
+        async with session.post(events_url, json={"event": "statefulMessage", "payload": {"text": "/uptime", "sender": {"uid": "user-1", "name": "Listener1"}}}) as resp:
+            await resp.read()
+
+    async def polled_command():
+        fake.add_chat("user-2", "Listener2", "/uptime")
+
+    async def ai_mention():
+        async with session.post(events_url, json={"event": "statefulMessage", "payload": {"text": "hey bot what's this track", "sender": {"uid": "user-3", "name": "Listener3"}}}) as resp:
+            await resp.read()
+
+    command_lat, command_fail = await probe(relay_command, args.probes)
+    poll_lat, poll_fail = await probe(polled_command, args.probes)
+    ai_lat, ai_fail = await probe(ai_mention, args.probes)
+    rss_end = rss_mb()
+
+    await session.close()
+    bot_task.cancel()
+    try:
+        await bot_task
+    except (asyncio.CancelledError, SystemExit):
+        pass
+    await fake.stop()
+
+    def summary(latencies, failures):
+        return {
+            "count": len(latencies),
+            "failures": failures,
+            **{f"p{int(q * 100)}_ms": round(percentile(latencies, q) * 1000, 2) for q in (0.5, 0.95, 0.99)},
+            "max_ms": round(max(latencies) * 1000, 2) if latencies else None,
+        }
+
+    ai_models = []
+    try:
+        from hangfm_bot.ai import AIManager
+        ai_models = AIManager().get_available_providers()
+    except Exception:
+        pass
+
+    return {
+        "benchmark": "e2e",
+        "version": __version__,
+        "git_rev": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "config": {
+            "events": args.events,
+            "concurrency": args.concurrency,
+            "probes": args.probes,
+            "poll_ms": args.poll_ms,
+            "latency_ms": args.latency_ms,
+            "error_rate": args.error_rate,
+            "ai_latency_ms": args.ai_latency_ms,
+            "ai_error_rate": args.ai_error_rate,
+            # Without a provider SDK installed the bot answers "AI system not configured" locally
+            "ai_backend": "fake-openai" if ai_models else "none (no provider SDK installed)",
+        },
+        "results": {
+            "boot_sec": round(boot_sec, 3),
+            "events_per_sec": round(args.events / throughput_sec, 1),
+            "command_rtt": summary(command_lat, command_fail),
+            "chat_poll_rtt": summary(poll_lat, poll_fail),
+            "ai_reply": summary(ai_lat, ai_fail),
+            "rss_mb": {"before": round(rss_before, 1), "booted": round(rss_booted, 1), "end": round(rss_end, 1)},
+            "fake_requests": fake.counts,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end bot benchmark against local fakes")
+    parser.add_argument("--events", type=int, default=2000, help="relay events to push for the throughput run")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel relay connections for the throughput run")
+    parser.add_argument("--probes", type=int, default=20, help="round trips per latency measurement")
+    parser.add_argument("--poll-ms", type=int, default=100, help="bot's CometChat poll interval")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="fake relay/CometChat latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of relay/CometChat requests that fail")
+    parser.add_argument("--ai-latency-ms", type=float, default=300.0, help="fake AI provider latency")
+    parser.add_argument("--ai-error-rate", type=float, default=0.0, help="fraction of AI requests that fail")
+    parser.add_argument("--out", type=Path, help="write JSON results here (default: stdout only)")
+    args = parser.parse_args()
+
+    out = args.out.resolve() if args.out else None
+    result = asyncio.run(run(args))
+    text = json.dumps(result, indent=2)
+    print(text)
+    if out:
+        out.write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
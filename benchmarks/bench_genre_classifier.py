@@ -0,0 +1,104 @@
+# benchmarks/bench_genre_classifier.py
+# Compare the compiled/memoized GenreClassifier against the original per-call implementation.
+#
+# Run from the repo root:
+#   python benchmarks/bench_genre_classifier.py [num_songs]
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from hangfm_bot.music.genre_classifier import GenreClassifier
+
+
+class LegacyGenreClassifier(GenreClassifier):
+    """The pre-compilation implementation, kept here only as a baseline"""
+
+    def is_alt_hip_hop_subgenre(self, subgenre):
+        if not subgenre or not isinstance(subgenre, str):
+            return False
+        normalized = subgenre.lower().strip()
+        return any(sg.lower() in normalized for sg in self.ALT_HIP_HOP_SUBGENRES)
+
+    def is_alt_rock_subgenre(self, subgenre):
+        if not subgenre or not isinstance(subgenre, str):
+            return False
+        normalized = subgenre.lower().strip()
+        return any(sg.lower() in normalized for sg in self.ALT_ROCK_SUBGENRES)
+
+    def is_nu_metal_subgenre(self, subgenre):
+        if not subgenre or not isinstance(subgenre, str):
+            return False
+        normalized = subgenre.lower().strip()
+        return 'nu-metal' in normalized or 'nu metal' in normalized or 'nü-metal' in normalized
+
+    def filter_to_target_genres(self, genres, subgenres):
+        target_genres = set()
+        target_subgenres = set()
+        for genre in genres:
+            normalized = genre.lower().strip()
+            if 'alternative hip hop' in normalized or 'alt hip hop' in normalized:
+                target_genres.add('Alternative Hip Hop')
+            elif 'alternative rock' in normalized or 'alt rock' in normalized:
+                target_genres.add('Alternative Rock')
+            elif 'alternative metal' in normalized or 'alt metal' in normalized:
+                if any(self.is_nu_metal_subgenre(sg) for sg in subgenres):
+                    target_genres.add('Alternative Metal')
+        for subgenre in subgenres:
+            if self.is_alt_hip_hop_subgenre(subgenre):
+                target_subgenres.add(subgenre)
+            elif self.is_alt_rock_subgenre(subgenre):
+                target_subgenres.add(subgenre)
+            elif self.is_nu_metal_subgenre(subgenre):
+                target_subgenres.add('Nu-Metal')
+        return target_genres, target_subgenres
+
+
+GENRES = [
+    'Alternative Rock', 'Alternative Hip Hop', 'Alternative Metal', 'Rock', 'Hip Hop',
+    'Electronic', 'Pop', 'Jazz', 'Alt Rock', 'Folk, World, & Country',
+]
+SUBGENRES = sorted(
+    GenreClassifier.ALT_HIP_HOP_SUBGENRES | GenreClassifier.ALT_ROCK_SUBGENRES | GenreClassifier.EXCLUDED_ALT_METAL
+) + ['Nu Metal', 'Nu-Metal', 'House', 'Techno', 'Synth-pop', 'Hardcore', 'Soul', 'Ambient']
+
+
+def make_history(n, seed=1):
+    rng = random.Random(seed)
+    return [
+        (rng.sample(GENRES, rng.randint(1, 3)), rng.sample(SUBGENRES, rng.randint(0, 5)))
+        for _ in range(n)
+    ]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    history = make_history(n)
+
+    legacy = LegacyGenreClassifier()
+    compiled = GenreClassifier()
+
+    expected, t_legacy = timed(lambda: [legacy.filter_to_target_genres(g, s) for g, s in history])
+    per_call, t_compiled = timed(lambda: [compiled.filter_to_target_genres(g, s) for g, s in history])
+    batch = compiled.classify_batch(history)
+
+    assert per_call == expected, "compiled classifier disagrees with legacy implementation"
+    assert batch == expected, "batch classifier disagrees with legacy implementation"
+
+    print(f"songs: {n}")
+    print(f"legacy   filter_to_target_genres: {t_legacy * 1000:8.1f} ms")
+    print(f"compiled filter_to_target_genres: {t_compiled * 1000:8.1f} ms  ({t_legacy / t_compiled:.1f}x)")
+    print(f"memo: {compiled.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
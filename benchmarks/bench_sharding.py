@@ -0,0 +1,170 @@
+# benchmarks/bench_sharding.py
+# Multi-process benchmark: the shard supervisor with N worker processes serving M fake rooms
+# against the local relay/CometChat fakes. Measures time until every room is served, command
+# round trips through the supervisor, and how long a SIGKILLed worker's rooms take to be
+# re-homed, answer again, and move back once the worker restarts.
+#
+# Run from the repo root:
+#   python benchmarks/bench_sharding.py --workers 3 --rooms 24 --out shard-results.json
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from _offline import isolate, percentile
+from bench_e2e import FakeServices, free_port
+
+
+class RoomFakeServices(FakeServices):
+    """FakeServices that also remembers which room each chat message went to"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replies = asyncio.Queue()  # (time, room)
+
+    async def chat_post(self, request):
+        body = await request.json()
+        self.replies.put_nowait((time.perf_counter(), body.get("receiver")))
+        return self.web.json_response({"data": {"id": "1"}})
+
+
+async def wait_for(predicate, timeout: float, interval: float = 0.05) -> float:
+    started = time.perf_counter()
+    while not predicate():
+        if time.perf_counter() - started > timeout:
+            raise TimeoutError("condition not met")
+        await asyncio.sleep(interval)
+    return time.perf_counter() - started
+
+
+async def run(args) -> dict:
+    import aiohttp
+
+    fake_port, front_port = free_port(), free_port()
+    rooms = [f"fake-room-{i:03d}" for i in range(args.rooms)]
+    isolate({
+        "LOG_LEVEL": "WARNING",
+        "ROOM_UUID": rooms[0],
+        "RELAY_URL": f"http://127.0.0.1:{fake_port}",
+        "COMETCHAT_BASE_URL": f"http://127.0.0.1:{fake_port}",
+        "HTTP_POLL_INTERVAL_MS": str(args.poll_ms),
+        "METADATA_SOURCES": "",
+        "SPOTIFY_CLIENT_ID": "",
+        "SPOTIFY_CLIENT_SECRET": "",
+    })
+
+    from hangfm_bot.log_pipeline import setup_logging
+    from hangfm_bot.shared_store import open_store
+    from hangfm_bot.sharding import Supervisor
+
+    setup_logging(30)
+    fake = RoomFakeServices(fake_port, f"http://127.0.0.1:{front_port}/events", args.latency_ms / 1000, 0.0, 0.0, 0.0)
+    await fake.start()
+
+    # Worker ports from a fresh range so parallel runs don't collide
+    supervisor = Supervisor(
+        [(room, fake.url) for room in rooms], args.workers, open_store("shared_store.db"), front_port,
+        worker_port_base=free_port() + 1000, heartbeat_timeout=args.heartbeat_timeout,
+    )
+    sup_task = asyncio.create_task(supervisor.run(check_interval=0.1))
+    session = aiohttp.ClientSession()
+
+    def served() -> int:
+        beats = supervisor.store.items("workers")
+        return sum(beats.get(w, {}).get("rooms", 0) for w in supervisor.workers if supervisor.workers[w].live)
+
+    all_served_sec = await wait_for(lambda: served() == len(rooms), timeout=60)
+
+    async def command_rtt(room: str, timeout: float = 10.0) -> float:
+        while not fake.replies.empty():
+            fake.replies.get_nowait()
+        sent = time.perf_counter()
+        payload = {"event": "statelessMessage", "room": room, "payload": {"text": "/uptime", "sender": {"uid": "bench-user", "name": "bench"}}}
+        async with session.post(f"http://127.0.0.1:{front_port}/events", json=payload) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"front door returned {resp.status}")
+        deadline = sent + timeout
+        while True:
+            at, to = await asyncio.wait_for(fake.replies.get(), timeout=max(0.01, deadline - time.perf_counter()))
+            if to == room:
+                return at - sent
+
+    rtts = [await command_rtt(room) for room in rooms]
+
+    # Crash the worker with the most rooms
+    victim_id = max(supervisor.workers, key=lambda w: sum(1 for owner in supervisor.owner.values() if owner == w))
+    victim = supervisor.workers[victim_id]
+    moved = [room for room, owner in supervisor.owner.items() if owner == victim_id]
+    killed_at = time.perf_counter()
+    victim.proc.kill()
+
+    await wait_for(lambda: not victim.live, timeout=30)
+    await wait_for(lambda: served() == len(rooms), timeout=60)
+    rehome_sec = time.perf_counter() - killed_at  # Includes up to one heartbeat interval of reporting lag
+    first_reply = await command_rtt(moved[0])
+    answer_sec = time.perf_counter() - killed_at
+
+    await wait_for(lambda: victim.live, timeout=60)
+    await wait_for(lambda: served() == len(rooms) and supervisor.store.items("workers").get(victim_id, {}).get("rooms") == len(moved), timeout=60)
+    rejoin_sec = time.perf_counter() - killed_at
+    rtts_after = [await command_rtt(room) for room in moved]
+
+    supervisor._stopping = True
+    await sup_task
+    await session.close()
+    await fake.stop()
+
+    def summary(values):
+        return {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 0.5) * 1000, 2),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+            "max_ms": round(max(values) * 1000, 2) if values else 0.0,
+        }
+
+    return {
+        "benchmark": "sharding",
+        "python": sys.version.split()[0],
+        "config": {"workers": args.workers, "rooms": args.rooms, "poll_ms": args.poll_ms, "latency_ms": args.latency_ms, "heartbeat_timeout": args.heartbeat_timeout},
+        "results": {
+            "all_rooms_served_sec": round(all_served_sec, 2),
+            "command_rtt": summary(rtts),
+            "crash": {
+                "worker": victim_id,
+                "rooms_moved": len(moved),
+                "rehomed_sec": round(rehome_sec, 2),
+                "first_answer_sec": round(answer_sec, 2),
+                "worker_back_with_rooms_sec": round(rejoin_sec, 2),
+                "first_reply_ms": round(first_reply * 1000, 2),
+                "command_rtt_after_rejoin": summary(rtts_after),
+            },
+            "assignment": {w: sum(1 for owner in supervisor.owner.values() if owner == w) for w in supervisor.workers},
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shard supervisor benchmark against local fakes")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--rooms", type=int, default=24)
+    parser.add_argument("--poll-ms", type=int, default=1000, help="each room's CometChat poll interval")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="fake relay/CometChat latency")
+    parser.add_argument("--heartbeat-timeout", type=float, default=15.0)
+    parser.add_argument("--out", type=Path, help="write JSON results here (default: stdout only)")
+    args = parser.parse_args()
+
+    out = args.out.resolve() if args.out else None
+    result = asyncio.run(run(args))
+    text = json.dumps(result, indent=2)
+    print(text)
+    if out:
+        out.write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
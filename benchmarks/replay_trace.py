@@ -0,0 +1,205 @@
+# benchmarks/replay_trace.py
+# Replay a recorded event trace (TRACE_FILE) through process_queue_item, fully offline.
+# CometChat and the AI provider are stubs with configurable latency; everything else
+# (queue, command handler, filters, user memory, play history, taste profiles) is real.
+#
+# Run from the repo root:
+#   python benchmarks/replay_trace.py traces/room.jsonl.gz              # real time
+#   python benchmarks/replay_trace.py traces/room.jsonl.gz --speed 20   # 20x accelerated
+#   python benchmarks/replay_trace.py traces/room.jsonl.gz --speed max  # as fast as possible
+#   python benchmarks/replay_trace.py --synthesize 5000 traces/synthetic.jsonl.gz
+
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import sys
+import time
+import tracemalloc
+from collections import deque
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from _offline import isolate, percentile, rss_mb
+
+
+class StubCometChat:
+    """Stands in for CometChatManager - counts sends instead of posting them"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.sent = 0
+
+    async def send_message(self, text: str) -> bool:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent += 1
+        return True
+
+    async def close(self):
+        pass
+
+
+class StubAIManager:
+    """Stands in for AIManager - same context handling, canned replies after `latency` seconds"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.room_context = {}
+        self.calls = 0
+
+    def update_room_context(self, context: dict):
+        self.room_context.update(context)
+
+    async def generate_response(self, message, user_role="user", context=None, provider=None, user_uuid=None, sentiment_prompt=None):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return "stub reply"
+
+
+def synthesize(path: Path, count: int, rate: float = 5.0, seed: int = 1):
+    """Write a synthetic trace: chat, commands, AI mentions, song plays and stage churn"""
+    rng = random.Random(seed)
+    users = [(f"user-{i}", f"Listener{i}") for i in range(40)]
+    artists = [f"Artist {i}" for i in range(300)]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    t = 0.0
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"trace": 1, "started": time.time(), "synthetic": True}) + "\n")
+        for _ in range(count):
+            t += rng.expovariate(rate)
+            uid, name = rng.choice(users)
+            roll = rng.random()
+            if roll < 0.55:
+                event = ("chatMessage", {"text": rng.choice(["nice track", "lol", "this slaps", "who is this?", "great set"]), "sender": {"uid": uid, "name": name}})
+            elif roll < 0.7:
+                event = ("chatMessage", {"text": rng.choice(["/uptime", "/commands", "/stats", "/discover rock"]), "sender": {"uid": uid, "name": name}})
+            elif roll < 0.8:
+                event = ("statefulMessage", {"text": "hey bot what do you think of this one", "sender": {"uid": uid, "name": name}})
+            elif roll < 0.9:
+                event = ("playedSong", {"artistName": rng.choice(artists), "trackName": f"Track {rng.randint(1, 50)}", "djName": name, "djUuid": uid})
+            else:
+                event = (rng.choice(["userJoined", "userLeft", "addedDj", "removedDj"]), {"name": name})
+            f.write(json.dumps({"t": round(t, 6), "e": event[0], "p": event[1]}, separators=(",", ":")) + "\n")
+    print(f"Wrote {count} synthetic events ({t:.0f}s of room time) to {path}")
+
+
+async def replay(trace_path: Path, speed: float, ai_latency: float, send_latency: float, trace_memory: bool) -> dict:
+    import main as bot
+    from hangfm_bot.handlers import CommandHandler
+    from hangfm_bot.message_queue import MessageQueue
+    from hangfm_bot.music import RecentlyPlayed, TasteProfiles
+    from hangfm_bot.permissions import PermissionsManager
+    from hangfm_bot.play_history import PlayHistory
+    from hangfm_bot.rooms import RoomMusic, SharedServices
+    from hangfm_bot.trace import read_trace
+    from hangfm_bot.user_memory import UserMemory
+    from hangfm_bot.utils import ContentFilter, RoleChecker
+
+    events = list(read_trace(trace_path))
+    if not events:
+        raise SystemExit(f"No events in {trace_path}")
+
+    cometchat = StubCometChat(send_latency)
+    ai_manager = StubAIManager(ai_latency)
+    command_handler = CommandHandler(RoleChecker(PermissionsManager()))
+
+    async def uptime_cmd(user_uuid, argline, user_nickname):
+        return "⏱️ replaying"
+
+    command_handler.register("uptime", uptime_cmd)
+    # Stands in for a RoomRuntime: only the attributes process_queue_item reads
+    room = SimpleNamespace(
+        ai=ai_manager,
+        platform=cometchat,
+        stage=None,
+        room_uuid="",
+        music=RoomMusic(PlayHistory(), RecentlyPlayed(), TasteProfiles()),
+    )
+    services = SharedServices(command_handler, ContentFilter(), UserMemory())
+    queue = MessageQueue(maxsize=200)
+    arrivals = deque()  # Single consumer, FIFO queue: arrival times line up with get() order
+    latencies = []
+
+    if trace_memory:
+        tracemalloc.start()
+    rss_start = rss_mb()
+
+    async def produce():
+        start = time.perf_counter()
+        for offset, event_type, payload in events:
+            if speed:
+                delay = start + offset / speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            arrivals.append(time.perf_counter())
+            await queue.put((event_type, payload))
+
+    async def consume():
+        for _ in range(len(events)):
+            item = await queue.get()
+            await bot.process_queue_item(item, room, services)
+            latencies.append(time.perf_counter() - arrivals.popleft())
+
+    started = time.perf_counter()
+    await asyncio.gather(produce(), consume())
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "trace": str(trace_path),
+        "events": len(events),
+        "speed": speed or "max",
+        "elapsed_sec": round(elapsed, 3),
+        "events_per_sec": round(len(events) / elapsed, 1),
+        "latency_ms": {
+            f"p{int(q * 100)}": round(percentile(latencies, q) * 1000, 3) for q in (0.5, 0.9, 0.95, 0.99)
+        },
+        "latency_max_ms": round(max(latencies) * 1000, 3),
+        "ai_calls": ai_manager.calls,
+        "messages_sent": cometchat.sent,
+        "rss_start_mb": round(rss_start, 1),
+        "rss_end_mb": round(rss_mb(), 1),
+    }
+    result["rss_growth_mb"] = round(result["rss_end_mb"] - result["rss_start_mb"], 1)
+    if trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["python_heap_mb"] = {"current": round(current / 2**20, 2), "peak": round(peak / 2**20, 2)}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("trace", type=Path, help="trace file (.jsonl.gz)")
+    parser.add_argument("--speed", default="1", help="playback speed multiplier, or 'max' (default: 1 = real time)")
+    parser.add_argument("--ai-latency", type=float, default=0.0, help="stub AI reply latency in seconds")
+    parser.add_argument("--send-latency", type=float, default=0.0, help="stub CometChat send latency in seconds")
+    parser.add_argument("--tracemalloc", action="store_true", help="also report Python heap usage (slower)")
+    parser.add_argument("--json", type=Path, help="write results to this JSON file")
+    parser.add_argument("--synthesize", type=int, metavar="N", help="write an N-event synthetic trace to TRACE and exit")
+    args = parser.parse_args()
+
+    trace_path = args.trace.resolve()
+    json_path = args.json.resolve() if args.json else None
+    if args.synthesize:
+        synthesize(trace_path, args.synthesize)
+        return
+
+    speed = 0.0 if args.speed == "max" else float(args.speed)
+    isolate({"LOG_LEVEL": "WARNING"})
+
+    import logging
+    logging.basicConfig(level=logging.WARNING)
+
+    result = asyncio.run(replay(trace_path, speed, args.ai_latency, args.send_latency, args.tracemalloc))
+    print(json.dumps(result, indent=2))
+    if json_path:
+        json_path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 # AI providers and orchestration
-from .ai_manager import AIManager
-
-__all__ = ['AIManager']
+from .ai_manager import AIManager, RoomAI
 
+__all__ = ['AIManager', 'RoomAI']
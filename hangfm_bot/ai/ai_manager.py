@@ -1,67 +1,49 @@
 # ai_manager.py
-import os
+import asyncio
+import json
 import logging
+import time
 from typing import List, Dict, Optional
 
-try:
-    import aisuite as ai
-    AISUITE_AVAILABLE = True
-except ImportError:
-    AISUITE_AVAILABLE = False
-    logging.warning("aisuite not available - using fallback AI implementation")
-
-try:
-    import google.generativeai as genai
-    GEMINI_DIRECT_AVAILABLE = True
-except ImportError:
-    GEMINI_DIRECT_AVAILABLE = False
-    logging.warning("google-generativeai not available - Gemini will be disabled")
+from hangfm_bot.utils.single_flight import SingleFlight
+from hangfm_bot.ai.providers import ADAPTERS, ProviderAdapter
+from hangfm_bot.metrics import AI_ERRORS, AI_SECONDS
 
 class AIManager:
     def __init__(self):
         self.valid_models = []
-        self.client = None
-        self.gemini_client = None
+        self.adapters: Dict[str, ProviderAdapter] = {}  # "provider:model" -> adapter
         self.room_context = {}
         self.provider_override = None  # None = auto, or specific model
         self.ai_disabled = False  # True = AI off
+        self.flights = SingleFlight("ai")  # Coalesces identical concurrent requests
         
         from hangfm_bot.config import settings
         
         # Priority order: Gemini → OpenAI → Claude → HuggingFace
-        
-        # Gemini (using direct API, not aisuite)
-        if settings.gemini_api_key and GEMINI_DIRECT_AVAILABLE:
-            genai.configure(api_key=settings.gemini_api_key)
-            self.gemini_client = genai.GenerativeModel(settings.gemini_model)
-            self.valid_models.append(f"gemini:{settings.gemini_model}")
-        
-        if AISUITE_AVAILABLE:
-            # OpenAI
-            if settings.openai_api_key:
-                os.environ["OPENAI_API_KEY"] = settings.openai_api_key
-                self.valid_models.append(f"openai:{settings.openai_model}")
-            
-            # Claude
-            if settings.anthropic_api_key:
-                os.environ["ANTHROPIC_API_KEY"] = settings.anthropic_api_key
-                self.valid_models.append(f"anthropic:{settings.anthropic_model}")
-            
-            # HuggingFace (supports multiple models for increased free tokens)
-            if settings.huggingface_api_key:
-                os.environ["HUGGINGFACE_API_KEY"] = settings.huggingface_api_key
-                os.environ["HF_TOKEN"] = settings.huggingface_api_key  # aisuite expects HF_TOKEN
-                
-                # Parse comma-separated models
-                hf_models = [m.strip() for m in settings.huggingface_models.split(',') if m.strip()]
-                for model in hf_models:
-                    self.valid_models.append(f"huggingface:{model}")
-            
-            # Initialize aisuite client for non-Gemini providers
-            self.client = ai.Client()
+        # SDKs are only checked for here - each one is imported the first time it's used
+        for adapter_cls in ADAPTERS:
+            adapter = adapter_cls(settings)
+            if not adapter.configured():
+                continue
+            if not adapter.installed:
+                logging.warning(f"{adapter.sdk_module} not available - {adapter.name} will be disabled")
+                continue
+            for model in adapter.models():
+                self.valid_models.append(model)
+                self.adapters[model] = adapter
                 
         logging.debug(f"AIManager initialized with models: {self.valid_models}")
 
+    async def warm_up(self):
+        """Import the current provider's SDK in the background so the first reply isn't slowed by it"""
+        adapter = self.adapters.get(self.get_current_provider())
+        if adapter and not adapter.loaded:
+            try:
+                await asyncio.to_thread(adapter.load)
+            except Exception as e:
+                logging.warning(f"AI warm-up failed for {adapter.name}: {e}")
+
     def update_room_context(self, context: dict):
         """Update room context for AI prompts"""
         self.room_context.update(context)
@@ -96,10 +78,12 @@ class AIManager:
         context: Optional[List[Dict]] = None, 
         provider: Optional[str] = None,
         user_uuid: str = None,
-        sentiment_prompt: str = None
+        sentiment_prompt: str = None,
+        room_context: Optional[dict] = None
     ) -> str:
         """
         Generate a response with a selected AI provider, optionally using conversation context.
+        room_context defaults to this manager's own (single-room) context.
         """
         # Check if AI is disabled
         if self.ai_disabled:
@@ -111,6 +95,8 @@ class AIManager:
         # Use provider override if set, otherwise use priority order
         model = provider if provider else (self.provider_override or self.valid_models[0])
         
+        from hangfm_bot.config import settings
+        
         # Get full system prompt from config (or use default if empty)
         if settings.bot_system_prompt.strip():
             base_instructions = settings.bot_system_prompt
@@ -142,59 +128,92 @@ IMPORTANT: Don't be a boring robot. Be entertaining. If they're asking absurd qu
         base_instructions += "\n\nCurrent context:"
         
         system_prompt = base_instructions
+        room_context = self.room_context if room_context is None else room_context
         
-        if self.room_context:
+        if room_context:
             # Current song
-            if self.room_context.get('currentSong'):
-                song = self.room_context['currentSong']
-                dj = self.room_context.get('lastDJ', 'Unknown')
+            if room_context.get('currentSong'):
+                song = room_context['currentSong']
+                dj = room_context.get('lastDJ', 'Unknown')
                 system_prompt += f"\n- Currently playing: {song.get('artistName')} - {song.get('trackName')} (DJ: {dj})"
+                meta = room_context.get('currentSongMeta')
+                if meta:
+                    details = [d for d in (meta.get('album'), meta.get('year'), ', '.join(meta.get('genres', [])[:3])) if d]
+                    if details:
+                        system_prompt += f"\n- Song info: {' | '.join(details)}"
             
             # DJs on stage
-            if self.room_context.get('djList'):
-                djs = ', '.join(self.room_context['djList'])
+            if room_context.get('djList'):
+                djs = ', '.join(room_context['djList'])
                 system_prompt += f"\n- DJs on stage: {djs}"
             
             # Users in room
-            if self.room_context.get('userList'):
-                total = len(self.room_context['userList'])
-                preview = ', '.join(self.room_context['userList'][:3])
+            if room_context.get('userList'):
+                total = len(room_context['userList'])
+                preview = ', '.join(room_context['userList'][:3])
                 if total > 3:
                     preview += f" (+{total - 3} more)"
                 system_prompt += f"\n- In room ({total}): {preview}"
             
+            if room_context.get('stale'):
+                system_prompt += "\n- (Connection to the room is down - the info above may be out of date, don't state it as fact)"
+            
             # Recent events
-            if self.room_context.get('lastJoin'):
-                system_prompt += f"\n- {self.room_context['lastJoin']} just joined"
-            if self.room_context.get('lastLeave'):
-                system_prompt += f"\n- {self.room_context['lastLeave']} just left"
-            if self.room_context.get('lastDJAdd'):
-                system_prompt += f"\n- {self.room_context['lastDJAdd']} just hopped on stage"
-            if self.room_context.get('lastDJRemove'):
-                system_prompt += f"\n- {self.room_context['lastDJRemove']} just left the stage"
+            if room_context.get('lastJoin'):
+                system_prompt += f"\n- {room_context['lastJoin']} just joined"
+            if room_context.get('lastLeave'):
+                system_prompt += f"\n- {room_context['lastLeave']} just left"
+            if room_context.get('lastDJAdd'):
+                system_prompt += f"\n- {room_context['lastDJAdd']} just hopped on stage"
+            if room_context.get('lastDJRemove'):
+                system_prompt += f"\n- {room_context['lastDJRemove']} just left the stage"
         
         try:
-            # Use Gemini direct API if it's a Gemini model
-            if model.startswith("gemini:") and self.gemini_client:
-                prompt = f"{system_prompt}\n\nUser: {message}"
-                response = self.gemini_client.generate_content(prompt)
-                return response.text
-            
-            # Use aisuite for other providers
-            if not self.client:
-                return "AI provider not available."
-                
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            if context:
-                messages.extend(context)
-                
-            messages.append({"role": "user", "content": message})
-            
-            response = self.client.chat.completions.create(model=model, messages=messages)
-            return response.choices[0].message.content
+            # Identical in-flight requests (same model, prompt, context, message) share one provider call
+            key = (model, system_prompt, message, json.dumps(context or [], sort_keys=True))
+            return await self.flights.do(key, self._call_provider, model, system_prompt, message, context)
             
         except Exception as e:
             logging.error(f"AI generation error: {e}")
             return f"Sorry, I encountered an error: {str(e)[:100]}"
 
+    async def _call_provider(self, model: str, system_prompt: str, message: str, context: Optional[List[Dict]]) -> str:
+        """Call the selected provider and record its latency"""
+        provider = model.split(":", 1)[0]
+        started = time.perf_counter()
+        try:
+            return await self._provider_request(model, system_prompt, message, context)
+        except Exception:
+            AI_ERRORS.labels(provider).inc()
+            raise
+        finally:
+            AI_SECONDS.labels(provider).observe(time.perf_counter() - started)
+
+    async def _provider_request(self, model: str, system_prompt: str, message: str, context: Optional[List[Dict]]) -> str:
+        """Call the selected provider (SDK calls are blocking, so they run in a worker thread)"""
+        adapter = self.adapters.get(model)
+        if adapter is None:
+            return "AI provider not available."
+        return await adapter.complete(model, system_prompt, message, context)
+
+
+class RoomAI:
+    """
+    One room's view of a shared AIManager: its own room_context, everything else
+    (providers, override, in-flight coalescing) comes from the shared manager.
+    Drop-in wherever an AIManager is used for a single room.
+    """
+
+    def __init__(self, manager: AIManager):
+        self.manager = manager
+        self.room_context = {}
+
+    def update_room_context(self, context: dict):
+        self.room_context.update(context)
+
+    async def generate_response(self, message: str, user_role: str = "user", context: Optional[List[Dict]] = None, **kwargs) -> str:
+        kwargs.setdefault("room_context", self.room_context)
+        return await self.manager.generate_response(message, user_role, context, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.manager, name)
@@ -0,0 +1,163 @@
+# providers.py
+# Provider adapters that import their SDK on first use instead of at module import
+
+import asyncio
+import importlib.util
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+LOG = logging.getLogger("ai_providers")
+
+
+class ProviderAdapter:
+    """
+    One AI provider. Checking whether the SDK is installed is a find_spec
+    (no import); the SDK itself is imported by load() the first time the
+    provider is actually used (or warmed up).
+    """
+
+    name = "provider"
+    sdk_module = ""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._loaded = False
+        self._lock = threading.Lock()  # load() can run from to_thread workers concurrently
+
+    @property
+    def installed(self) -> bool:
+        try:
+            return importlib.util.find_spec(self.sdk_module) is not None
+        except (ImportError, ValueError):
+            return False
+
+    def configured(self) -> bool:
+        """API key present"""
+        raise NotImplementedError
+
+    def models(self) -> List[str]:
+        """Model ids ("provider:model") this adapter serves"""
+        raise NotImplementedError
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self):
+        """Import and initialize the SDK (idempotent, thread-safe)"""
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+                LOG.info(f"📦 Loaded {self.name} SDK")
+
+    def _load(self):
+        raise NotImplementedError
+
+    def _request(self, model: str, system_prompt: str, message: str, context: Optional[List[Dict]]) -> str:
+        """Blocking SDK call"""
+        raise NotImplementedError
+
+    async def complete(self, model: str, system_prompt: str, message: str, context: Optional[List[Dict]]) -> str:
+        """Load the SDK if needed and run the (blocking) request in a worker thread"""
+        def call():
+            self.load()
+            return self._request(model, system_prompt, message, context)
+        return await asyncio.to_thread(call)
+
+
+class GeminiAdapter(ProviderAdapter):
+    """Gemini through google-generativeai directly"""
+
+    name = "gemini"
+    sdk_module = "google.generativeai"
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.client = None
+
+    def configured(self) -> bool:
+        return bool(self.settings.gemini_api_key)
+
+    def models(self) -> List[str]:
+        return [f"gemini:{self.settings.gemini_model}"]
+
+    def _load(self):
+        import google.generativeai as genai
+
+        genai.configure(api_key=self.settings.gemini_api_key)
+        self.client = genai.GenerativeModel(self.settings.gemini_model)
+
+    def _request(self, model, system_prompt, message, context):
+        prompt = f"{system_prompt}\n\nUser: {message}"
+        return self.client.generate_content(prompt).text
+
+
+class AisuiteAdapter(ProviderAdapter):
+    """
+    OpenAI / Anthropic / HuggingFace through aisuite. All three share one aisuite
+    client, created by whichever adapter is used first.
+    """
+
+    sdk_module = "aisuite"
+    _client = None
+    _client_lock = threading.Lock()
+
+    def _load(self):
+        with AisuiteAdapter._client_lock:
+            if AisuiteAdapter._client is None:
+                import aisuite as ai
+
+                AisuiteAdapter._client = ai.Client()
+
+    def _request(self, model, system_prompt, message, context):
+        messages = [{"role": "system", "content": system_prompt}]
+        if context:
+            messages.extend(context)
+        messages.append({"role": "user", "content": message})
+        response = AisuiteAdapter._client.chat.completions.create(model=model, messages=messages)
+        return response.choices[0].message.content
+
+
+class OpenAIAdapter(AisuiteAdapter):
+    name = "openai"
+
+    def configured(self) -> bool:
+        return bool(self.settings.openai_api_key)
+
+    def models(self) -> List[str]:
+        os.environ["OPENAI_API_KEY"] = self.settings.openai_api_key
+        return [f"openai:{self.settings.openai_model}"]
+
+
+class AnthropicAdapter(AisuiteAdapter):
+    name = "anthropic"
+
+    def configured(self) -> bool:
+        return bool(self.settings.anthropic_api_key)
+
+    def models(self) -> List[str]:
+        os.environ["ANTHROPIC_API_KEY"] = self.settings.anthropic_api_key
+        return [f"anthropic:{self.settings.anthropic_model}"]
+
+
+class HuggingFaceAdapter(AisuiteAdapter):
+    name = "huggingface"
+
+    def configured(self) -> bool:
+        return bool(self.settings.huggingface_api_key)
+
+    def models(self) -> List[str]:
+        os.environ["HUGGINGFACE_API_KEY"] = self.settings.huggingface_api_key
+        os.environ["HF_TOKEN"] = self.settings.huggingface_api_key  # aisuite expects HF_TOKEN
+        # Comma-separated for multiple models (more free tokens)
+        hf_models = [m.strip() for m in self.settings.huggingface_models.split(',') if m.strip()]
+        return [f"huggingface:{model}" for model in hf_models]
+
+
+# Priority order: Gemini → OpenAI → Claude → HuggingFace
+ADAPTERS = [GeminiAdapter, OpenAIAdapter, AnthropicAdapter, HuggingFaceAdapter]
@@ -7,6 +7,23 @@ class Settings(BaseSettings):
     ttfm_api_token: str
     room_uuid: str
     bot_name: str = "BOT"
+    relay_url: str = "http://127.0.0.1:3000"  # Node relay HTTP API (/roomstate, /send)
+    relay_receiver_port: int = 4000  # Port the relay posts events to (relay's PY_WEBHOOK)
+    relay_health_interval_sec: float = 5.0  # How often each room's relay /health is checked
+    relay_resync_max_backoff_sec: float = 60.0  # Cap for room-state retry backoff after a relay reconnect
+    relay_secret: str = ""  # Must match the relay's RELAY_SECRET (sent with /send and /actions)
+    relay_action_timeout_sec: float = 5.0  # How long a socket action waits for its ack
+    relay_action_retries: int = 2  # Extra attempts for idempotent actions (votes, hop up/down, next song)
+    extra_rooms: str = ""  # More rooms served by this process: comma-separated "uuid" or "uuid=relay_url"
+    room_state_dir: str = "rooms"  # Each room's play history, recently played, taste profiles go in <dir>/<room id>/
+    shard_workers: int = 0  # >0 = run a supervisor with this many worker processes, rooms spread across them
+    shared_store: str = ""  # SQLite file for metadata cache + user memory shared between workers (empty = JSON files)
+    shard_worker_id: str = ""  # Set by the supervisor for its worker processes - leave empty
+
+    # Deepcut.live (rooms listed as "deepcut:ROOMID" in EXTRA_ROOMS)
+    deepcut_userid: str = ""
+    deepcut_auth: str = ""
+    deepcut_socket_url: str = "wss://chat1.deepcut.fm:8080/socket.io/websocket"
     
     # Discogs public api
     discogs_user_token: str
@@ -22,6 +39,7 @@ class Settings(BaseSettings):
     cometchat_region: str = "us"
     cometchat_uid: str
     cometchat_auth: str
+    cometchat_base_url: str = ""  # Empty = https://{appid}.apiclient-{region}.cometchat.io
     
     # AI Providers
     openai_api_key: str | None = None
@@ -37,6 +55,38 @@ class Settings(BaseSettings):
     music_year_start: int = 1950
     music_year_end: int = 2025
     recently_played_limit: int = 50
+    recently_played_artist_window: int = 10  # Don't repeat an artist within this many plays
+    metadata_cache_ttl_hours: int = 168  # How long looked-up song metadata stays cached on disk
+    metadata_sources: str = "spotify,discogs,musicbrainz,wikipedia"  # Comma-separated, empty = no lookups
+    metadata_source_timeout_sec: float = 5.0  # Per-source timeout (Spotify/Discogs/MusicBrainz/Wikipedia)
+    audio_genre_hints: bool = False  # Analyze Spotify preview clips with librosa when metadata has no genre
+    discovery_verify_concurrency: int = 2  # Candidate metadata lookups in flight during a discovery refill
+    
+    # Flood control (per user per room; co-owners and moderators are exempt; 0 = check off)
+    flood_user_messages: int = 6  # Messages a user may send per window before being muted
+    flood_user_window_sec: float = 10.0
+    flood_ai_limit: int = 3  # AI keyword triggers per user per window (OG aiSpamLimit)
+    flood_ai_window_sec: float = 150.0
+    flood_room_actions: int = 20  # Commands + AI replies per room per window
+    flood_room_window_sec: float = 10.0
+    flood_mute_sec: float = 30.0  # First mute; doubles with each repeat offence
+    flood_mute_max_sec: float = 900.0  # Longest mute, and the quiet spell after a mute that clears strikes
+    
+    # Link safety (links in chat are checked before command/AI handling)
+    link_safety: bool = True
+    link_domain_ttl_hours: float = 168  # How long a per-domain verdict stays cached
+    link_url_ttl_hours: float = 24  # How long a per-URL verdict stays cached
+    link_check_timeout_sec: float = 3.0  # Safe Browsing lookup timeout
+    safe_browsing_api_key: str = ""  # Google Safe Browsing v4 key (empty = local rules only)
+    
+    # Stage automation (per room)
+    afk_timeout_sec: float = 2160.0  # Idle time before a DJ on stage gets an AFK warning (OG: 36 min); 0 = off
+    afk_warning_sec: float = 36.0  # Time to vote or chat after the warning before removal
+    auto_stage: bool = False  # Bot hops up when the stage is short of DJs and down when it fills
+    auto_stage_hop_up_max_djs: int = 3  # Hop up when this many DJs or fewer are on stage
+    auto_stage_hop_down_humans: int = 3  # Hop down (after playing a song) once this many humans are on stage
+    auto_stage_cooldown_sec: float = 120.0  # No auto hop up this soon after hopping down
+    auto_upvote_delay_sec: float = 0.0  # Upvote each song this long after it starts (OG: 5); 0 = off
     
     # Permissions (comma-separated UUIDs)
     coowner_uuids: str = ""
@@ -47,9 +97,13 @@ class Settings(BaseSettings):
     
     # Misc
     log_level: str = "INFO"
+    log_format: str = "text"  # "text" or "json" (one JSON object per line)
+    log_file: str = ""  # Also write logs here (empty = console only)
+    log_rate_per_sec: float = 10.0  # Per-message INFO/DEBUG rate limit during bursts (0 = off)
     allow_debug: bool = False
     send_rate_per_sec: int = 2
     http_poll_interval_ms: int = 1000
+    trace_file: str = ""  # Record every queued event to this .jsonl.gz for offline replay (empty = off)
 
     model_config = SettingsConfigDict(env_file='.env', case_sensitive=False)
 
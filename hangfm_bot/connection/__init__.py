@@ -1,6 +1,8 @@
 # Connection managers
 from .cometchat_manager import CometChatManager
 from .cometchat_poller import CometChatPoller
+from .relay_actions import RelayActionClient
+from .relay_monitor import RelayMonitor
 
-__all__ = ['CometChatManager', 'CometChatPoller']
+__all__ = ['CometChatManager', 'CometChatPoller', 'RelayActionClient', 'RelayMonitor']
 
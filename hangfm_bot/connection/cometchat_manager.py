@@ -2,8 +2,10 @@
 # CometChat HTTP API for sending messages (NO SDK - pure HTTP)
 
 import logging
+import time
 import aiohttp
 from hangfm_bot.config import settings
+from hangfm_bot.metrics import SEND_SECONDS
 
 LOG = logging.getLogger("cometchat")
 
@@ -14,9 +16,10 @@ class CometChatManager:
     Uses async/await for non-blocking operations
     """
     
-    def __init__(self):
+    def __init__(self, room_uuid: str = None, session: aiohttp.ClientSession = None):
+        self.room_uuid = room_uuid or settings.room_uuid
         # Construct base URL like original JS: https://{appid}.apiclient-{region}.cometchat.io
-        self.base_url = f"https://{settings.cometchat_appid}.apiclient-{settings.cometchat_region}.cometchat.io"
+        self.base_url = (settings.cometchat_base_url.rstrip("/") or f"https://{settings.cometchat_appid}.apiclient-{settings.cometchat_region}.cometchat.io")
         # EXACT headers from original working bot (lines 5285-5294)
         self.headers = {
             "Content-Type": "application/json",
@@ -28,12 +31,13 @@ class CometChatManager:
             "referer": "https://tt.live/",
             "sdk": "javascript@3.0.10"
         }
-        self.session = None
-        LOG.debug(f"CometChat initialized: {self.base_url}")
+        self.session = session
+        self._owns_session = session is None  # A shared session (multi-room) is closed by its owner
+        LOG.debug("CometChat initialized: %s", self.base_url)
     
     async def _get_session(self):
         """Get or create aiohttp session"""
-        if self.session is None or self.session.closed:
+        if self.session is None or (self.session.closed and self._owns_session):
             self.session = aiohttp.ClientSession()
         return self.session
     
@@ -70,9 +74,9 @@ class CometChatManager:
         }
         
         try:
-            LOG.debug(f"Sending message to group {group_id}: {text[:50]}")
-            LOG.debug(f"CometChat URL: {url}")
-            LOG.debug(f"CometChat payload: {payload}")
+            LOG.debug("Sending message to group %s: %s", group_id, text[:50])
+            LOG.debug("CometChat URL: %s", url)
+            LOG.debug("CometChat payload: %s", payload)
             
             session = await self._get_session()
             async with session.post(url, json=payload, headers=self.headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
@@ -98,21 +102,24 @@ class CometChatManager:
                                         LOG.info("✅ Message sent successfully after joining")
                                         return True
                     except Exception as e:
-                        LOG.error(f"Failed to add bot to group: {e}")
+                        LOG.error("Failed to add bot to group: %s", e)
                 
-                LOG.error(f"❌ CometChat error {response.status}: {response_text[:200]}")
+                LOG.error("❌ CometChat error %s: %s", response.status, response_text[:200])
                 return False
                     
         except Exception as e:
-            LOG.error(f"❌ Failed to send message: {e}")
+            LOG.error("❌ Failed to send message: %s", e)
             return False
     
     async def send_message(self, text: str) -> bool:
-        """Send message to configured room"""
-        return await self.send_group_message(settings.room_uuid, text)
+        """Send message to this manager's room"""
+        started = time.perf_counter()
+        sent = await self.send_group_message(self.room_uuid, text)
+        SEND_SECONDS.labels("ok" if sent else "error").observe(time.perf_counter() - started)
+        return sent
     
     async def close(self):
         """Close the aiohttp session"""
-        if self.session and not self.session.closed:
+        if self._owns_session and self.session and not self.session.closed:
             await self.session.close()
 
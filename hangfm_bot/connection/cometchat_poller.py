@@ -12,16 +12,20 @@ LOG = logging.getLogger("cometchat_poller")
 class CometChatPoller:
     """
     CometChat HTTP polling for receiving chat messages
-    Polls the CometChat REST API for new messages every second
+    Polls the CometChat REST API for new messages every http_poll_interval_ms
     """
     
-    def __init__(self, message_queue):
+    def __init__(self, message_queue, room_uuid: str = None, session: aiohttp.ClientSession = None):
         self.message_queue = message_queue
-        self.session = None
+        self.room_uuid = room_uuid or settings.room_uuid
+        self.session = session
+        self._owns_session = session is None  # A shared session (multi-room) is closed by its owner
         self.running = False
-        self.last_message_id = None
+        self.last_message_id = None  # Poll cursor for this room
+        # One job per room (full id - rooms can share a prefix); the configured room keeps the plain name
+        self.job_name = "cometchat_poll" if self.room_uuid == settings.room_uuid else f"cometchat_poll:{self.room_uuid}"
         
-        self.base_url = f"https://{settings.cometchat_appid}.apiclient-{settings.cometchat_region}.cometchat.io"
+        self.base_url = (settings.cometchat_base_url.rstrip("/") or f"https://{settings.cometchat_appid}.apiclient-{settings.cometchat_region}.cometchat.io")
         self.headers = {
             "Content-Type": "application/json",
             "authtoken": settings.cometchat_auth,
@@ -33,30 +37,22 @@ class CometChatPoller:
             "sdk": "javascript@3.0.10"
         }
         
-        LOG.info("CometChat Poller initialized")
+        LOG.debug("CometChat Poller initialized")
     
-    async def start(self):
-        """Start polling for messages"""
+    async def start(self, scheduler):
+        """Start polling for messages (as a job on the bot's scheduler)"""
         self.running = True
-        self.session = aiohttp.ClientSession()
-        LOG.info("🔄 Starting CometChat HTTP polling...")
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+        LOG.debug("🔄 Starting CometChat HTTP polling for room %s...", self.room_uuid)
         
-        asyncio.create_task(self._poll_loop())
-    
-    async def _poll_loop(self):
-        """Poll for new messages every second"""
-        while self.running:
-            try:
-                await self._poll_messages()
-                await asyncio.sleep(1)  # Poll every second
-            except Exception as e:
-                LOG.error(f"Poll error: {e}")
-                await asyncio.sleep(1)
+        # Low jitter - chat latency matters more than spreading this job out
+        scheduler.add(self.job_name, self._poll_messages, every=settings.http_poll_interval_ms / 1000, jitter=0.05, run_immediately=True)
     
     async def _poll_messages(self):
         """Poll CometChat for new messages"""
         try:
-            url = f"{self.base_url}/v3/groups/{settings.room_uuid}/messages"
+            url = f"{self.base_url}/v3/groups/{self.room_uuid}/messages"
             params = {
                 "limit": "10",
             }
@@ -76,23 +72,23 @@ class CometChatPoller:
                 elif response.status != 304:  # 304 = Not Modified (no new messages)
                     text = await response.text()
                     if response.status != 401:  # Don't spam 401 errors
-                        LOG.warning(f"Poll failed {response.status}: {text[:200]}")
+                        LOG.warning("Poll failed %s: %s", response.status, text[:200])
                     
         except asyncio.TimeoutError:
             LOG.debug("Poll timeout (normal)")
         except Exception as e:
-            LOG.error(f"Poll exception: {e}")
+            LOG.error("Poll exception: %s", e)
     
     async def _handle_message(self, message):
         """Handle a polled message"""
         try:
             # Handle both dict and string (API might return different formats)
             if isinstance(message, str):
-                LOG.debug(f"Skipping string message: {message[:50]}")
+                LOG.debug("Skipping string message: %s", message[:50])
                 return
             
             if not isinstance(message, dict):
-                LOG.warning(f"Unexpected message type: {type(message)}")
+                LOG.warning("Unexpected message type: %s", type(message))
                 return
             
             msg_id = message.get("id")
@@ -101,7 +97,7 @@ class CometChatPoller:
             # Skip messages we've already seen
             if msg_id:
                 if self.last_message_id and int(msg_id) <= int(self.last_message_id):
-                    LOG.debug(f"Skipping already-seen message ID: {msg_id}")
+                    LOG.debug("Skipping already-seen message ID: %s", msg_id)
                     return
                 
                 # Update last seen message ID
@@ -109,7 +105,7 @@ class CometChatPoller:
             
             # Only process text messages
             if msg_type != "text":
-                LOG.debug(f"Skipping non-text message type: {msg_type}")
+                LOG.debug("Skipping non-text message type: %s", msg_type)
                 return
             
             # Get sender (can be string UID or dict object)
@@ -122,7 +118,7 @@ class CometChatPoller:
                 sender_uuid = sender
                 sender_name = message.get("senderName", "Unknown") or "Unknown"
             else:
-                LOG.warning(f"Unknown sender format: {type(sender)}")
+                LOG.warning("Unknown sender format: %s", type(sender))
                 return
             
             # Get text from data
@@ -138,7 +134,7 @@ class CometChatPoller:
                 return
             
             if text and sender_uuid:
-                LOG.debug(f"📨 Polled message from {sender_name}: {text[:50]}")
+                LOG.debug("📨 Polled message from %s: %s", sender_name, text[:50])
                 
                 # Put message in queue for processing
                 await self.message_queue.put(('chatMessage', {
@@ -149,15 +145,15 @@ class CometChatPoller:
                     }
                 }))
             else:
-                LOG.debug(f"Skipping message - text={bool(text)}, sender={sender_uuid}")
+                LOG.debug("Skipping message - text=%s, sender=%s", bool(text), sender_uuid)
                 
         except Exception as e:
-            LOG.error(f"Error handling polled message: {e}", exc_info=True)
+            LOG.error("Error handling polled message: %s", e, exc_info=True)
     
     async def close(self):
         """Stop polling and close session"""
         self.running = False
-        if self.session and not self.session.closed:
+        if self._owns_session and self.session and not self.session.closed:
             await self.session.close()
-            LOG.info("CometChat Poller closed")
+        LOG.debug("CometChat Poller closed for room %s", self.room_uuid)
 
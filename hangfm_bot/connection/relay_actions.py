@@ -0,0 +1,146 @@
+# hangfm_bot/connection/relay_actions.py
+# Outbound hang.fm socket actions (votes, DJ hop up/down, next song) through the relay
+
+import asyncio
+import itertools
+import logging
+import time
+from typing import Dict, Optional
+
+import aiohttp
+from hangfm_bot.config import settings
+from hangfm_bot.metrics import RELAY_ACTION_RETRIES, RELAY_ACTION_SECONDS
+
+LOG = logging.getLogger("relay_actions")
+
+
+class RelayActionClient:
+    """
+    Sends socket actions over one persistent WebSocket to the relay's /actions
+    endpoint. Actions are pipelined - each goes out immediately with its own id
+    and the replies are matched back by id, so a slow ack never holds up the
+    next action. Idempotent actions are retried on timeout or a dropped
+    connection; the rest report the failure. Relays without /actions are
+    reached through POST /send instead.
+    """
+
+    # Safe to send twice: the second one leaves the room in the same state
+    IDEMPOTENT = frozenset({"voteOnSong", "addDj", "removeDj", "updateNextSong"})
+
+    def __init__(self, relay_url: str, session: aiohttp.ClientSession, secret: str = None):
+        self.relay_url = relay_url
+        self.session = session
+        self.headers = {"x-relay-secret": secret if secret is not None else settings.relay_secret}
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
+        self._http_only = False  # Relay predates /actions
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def _connect(self) -> Optional[aiohttp.ClientWebSocketResponse]:
+        if self._ws is not None and not self._ws.closed:
+            return self._ws
+        if self._http_only:
+            return None
+        async with self._connect_lock:
+            if self._ws is not None and not self._ws.closed:
+                return self._ws
+            try:
+                self._ws = await self.session.ws_connect(f"{self.relay_url}/actions", headers=self.headers, timeout=5)
+            except aiohttp.WSServerHandshakeError as e:
+                if e.status == 404:
+                    self._http_only = True
+                    LOG.info("Relay at %s has no /actions - using POST /send", self.relay_url)
+                return None
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                LOG.debug("Relay actions socket at %s unavailable: %s", self.relay_url, e)
+                return None
+            self._reader = asyncio.create_task(self._read(self._ws))
+            return self._ws
+
+    async def _read(self, ws: aiohttp.ClientWebSocketResponse):
+        try:
+            async for msg in ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                reply = msg.json()
+                future = self._pending.get(reply.get("id"))
+                if future and not future.done():
+                    future.set_result(reply)
+        except Exception as e:
+            LOG.debug("Relay actions socket read failed: %s", e)
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("relay actions socket closed"))
+
+    async def _send_once(self, event: str, payload, expect_ack: bool, timeout: float) -> dict:
+        ws = await self._connect()
+        if ws is None:
+            body = {"event": event, "payload": payload, "expectAck": expect_ack}
+            async with self.session.post(f"{self.relay_url}/send", json=body, headers=self.headers, timeout=aiohttp.ClientTimeout(total=timeout + 1)) as resp:
+                return await resp.json(content_type=None)
+        action_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[action_id] = future
+        try:
+            await ws.send_json({"id": action_id, "event": event, "payload": payload, "expectAck": expect_ack, "timeoutMs": int(timeout * 1000)})
+            # The relay gives up at timeoutMs; the extra second covers the trip back
+            return await asyncio.wait_for(future, timeout + 1)
+        finally:
+            self._pending.pop(action_id, None)
+
+    async def action(self, event: str, payload: Optional[dict] = None, expect_ack: bool = True, timeout: float = None, retries: int = None) -> dict:
+        """Run one socket action; returns the relay's {"ok", "ack"|"error"} reply"""
+        timeout = timeout or settings.relay_action_timeout_sec
+        attempts = 1 + (retries if retries is not None else settings.relay_action_retries if event in self.IDEMPOTENT else 0)
+        started = time.perf_counter()
+        result = {"ok": False, "error": "not sent"}
+        for attempt in range(attempts):
+            if attempt:
+                RELAY_ACTION_RETRIES.labels(event).inc()
+                await asyncio.sleep(0.2 * 2 ** (attempt - 1))
+            try:
+                result = await self._send_once(event, payload or {}, expect_ack, timeout)
+            except (asyncio.TimeoutError, ConnectionError, aiohttp.ClientError) as e:
+                result = {"ok": False, "error": str(e) or type(e).__name__}
+                continue
+            # "ack timeout" and a disconnected socket are worth another try; a rejected action isn't
+            if result.get("ok") or result.get("error") not in ("ack timeout", "socket not connected"):
+                break
+        RELAY_ACTION_SECONDS.labels(event, "ok" if result.get("ok") else "error").observe(time.perf_counter() - started)
+        if not result.get("ok"):
+            LOG.warning("⚠️  Relay action %s failed: %s", event, result.get("error"))
+        return result
+
+    # ── the actions the OG bot used ───────────────────────────────
+
+    async def vote(self, like: bool = True) -> bool:
+        return (await self.action("voteOnSong", {"songVotes": {"like": like}})).get("ok", False)
+
+    async def hop_up(self) -> bool:
+        return (await self.action("addDj", {})).get("ok", False)
+
+    async def hop_down(self, dj_uuid: str = None) -> bool:
+        return (await self.action("removeDj", {"djUuid": dj_uuid} if dj_uuid else {})).get("ok", False)
+
+    async def queue_song(self, song: dict) -> bool:
+        """Set the bot's next song (a hang.fm catalog song object)"""
+        return (await self.action("updateNextSong", {"song": song})).get("ok", False)
+
+    async def close(self):
+        if self._ws is not None:
+            await self._ws.close()
+            self._ws = None
+        if self._reader:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
@@ -0,0 +1,118 @@
+# hangfm_bot/connection/relay_monitor.py
+# Watches a room's Node relay: socket health, reconnects, and room-state resync with backoff
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+from hangfm_bot.config import settings
+from hangfm_bot.metrics import RELAY_CONNECTED, RELAY_RECONNECTS, RELAY_RESYNCS, ROOM_STATE_AGE
+
+LOG = logging.getLogger("relay_monitor")
+
+
+class RelayMonitor:
+    """
+    Polls the relay's /health as a scheduler job. The relay is "down" (not
+    answering), "disconnected" (up, socket to hang.fm not connected) or
+    "connected". Whenever it becomes connected - first contact, after an outage,
+    or after a reconnect that happened between two checks - the room state is
+    fetched again, retrying with exponential backoff until it succeeds.
+    """
+
+    def __init__(
+        self,
+        room_uuid: str,
+        relay_url: str,
+        session: aiohttp.ClientSession,
+        request_state: Callable[[], Awaitable[bool]],
+        on_change: Optional[Callable[[bool], None]] = None,
+    ):
+        self.room_uuid = room_uuid
+        self.relay_url = relay_url
+        self.session = session
+        self.request_state = request_state
+        self.on_change = on_change  # Called with True/False when the socket comes up / goes away
+        self.state = "unknown"
+        self.connects: Optional[int] = None  # Relay's socket connect counter, to spot reconnects between checks
+        self.last_sync: Optional[float] = None  # monotonic time of the last successful resync
+        self._needs_resync = False
+        self._was_connected = False
+        self._resync_task: Optional[asyncio.Task] = None
+        # One job and one set of series per room (full id - rooms can share a prefix);
+        # the configured room keeps the plain job name
+        self.job_name = "relay_health" if room_uuid == settings.room_uuid else f"relay_health:{room_uuid}"
+        self._connected_gauge = RELAY_CONNECTED.labels(room_uuid)
+        self._reconnects = RELAY_RECONNECTS.labels(room_uuid)
+        ROOM_STATE_AGE.labels(room_uuid).fn = self.state_age
+
+    @property
+    def connected(self) -> bool:
+        return self.state == "connected"
+
+    def state_age(self) -> float:
+        """Seconds since the room state was last synced (-1 = never)"""
+        return time.monotonic() - self.last_sync if self.last_sync is not None else -1.0
+
+    def start(self, scheduler):
+        scheduler.add(self.job_name, self.check, every=settings.relay_health_interval_sec, jitter=0.05, run_immediately=True)
+
+    async def stop(self, scheduler):
+        scheduler.remove(self.job_name)
+        if self._resync_task:
+            self._resync_task.cancel()
+            try:
+                await self._resync_task
+            except asyncio.CancelledError:
+                pass
+            self._resync_task = None
+        for family in (RELAY_CONNECTED, RELAY_RECONNECTS, ROOM_STATE_AGE):
+            family.remove(self.room_uuid)
+
+    async def _health(self) -> tuple:
+        try:
+            timeout = aiohttp.ClientTimeout(total=min(3.0, settings.relay_health_interval_sec))
+            async with self.session.get(f"{self.relay_url}/health", timeout=timeout) as resp:
+                data = await resp.json(content_type=None)
+        except Exception as e:
+            LOG.debug("Relay health for %s failed: %s", self.room_uuid[:8], e)
+            return "down", None
+        return ("connected" if data.get("socketConnected") else "disconnected"), data.get("connects")
+
+    async def check(self):
+        state, connects = await self._health()
+        previous, self.state = self.state, state
+        reconnected = state == "connected" and self.connects is not None and connects is not None and connects != self.connects
+        if connects is not None:
+            self.connects = connects
+
+        if state != previous:
+            self._connected_gauge.set(1 if state == "connected" else 0)
+            if previous != "unknown" or state != "connected":
+                level = logging.INFO if state == "connected" else logging.WARNING
+                LOG.log(level, "🔌 Relay for %s: %s -> %s", self.room_uuid[:8], previous, state)
+            if self.on_change and (previous == "unknown" or (state == "connected") != (previous == "connected")):
+                self.on_change(state == "connected")
+        if state == "connected" and (previous != "connected" or reconnected):
+            if self._was_connected:
+                self._reconnects.inc()
+            self._was_connected = True
+            self._needs_resync = True
+            if self._resync_task is None or self._resync_task.done():
+                self._resync_task = asyncio.create_task(self._resync())
+
+    async def _resync(self):
+        """Fetch room state until it works, backing off 1s, 2s, 4s... while the socket stays up"""
+        backoff = 1.0
+        while self._needs_resync and self.connected:
+            if await self.request_state():
+                self._needs_resync = False
+                self.last_sync = time.monotonic()
+                RELAY_RESYNCS.labels("ok").inc()
+                return
+            RELAY_RESYNCS.labels("error").inc()
+            LOG.debug("Room state resync for %s failed - retrying in %.0fs", self.room_uuid[:8], backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, settings.relay_resync_max_backoff_sec)
@@ -3,6 +3,7 @@ import re
 import logging
 from typing import Callable, Optional, Dict
 from hangfm_bot.utils.role_checker import RoleChecker
+from hangfm_bot.metrics import COMMAND_SECONDS
 
 class CommandHandler:
     def __init__(self, role_checker: RoleChecker):
@@ -15,7 +16,7 @@ class CommandHandler:
     def register(self, command: str, handler: Callable):
         """Register a command handler"""
         self.handlers[command.lower()] = handler
-        logging.debug(f"Registered command: {command}")
+        logging.debug("Registered command: %s", command)
 
     async def handle_message(self, user_uuid: str, message: str, user_nickname: str = "Unknown") -> Optional[str]:
         """Parse and handle command from message (case-insensitive)"""
@@ -31,17 +32,18 @@ class CommandHandler:
         
         # Check permission
         if not self.role_checker.has_permission(user_role, command):
-            logging.warning(f"User {user_nickname} ({user_role}) denied access to /{command}")
+            logging.warning("User %s (%s) denied access to /%s", user_nickname, user_role, command)
             return f"❌ You don't have permission to use /{command}"
         
         # Get and execute handler
         handler = self.handlers.get(command)
         if handler:
             try:
-                logging.info(f"Executing /{command} for {user_nickname}")
-                return await handler(user_uuid, argline, user_nickname)
+                logging.info("Executing /%s for %s", command, user_nickname)
+                with COMMAND_SECONDS.labels(command).time():
+                    return await handler(user_uuid, argline, user_nickname)
             except Exception as e:
-                logging.error(f"Command handler error for /{command}: {e}")
+                logging.error("Command handler error for /%s: %s", command, e)
                 return f"❌ Command error: {str(e)[:100]}"
         else:
             return f"❓ Unknown command: /{command}. Type /help for available commands."
@@ -0,0 +1,150 @@
+# hangfm_bot/log_pipeline.py
+# Non-blocking logging: the event loop only enqueues records; a background listener
+# thread formats them (text or JSON lines) and does the I/O
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has - anything else came in through extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, plus any extra={...} fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that hands the record over untouched. The stock prepare() formats
+    the message on the calling thread; here msg % args runs in the listener thread.
+    Records are only used in-process, so nothing needs to be made picklable.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per call site (logger + unformatted message template) for
+    INFO and below, so a chat burst can't flood the log. Warnings and errors
+    always pass. When a site is allowed again, its record notes how many
+    similar messages were dropped.
+    """
+
+    def __init__(self, rate_per_sec: float = 10.0, burst: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        super().__init__()
+        self.clock = clock
+        self.rate = rate_per_sec
+        self.burst = burst if burst is not None else max(rate_per_sec * 2, 1.0)
+        self._buckets: Dict[Tuple[str, str], list] = {}  # key -> [tokens, last_refill, suppressed]
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate <= 0:
+            return True
+        key = (record.name, str(record.msg))
+        now = self.clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) > 10000:
+                self._buckets.clear()  # Unbounded templates (f-strings) - start over rather than grow
+            bucket = self._buckets[key] = [self.burst, now, 0]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] < 1:
+            bucket[2] += 1
+            self.suppressed += 1
+            return False
+        bucket[0] -= 1
+        if bucket[2]:
+            record.suppressed = bucket[2]
+            bucket[2] = 0
+        return True
+
+
+class _SuppressedNoteFilter(logging.Filter):
+    """Appends "(+N similar suppressed)" in text mode (JSON mode gets a field instead)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        count = getattr(record, "suppressed", 0)
+        if count and not getattr(record, "_noted", False):
+            record.msg = f"{record.getMessage()} (+{count} similar suppressed)"
+            record.args = None
+            record._noted = True
+        return True
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_lock = threading.Lock()
+
+
+def setup_logging(level: int = logging.INFO, fmt: str = "text", log_file: str = "", rate_per_sec: float = 10.0) -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue. The root logger gets a LazyQueueHandler
+    (plus the rate limiter); stderr and the optional log file are written by a
+    QueueListener thread. Safe to call again - the old pipeline is stopped first.
+    """
+    global _listener
+    with _lock:
+        stop_logging()
+
+        formatter = JsonLinesFormatter() if fmt.lower() == "json" else logging.Formatter(TEXT_FORMAT)
+        outputs = [logging.StreamHandler(sys.stderr)]
+        if log_file:
+            outputs.append(logging.FileHandler(log_file, encoding="utf-8"))
+        for handler in outputs:
+            handler.setFormatter(formatter)
+            if fmt.lower() != "json":
+                handler.addFilter(_SuppressedNoteFilter())
+
+        records = queue.SimpleQueue()
+        queue_handler = LazyQueueHandler(records)
+        queue_handler.addFilter(RateLimitFilter(rate_per_sec))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+
+        _listener = logging.handlers.QueueListener(records, *outputs, respect_handler_level=True)
+        _listener.start()
+        return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
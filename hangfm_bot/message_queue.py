@@ -1,21 +1,45 @@
 # message_queue.py
 import asyncio
 import logging
+import time
+import weakref
+
+from hangfm_bot.metrics import QUEUE_DEPTH, QUEUE_WAIT
 
 class MessageQueue:
-    def __init__(self, maxsize=100):
+    _instances = weakref.WeakSet()  # Every live queue (one per room) - QUEUE_DEPTH is their total
+
+    def __init__(self, maxsize=100, recorder=None):
         self.queue = asyncio.Queue(maxsize=maxsize)
-        logging.debug(f"MessageQueue initialized with maxsize={maxsize}")
+        self.recorder = recorder  # Optional TraceRecorder - sees every item as it enters
+        MessageQueue._instances.add(self)
+        QUEUE_DEPTH.fn = MessageQueue.total_depth
+        logging.debug("MessageQueue initialized with maxsize=%s", maxsize)
+
+    @staticmethod
+    def total_depth() -> int:
+        return sum(q.queue.qsize() for q in list(MessageQueue._instances))
 
     async def put(self, item):
-        await self.queue.put(item)
+        if self.recorder:
+            self.recorder.record(item)
+        # Stamp the enqueue time so get() can record how long the item waited
+        await self.queue.put((time.perf_counter(), item))
+
+    def put_nowait(self, item):
+        """put() for callers that must never wait; raises asyncio.QueueFull"""
+        if self.recorder:
+            self.recorder.record(item)
+        self.queue.put_nowait((time.perf_counter(), item))
 
     async def get(self):
-        return await self.queue.get()
+        enqueued, item = await self.queue.get()
+        QUEUE_WAIT.observe(time.perf_counter() - enqueued)
+        return item
 
     async def worker(self, handler):
         while True:
-            item = await self.queue.get()
+            item = await self.get()
             try:
                 await handler(item)
             except Exception as e:
@@ -25,6 +49,6 @@ class MessageQueue:
 
     async def run_workers(self, handler, num_workers=1):
         tasks = [asyncio.create_task(self.worker(handler)) for _ in range(num_workers)]
-        logging.info(f"Started {num_workers} message queue worker(s)")
+        logging.info("Started %s message queue worker(s)", num_workers)
         await asyncio.gather(*tasks)
 
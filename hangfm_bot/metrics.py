@@ -0,0 +1,286 @@
+# hangfm_bot/metrics.py
+# In-process counters, gauges and latency histograms with Prometheus text exposition
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds - spans fast in-memory handlers (sub-ms) up to slow AI calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Timer:
+    """Context manager that observes elapsed seconds into a histogram"""
+
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: "Histogram"):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class _Metric:
+    """
+    Base for a metric family. With label names, .labels(*values) returns (and caches)
+    the child for that label set; without, the family itself is the only child.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+
+    def labels(self, *values) -> "_Metric":
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.label_names):
+                raise ValueError(f"{self.name} expects labels {self.label_names}, got {key}")
+            child = self._children[key] = self._new_child()
+        return child
+
+    def remove(self, *values):
+        """Drop the child for a label set (e.g. a room this process stopped serving)"""
+        self._children.pop(tuple(str(v) for v in values), None)
+
+    def _new_child(self) -> "_Metric":
+        return type(self)(self.name, self.help)
+
+    def children(self) -> List[Tuple[Tuple[str, ...], "_Metric"]]:
+        if self.label_names:
+            return list(self._children.items())
+        return [((), self)]
+
+    def _label_text(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.label_names, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self.children():
+            lines.extend(child._samples(self, values))
+        return lines
+
+    def _samples(self, family: "_Metric", values: Tuple[str, ...]) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def _samples(self, family, values):
+        return [f"{family.name}{family._label_text(values)} {_num(self.value)}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), fn: Optional[Callable[[], float]] = None):
+        super().__init__(name, help_text, labels)
+        self.value = 0.0
+        self.fn = fn  # Read the value at scrape time instead of tracking it
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def get(self) -> float:
+        return self.fn() if self.fn else self.value
+
+    def _samples(self, family, values):
+        return [f"{family.name}{family._label_text(values)} {_num(self.get())}"]
+
+
+class Histogram(_Metric):
+    """
+    Fixed-bucket histogram. observe() is a bisect plus three increments;
+    cumulative bucket counts are only computed when scraped.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.bounds = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def _new_child(self):
+        return Histogram(self.name, self.help, buckets=self.bounds)
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> _Timer:
+        """with hist.time(): ... observes the block's duration"""
+        return _Timer(self)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by interpolating inside its bucket"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                if i == len(self.bounds):
+                    return lower  # Past the last bound - best we can say
+                return lower + (self.bounds[i] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.bounds[-1]
+
+    def _samples(self, family, values):
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.bounds + (None,), self.counts):
+            cumulative += bucket_count
+            le = 'le="+Inf"' if bound is None else f'le="{_num(bound)}"'
+            lines.append(f"{family.name}_bucket{family._label_text(values, le)} {cumulative}")
+        lines.append(f"{family.name}_sum{family._label_text(values)} {_num(self.sum)}")
+        lines.append(f"{family.name}_count{family._label_text(values)} {self.count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def latency_summary(family: Histogram) -> List[dict]:
+    """count/total/p50/p95/p99 per label set, most total time first"""
+    rows = []
+    for values, child in family.children():
+        if not child.count:
+            continue
+        rows.append({
+            "labels": values,
+            "count": child.count,
+            "total": child.sum,
+            "p50": child.quantile(0.5),
+            "p95": child.quantile(0.95),
+            "p99": child.quantile(0.99),
+        })
+    rows.sort(key=lambda r: r["total"], reverse=True)
+    return rows
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help_text, labels))
+
+
+def gauge(name: str, help_text: str, labels: Sequence[str] = (), fn: Optional[Callable[[], float]] = None) -> Gauge:
+    return REGISTRY.register(Gauge(name, help_text, labels, fn))
+
+
+def histogram(name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help_text, labels, buckets))
+
+
+# ── event pipeline ────────────────────────────────────────────────
+
+QUEUE_WAIT = histogram("hangfm_queue_wait_seconds", "Time events spend in the MessageQueue before processing")
+QUEUE_DEPTH = gauge("hangfm_queue_depth", "Events waiting in the MessageQueue")
+EVENT_SECONDS = histogram("hangfm_event_seconds", "process_queue_item time per event type", ["event"])
+EVENT_ERRORS = counter("hangfm_event_errors_total", "Events that raised while processing", ["event"])
+# Event types the bot handles; anything else the relay sends is labelled "other"
+EVENT_TYPES = frozenset({
+    "chatMessage", "statefulMessage", "statelessMessage", "playedSong", "votedOnSong",
+    "userJoined", "userLeft", "addedDj", "removedDj", "roomStateUpdated",
+})
+
+
+def event_label(event_type) -> str:
+    """Label value for EVENT_SECONDS / EVENT_ERRORS, keeping the series count bounded"""
+    return event_type if event_type in EVENT_TYPES else "other"
+
+
+COMMAND_SECONDS = histogram("hangfm_command_seconds", "Command handler time", ["command"])
+AI_SECONDS = histogram("hangfm_ai_seconds", "AI provider call latency", ["provider"])
+AI_ERRORS = counter("hangfm_ai_errors_total", "Failed AI provider calls", ["provider"])
+SEND_SECONDS = histogram("hangfm_cometchat_send_seconds", "CometChat send latency", ["outcome"])
+FLOOD_BLOCKED = counter("hangfm_flood_blocked_total", "Chat messages kept from command/AI handling by flood control", ["reason"])
+FLOOD_MUTES = counter("hangfm_flood_mutes_total", "Users muted by flood control")
+LINK_CHECKS = counter("hangfm_link_checks_total", "Link verdict lookups, by whether the URL verdict was cached", ["cache"])
+LINK_BLOCKED = counter("hangfm_link_blocked_total", "Chat messages stopped for a suspicious or explicit link", ["verdict"])
+
+# ── platform adapters ─────────────────────────────────────────────
+
+PLATFORM_CONNECTED = gauge("hangfm_platform_rooms_connected", "Socket-backed rooms currently registered, per platform", ["platform"])
+PLATFORM_RECONNECTS = counter("hangfm_platform_reconnects_total", "Platform socket reconnect attempts", ["platform"])
+PLATFORM_SEND_SECONDS = histogram("hangfm_platform_send_seconds", "Chat send round trip on socket platforms", ["platform", "outcome"])
+PLATFORM_EVENTS_DROPPED = counter("hangfm_platform_events_dropped_total", "Socket events dropped because the room queue was full", ["platform"])
+
+# ── stage automation ──────────────────────────────────────────────
+
+STAGE_ACTIONS = counter("hangfm_stage_actions_total", "AFK warnings/removals, auto hop up/down and auto upvotes", ["action"])
+
+# ── relay connections (per hang.fm room, by short room id) ────────
+
+RELAY_CONNECTED = gauge("hangfm_relay_connected", "1 while the room's relay reports its hang.fm socket connected", ["room"])
+RELAY_RECONNECTS = counter("hangfm_relay_reconnects_total", "Relay socket reconnects seen by the health check", ["room"])
+RELAY_RESYNCS = counter("hangfm_relay_resyncs_total", "Room-state fetches after the relay (re)connected", ["outcome"])
+ROOM_STATE_AGE = gauge("hangfm_room_state_age_seconds", "Seconds since the room state was last synced from the relay (-1 = never)", ["room"])
+
+RELAY_ACTION_SECONDS = histogram("hangfm_relay_action_seconds", "Socket action round trip through the relay, retries included", ["action", "outcome"])
+RELAY_ACTION_RETRIES = counter("hangfm_relay_action_retries_total", "Idempotent socket actions re-sent after a timeout or dropped connection", ["action"])
+
+# ── sharding (supervisor process) ─────────────────────────────────
+
+SHARD_WORKERS = gauge("hangfm_shard_workers_live", "Worker processes currently serving rooms")
+SHARD_RESTARTS = counter("hangfm_shard_worker_restarts_total", "Worker processes restarted after a crash or hang")
+SHARD_REHOMED = counter("hangfm_shard_rooms_rehomed_total", "Rooms moved to a different worker")
+SHARD_UNROUTED = counter("hangfm_shard_events_unrouted_total", "Relay events with no live worker to take them")
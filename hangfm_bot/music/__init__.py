@@ -1,5 +1,10 @@
 # Music discovery system
 from .genre_classifier import GenreClassifier
+from .metadata_service import MetadataService, MetadataCache
+from .spotify_auth import SpotifyTokenManager
+from .recently_played import RecentlyPlayed
+from .discovery import DiscoveryEngine
+from .taste_profiles import TasteProfiles
 
-__all__ = ['GenreClassifier']
+__all__ = ['GenreClassifier', 'MetadataService', 'MetadataCache', 'SpotifyTokenManager', 'RecentlyPlayed', 'DiscoveryEngine', 'TasteProfiles']
 
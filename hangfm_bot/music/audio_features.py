@@ -0,0 +1,340 @@
+# hangfm_bot/music/audio_features.py
+# Optional audio-feature genre hints: librosa extraction in a process pool,
+# memory-mapped feature store, nearest-centroid genre guess
+import asyncio
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+import numpy as np
+
+# librosa is heavy to import - only check it's installed here, import it in the worker processes
+LIBROSA_AVAILABLE = importlib.util.find_spec("librosa") is not None
+
+LOG = logging.getLogger("audio_features")
+
+STORE_DIR = Path(os.getenv("AUDIO_FEATURES_DIR", "audio_features"))
+
+N_MFCC = 13
+# MFCC means + stds, spectral centroid/rolloff/bandwidth, zero-crossing rate, tempo
+FEATURE_DIM = N_MFCC * 2 + 5
+
+# What a hinted genre adds as (genre, subgenre) - GenreClassifier only takes
+# Alternative Metal together with a Nu-Metal subgenre
+HINT_TAGS = {
+    "Alternative Metal": ("Alternative Metal", "Nu-Metal"),
+}
+
+
+def extract_features(path: str, duration: float = 30.0) -> Optional[np.ndarray]:
+    """
+    Compact feature vector for one audio file (runs in a worker process).
+    Returns None if the file can't be decoded.
+    """
+    if not LIBROSA_AVAILABLE:
+        return None
+    try:
+        import librosa
+
+        y, sr = librosa.load(path, sr=22050, mono=True, duration=duration)
+        if not len(y):
+            return None
+        mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=N_MFCC)
+        centroid = librosa.feature.spectral_centroid(y=y, sr=sr).mean()
+        rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr).mean()
+        bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr).mean()
+        zcr = librosa.feature.zero_crossing_rate(y).mean()
+        tempo = float(np.atleast_1d(librosa.beat.beat_track(y=y, sr=sr)[0])[0])
+        return np.concatenate([
+            mfcc.mean(axis=1),
+            mfcc.std(axis=1),
+            # Scale the Hz-valued features down so no single dimension dominates distances
+            [centroid / 1000.0, rolloff / 1000.0, bandwidth / 1000.0, zcr * 10.0, tempo / 100.0],
+        ]).astype(np.float32)
+    except Exception as e:
+        LOG.debug(f"Feature extraction failed for {path}: {e}")
+        return None
+
+
+class FeatureStore:
+    """
+    Fixed-width float32 vectors in a memory-mapped file (features.f32), one row per track.
+    index.json maps track ID -> row and holds any known genre label. put()/label()
+    only mark the store dirty; save() (run in a worker thread) flushes both.
+    """
+
+    def __init__(self, data_dir: Path = STORE_DIR, dim: int = FEATURE_DIM, initial_rows: int = 1024):
+        self.data_dir = Path(data_dir)
+        self.dim = dim
+        self.rows: Dict[str, int] = {}
+        self.labels: Dict[str, str] = {}
+        self.revision = 0  # Bumped on every put/label so models know when to refit
+        self.dirty = False
+        (self.data_dir / "previews").mkdir(parents=True, exist_ok=True)
+        self.vectors_file = self.data_dir / "features.f32"
+        self.index_file = self.data_dir / "index.json"
+        self._load_index()
+        self.capacity = 0
+        self.vectors = None
+        self._map(max(initial_rows, len(self.rows)))
+
+    def _load_index(self):
+        if not self.index_file.exists():
+            return
+        try:
+            with self.index_file.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.rows = data.get("rows", {})
+            self.labels = data.get("labels", {})
+            LOG.info(f"💾 Loaded audio features for {len(self.rows)} tracks")
+        except Exception as e:
+            LOG.warning(f"Failed to load audio feature index: {e}")
+
+    def save(self):
+        """Flush vectors and write the index if anything changed. Safe to run in a worker thread."""
+        if not self.dirty:
+            return
+        self.dirty = False
+        # Tracks added on the loop meanwhile land in the next save
+        index = {"dim": self.dim, "rows": dict(self.rows), "labels": dict(self.labels)}
+        try:
+            self.vectors.flush()
+            tmp = self.index_file.with_suffix(".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                f.write(json.dumps(index))
+            tmp.replace(self.index_file)
+        except Exception as e:
+            self.dirty = True
+            LOG.error(f"Failed to save audio feature index: {e}")
+
+    def _map(self, capacity: int):
+        """(Re)map the vectors file with room for `capacity` rows"""
+        if self.vectors is not None:
+            self.vectors.flush()
+            del self.vectors
+        size = capacity * self.dim * 4
+        with open(self.vectors_file, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self.vectors = np.memmap(self.vectors_file, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self.capacity = capacity
+
+    def __contains__(self, track_id: str) -> bool:
+        return track_id in self.rows
+
+    def get(self, track_id: str) -> Optional[np.ndarray]:
+        row = self.rows.get(track_id)
+        return None if row is None else np.array(self.vectors[row])
+
+    def put(self, track_id: str, vector: np.ndarray, label: Optional[str] = None):
+        """Store a vector (and optional genre label) for a track"""
+        row = self.rows.get(track_id)
+        if row is None:
+            row = len(self.rows)
+            if row >= self.capacity:
+                self._map(self.capacity * 2)
+            self.rows[track_id] = row
+        self.vectors[row] = vector
+        if label:
+            self.labels[track_id] = label
+        self.revision += 1
+        self.dirty = True
+
+    def label(self, track_id: str, genre: str):
+        """Attach a known genre to a track (used once its vector is stored, if it isn't yet)"""
+        if self.labels.get(track_id) != genre:
+            self.labels[track_id] = genre
+            self.revision += 1
+            self.dirty = True
+
+    def labeled(self) -> Tuple[np.ndarray, List[str]]:
+        """All labeled vectors and their genres"""
+        ids = [t for t in self.labels if t in self.rows]
+        if not ids:
+            return np.zeros((0, self.dim), dtype=np.float32), []
+        rows = [self.rows[t] for t in ids]
+        return np.asarray(self.vectors[rows]), [self.labels[t] for t in ids]
+
+    def close(self):
+        if self.vectors is not None:
+            self.save()
+
+
+class CentroidModel:
+    """Nearest-centroid genre guess over standardized feature vectors"""
+
+    def __init__(self):
+        self.genres: List[str] = []
+        self.centroids = None
+        self.mean = None
+        self.std = None
+
+    def fit(self, vectors: np.ndarray, labels: List[str]) -> bool:
+        if not len(labels):
+            return False
+        self.mean = vectors.mean(axis=0)
+        self.std = vectors.std(axis=0)
+        self.std[self.std == 0] = 1.0
+        scaled = (vectors - self.mean) / self.std
+        labels = np.asarray(labels)
+        self.genres = sorted(set(labels.tolist()))
+        self.centroids = np.stack([scaled[labels == g].mean(axis=0) for g in self.genres])
+        return True
+
+    def predict(self, vector: np.ndarray) -> Optional[Tuple[str, float]]:
+        """(genre, distance) of the closest centroid"""
+        if self.centroids is None:
+            return None
+        scaled = (vector - self.mean) / self.std
+        distances = np.linalg.norm(self.centroids - scaled, axis=1)
+        best = int(np.argmin(distances))
+        return self.genres[best], float(distances[best])
+
+
+class AudioGenreHinter:
+    """
+    Analyzes preview clips off the event loop (process pool), caches each track's
+    vector in the FeatureStore and guesses a genre from labeled tracks. A preview
+    can be a local file or an http(s) URL (e.g. Spotify's preview_url), which is
+    downloaded to a temporary file for the extraction.
+    """
+
+    def __init__(
+        self,
+        store: Optional[FeatureStore] = None,
+        max_workers: int = 2,
+        max_distance: float = 6.0,
+        download_timeout: float = 10.0,
+        max_preview_bytes: int = 5 * 2**20,
+    ):
+        self.store = store if store is not None else FeatureStore()
+        self.max_workers = max_workers
+        self.max_distance = max_distance  # Further than this from every centroid = no hint
+        self.download_timeout = download_timeout
+        self.max_preview_bytes = max_preview_bytes
+        self.model = CentroidModel()
+        self._model_revision = -1
+        self._executor = None
+        self.session = None
+        if not LIBROSA_AVAILABLE:
+            LOG.warning("librosa not available - audio genre hints will be disabled")
+
+    @property
+    def enabled(self) -> bool:
+        return LIBROSA_AVAILABLE
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def _get_session(self):
+        """Get or create aiohttp session"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+        return self.session
+
+    async def download(self, track_id: str, url: str) -> Optional[Path]:
+        """Fetch a preview clip into the store's previews/ folder (caller deletes it)"""
+        path = self.store.data_dir / "previews" / f"{hashlib.sha1(track_id.encode()).hexdigest()}.audio"
+        try:
+            session = await self._get_session()
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=self.download_timeout)) as resp:
+                if resp.status != 200:
+                    return None
+                data = await resp.content.read(self.max_preview_bytes + 1)
+            if not data or len(data) > self.max_preview_bytes:
+                return None
+            await asyncio.to_thread(path.write_bytes, data)
+            return path
+        except Exception as e:
+            LOG.debug(f"Preview download failed for {track_id}: {e}")
+            return None
+
+    async def features(self, track_id: str, preview: str) -> Optional[np.ndarray]:
+        """Cached vector for a track, extracting it in the process pool the first time"""
+        cached = self.store.get(track_id)
+        if cached is not None:
+            return cached
+        if not self.enabled or not preview:
+            return None
+
+        downloaded = None
+        if preview.startswith(("http://", "https://")):
+            downloaded = await self.download(track_id, preview)
+            if downloaded is None:
+                return None
+            preview = str(downloaded)
+        elif not os.path.exists(preview):
+            return None
+
+        try:
+            loop = asyncio.get_running_loop()
+            vector = await loop.run_in_executor(self._get_executor(), extract_features, preview)
+        finally:
+            if downloaded is not None:
+                downloaded.unlink(missing_ok=True)  # Only the vector is kept
+        if vector is not None:
+            self.store.put(track_id, vector)
+        return vector
+
+    async def learn(self, track_id: str, genre: str, preview: Optional[str] = None):
+        """
+        Label a track with a genre we know from metadata, analyzing its preview
+        first if it isn't in the store yet. Labeled vectors build the centroids.
+        """
+        if preview and track_id not in self.store:
+            await self.features(track_id, preview)
+        self.store.label(track_id, genre)
+
+    def _ensure_model(self) -> bool:
+        if self.store.revision != self._model_revision:
+            vectors, labels = self.store.labeled()
+            self.model.fit(vectors, labels)
+            self._model_revision = self.store.revision
+        return self.model.centroids is not None
+
+    async def hint(self, track_id: str, preview: str) -> Optional[str]:
+        """Nearest-centroid genre for a track, or None if unsure/unavailable"""
+        vector = await self.features(track_id, preview)
+        if vector is None or not self._ensure_model():
+            return None
+        genre, distance = self.model.predict(vector)
+        if distance > self.max_distance:
+            return None
+        LOG.debug(f"🎚️ Audio hint for {track_id}: {genre} (distance {distance:.2f})")
+        return genre
+
+    async def classify_with_hint(self, classifier, metadata: dict, track_id: str, preview: str) -> tuple:
+        """
+        GenreClassifier result for merged metadata; when sources gave no target
+        genre, retry with the audio hint added as an extra genre and subgenre
+        (see HINT_TAGS).
+        """
+        genres = list(metadata.get("genres") or [])
+        subgenres = list(metadata.get("subgenres") or [])
+        result = classifier.filter_to_target_genres(genres, subgenres)
+        if result[0]:
+            return result
+        hinted = await self.hint(track_id, preview)
+        if not hinted:
+            return result
+        genre, subgenre = HINT_TAGS.get(hinted, (hinted, hinted))
+        return classifier.filter_to_target_genres(genres + [genre], subgenres + [subgenre])
+
+    async def save(self):
+        """Periodic save of the feature store, off the loop"""
+        await asyncio.to_thread(self.store.save)
+
+    async def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.session and not self.session.closed:
+            await self.session.close()
+        await asyncio.to_thread(self.store.close)
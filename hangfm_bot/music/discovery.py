@@ -0,0 +1,307 @@
+# hangfm_bot/music/discovery.py
+# Song discovery with pre-warmed, pre-verified candidate pools per target genre
+import asyncio
+import logging
+import random
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set
+
+import aiohttp
+import numpy as np
+
+from hangfm_bot.music.genre_classifier import GenreClassifier
+from hangfm_bot.music.metadata_service import MetadataService, normalize_key
+from hangfm_bot.music.recently_played import RecentlyPlayed
+from hangfm_bot.music.spotify_auth import SpotifyTokenManager
+
+LOG = logging.getLogger("discovery")
+
+
+class CandidateSource:
+    """Produces raw (unverified) candidate tracks for a target genre"""
+
+    async def fetch(self, genre: str, subgenre: str, year_start: int, year_end: int) -> List[dict]:
+        """Return a list of {"artist": ..., "track": ...} dicts"""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class SpotifyGenreSearch(CandidateSource):
+    """Spotify track search by genre tag and year range"""
+
+    def __init__(self, token_manager: SpotifyTokenManager, base_url: str = "https://api.spotify.com", page_size: int = 20, timeout: float = 5.0):
+        self.tokens = token_manager
+        self.base_url = base_url.rstrip("/")
+        self.page_size = page_size
+        self.timeout = timeout
+        self.session = None
+
+    async def _get_session(self):
+        """Get or create aiohttp session"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+        return self.session
+
+    async def fetch(self, genre, subgenre, year_start, year_end):
+        token = await self.tokens.get_token()
+        if not token:
+            return []
+
+        # Random decade slice + page offset so refills don't keep returning the same tracks
+        start = random.randint(year_start, max(year_start, year_end - 9))
+        params = {
+            "q": f'genre:"{subgenre.lower()}" year:{start}-{min(start + 9, year_end)}',
+            "type": "track",
+            "limit": str(self.page_size),
+            "offset": str(random.randint(0, 200)),
+        }
+        session = await self._get_session()
+        async with session.get(
+            f"{self.base_url}/v1/search",
+            params=params,
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        ) as resp:
+            if resp.status == 401:
+                self.tokens.invalidate(token)
+                return []
+            if resp.status != 200:
+                return []
+            data = await resp.json()
+
+        candidates = []
+        for item in (data.get("tracks") or {}).get("items") or []:
+            artists = item.get("artists") or []
+            if artists and item.get("name"):
+                candidate = {"artist": artists[0].get("name"), "track": item["name"]}
+                if item.get("preview_url"):
+                    candidate["preview_url"] = item["preview_url"]  # 30s clip for audio genre hints
+                candidates.append(candidate)
+        return candidates
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+
+class DiscoveryEngine:
+    """
+    Keeps a pool of verified candidate songs for each target genre, topped up
+    in the background. Picking the next song is an in-memory pop that skips
+    anything played recently - no network calls on the hot path.
+    """
+
+    TARGET_GENRES = {
+        'Alternative Hip Hop': GenreClassifier.ALT_HIP_HOP_SUBGENRES,
+        'Alternative Rock': GenreClassifier.ALT_ROCK_SUBGENRES,
+        'Alternative Metal': GenreClassifier.ALT_METAL_SUBGENRES,
+    }
+
+    def __init__(
+        self,
+        source: CandidateSource,
+        metadata_service: MetadataService,
+        classifier: GenreClassifier,
+        recently_played: RecentlyPlayed,
+        year_start: int = 1950,
+        year_end: int = 2025,
+        pool_size: int = 20,
+        low_water: int = 5,
+        refill_interval: float = 300.0,
+        audio_hinter=None,
+        verify_concurrency: int = 2,
+    ):
+        self.source = source
+        self.metadata = metadata_service
+        self.classifier = classifier
+        self.recently_played = recently_played
+        self.year_start = year_start
+        self.year_end = year_end
+        self.pool_size = pool_size
+        self.low_water = low_water
+        self.refill_interval = refill_interval
+        self.audio_hinter = audio_hinter  # Optional AudioGenreHinter for candidates with a preview clip
+        # Refills verify dozens of candidates; cap the lookups in flight so rate-limited
+        # sources (MusicBrainz: ~1/s) keep up instead of being skipped
+        self._verify_slots = asyncio.Semaphore(max(1, verify_concurrency))
+        self.pools: Dict[str, Deque[dict]] = {genre: deque() for genre in self.TARGET_GENRES}
+        self._pooled: Set[str] = set()  # normalized keys currently in any pool
+        self._ranking = None  # (taste, candidates, CandidateMatrix) for the pools as of the last refill
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.picks = 0
+        self.misses = 0
+        LOG.debug(f"DiscoveryEngine initialized for {list(self.pools)}")
+
+    @classmethod
+    def from_settings(cls, metadata_service, classifier, recently_played, settings=None, audio_hinter=None) -> "DiscoveryEngine":
+        """Build the engine from .env settings (audio_hinter is shared by the caller, who closes it)"""
+        if settings is None:
+            from hangfm_bot.config import settings
+        tokens = SpotifyTokenManager.for_credentials(settings.spotify_client_id, settings.spotify_client_secret)
+        return cls(
+            SpotifyGenreSearch(tokens, timeout=settings.metadata_source_timeout_sec),
+            metadata_service,
+            classifier,
+            recently_played,
+            year_start=settings.music_year_start,
+            year_end=settings.music_year_end,
+            audio_hinter=audio_hinter,
+            verify_concurrency=settings.discovery_verify_concurrency,
+        )
+
+    def start(self):
+        """Start the background refill loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refill_loop())
+            LOG.info("🎲 Discovery pools warming up...")
+
+    async def stop(self):
+        """Stop refilling and close the candidate source"""
+        if self._task:
+            self._task.cancel()
+        await self.source.close()
+
+    def pool_sizes(self) -> Dict[str, int]:
+        return {genre: len(pool) for genre, pool in self.pools.items()}
+
+    def pick(self, genre: Optional[str] = None) -> Optional[dict]:
+        """
+        Pop the next playable candidate (from `genre`, or the fullest pool).
+        Stale candidates that were played since they were pooled are dropped.
+        """
+        genres = [genre] if genre else sorted(self.pools, key=lambda g: len(self.pools[g]), reverse=True)
+        try:
+            for name in genres:
+                pool = self.pools.get(name)
+                while pool:
+                    candidate = pool.popleft()
+                    self._pooled.discard(candidate["key"])
+                    if not self.recently_played.is_repeat(candidate["artist"], candidate["track"]):
+                        self.picks += 1
+                        return candidate
+            self.misses += 1
+            return None
+        finally:
+            if any(len(pool) < self.low_water for pool in self.pools.values()):
+                self._wakeup.set()
+
+    def pick_for_lineup(self, taste, users, genre: Optional[str] = None) -> Optional[dict]:
+        """
+        Pick the pooled candidate that best fits the DJs on stage (TasteProfiles ranking).
+        Falls back to a plain pick() when nobody on stage has a profile yet.
+        """
+        if taste.lineup_vector(users) is None:
+            return self.pick(genre)
+
+        # Candidate vectors are built once per refill; picks only mask out what's gone
+        if self._ranking is None or self._ranking[0] is not taste:
+            candidates = [c for pool in self.pools.values() for c in pool]
+            self._ranking = (taste, candidates, taste.candidate_matrix(candidates))
+        _, candidates, matrix = self._ranking
+
+        best = None
+        scores = taste.score(candidates, users, matrix)
+        for i in np.argsort(-scores, kind="stable"):
+            candidate = candidates[i]
+            if candidate["key"] not in self._pooled or (genre and candidate["genre"] != genre):
+                continue  # Already picked, or not the genre asked for
+            if self.recently_played.is_repeat(candidate["artist"], candidate["track"]):
+                continue
+            try:
+                self.pools[candidate["genre"]].remove(candidate)
+            except ValueError:
+                continue  # Picked and re-fetched by a refill that's still running
+            best = candidate
+            break
+        if best is None:
+            return self.pick(genre)
+
+        self._pooled.discard(best["key"])
+        self.picks += 1
+        if len(self.pools[best["genre"]]) < self.low_water:
+            self._wakeup.set()
+        return best
+
+    async def _refill_loop(self):
+        while True:
+            try:
+                await self.refill()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LOG.error(f"Discovery refill error: {e}")
+            # Sleep until a pick drains a pool or the interval passes
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.refill_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def refill(self):
+        """Top up every pool that's below pool_size (pools refill concurrently)"""
+        await asyncio.gather(*(
+            self._refill_pool(genre) for genre, pool in self.pools.items() if len(pool) < self.pool_size
+        ))
+        self._ranking = None  # Rebuilt from the new pools on the next lineup pick
+
+    async def _refill_pool(self, genre: str, max_rounds: int = 3):
+        pool = self.pools[genre]
+        subgenres = sorted(self.TARGET_GENRES[genre])
+        for _ in range(max_rounds):
+            if len(pool) >= self.pool_size:
+                return
+            raw = await self.source.fetch(genre, random.choice(subgenres), self.year_start, self.year_end)
+            fresh = []
+            for candidate in raw:
+                key = normalize_key(candidate.get("artist"), candidate.get("track"))
+                if key in self._pooled or self.recently_played.is_repeat(candidate["artist"], candidate["track"]):
+                    continue
+                self._pooled.add(key)
+                fresh.append(dict(candidate, key=key))
+
+            verified = await asyncio.gather(*(self._verify(genre, c) for c in fresh))
+            for candidate, ok in zip(fresh, verified):
+                if ok and len(pool) < self.pool_size:
+                    pool.append(candidate)
+                else:
+                    self._pooled.discard(candidate["key"])
+        LOG.debug(f"🎲 {genre} pool: {len(pool)}/{self.pool_size}")
+
+    async def _verify(self, genre: str, candidate: dict) -> bool:
+        """Confirm genre and year through the metadata service (cached, so cheap on repeats)"""
+        try:
+            async with self._verify_slots:
+                meta = await self.metadata.lookup(candidate["artist"], candidate["track"])
+        except Exception as e:
+            LOG.debug(f"Verify failed for {candidate['artist']} - {candidate['track']}: {e}")
+            return False
+
+        target_genres, target_subgenres = self.metadata.classify(meta, self.classifier)
+        confirmed = self._in_genre(genre, target_genres, target_subgenres)
+        preview = candidate.get("preview_url")
+        if not confirmed and self.audio_hinter and preview:
+            # Sources know no target genre - let the audio features break the tie
+            target_genres, target_subgenres = await self.audio_hinter.classify_with_hint(
+                self.classifier, meta, candidate["key"], preview
+            )
+            if not self._in_genre(genre, target_genres, target_subgenres):
+                return False
+        elif not confirmed:
+            return False
+
+        year = meta.get("year")
+        if year and year.isdigit() and not (self.year_start <= int(year) <= self.year_end):
+            return False
+
+        candidate.update({"album": meta.get("album"), "year": year, "genre": genre, "subgenres": sorted(target_subgenres)})
+        if confirmed and self.audio_hinter and preview:
+            # Metadata-confirmed tracks become labeled examples for the centroids
+            await self.audio_hinter.learn(candidate["key"], genre, preview)
+        return True
+
+    @staticmethod
+    def _in_genre(genre: str, target_genres, target_subgenres) -> bool:
+        return genre in target_genres or (genre == 'Alternative Metal' and 'Nu-Metal' in target_subgenres)
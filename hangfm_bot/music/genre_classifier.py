@@ -1,6 +1,18 @@
 # genre_classifier.py
 import logging
-from typing import List, Tuple, Set
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Sequence, Tuple, Set, Union
+
+from hangfm_bot.utils.pattern_matcher import PatternMatcher
+
+# Lexicon names used inside the compiled matcher
+_HIP_HOP = "alt_hip_hop"
+_ROCK = "alt_rock"
+_NU_METAL = "nu_metal"
+_GENRE_HIP_HOP = "genre_alt_hip_hop"
+_GENRE_ROCK = "genre_alt_rock"
+_GENRE_METAL = "genre_alt_metal"
+
 
 class GenreClassifier:
     """
@@ -29,44 +41,62 @@ class GenreClassifier:
         'Rap Metal', 'Progressive Metal', 'Alternative Metal (generic)'
     }
     
-    def __init__(self):
+    NU_METAL_VARIANTS = ('nu-metal', 'nu metal', 'nü-metal')
+
+    def __init__(self, cache_size: int = 4096):
+        # Compile every rule into one substring automaton (no word boundaries,
+        # same semantics as the old `sg.lower() in normalized` checks)
+        self._matcher = PatternMatcher({
+            _HIP_HOP: self.ALT_HIP_HOP_SUBGENRES,
+            _ROCK: self.ALT_ROCK_SUBGENRES,
+            _NU_METAL: self.NU_METAL_VARIANTS,
+            _GENRE_HIP_HOP: ('alternative hip hop', 'alt hip hop'),
+            _GENRE_ROCK: ('alternative rock', 'alt rock'),
+            _GENRE_METAL: ('alternative metal', 'alt metal'),
+        }, word_boundary=False)
+        self._categories = lru_cache(maxsize=cache_size)(self._categorize)
         logging.debug("GenreClassifier initialized with strict genre rules")
 
+    def _categorize(self, normalized: str) -> FrozenSet[str]:
+        """Every rule lexicon a normalized genre string hits (memoized per instance)"""
+        return frozenset(hit.lexicon for hit in self._matcher.find_all(normalized))
+
+    def categories(self, text: str) -> FrozenSet[str]:
+        """Normalize text and return its cached rule categories"""
+        if not text or not isinstance(text, str):
+            return frozenset()
+        return self._categories(text.lower().strip())
+
+    def cache_info(self):
+        """LRU statistics for the normalized-string memo"""
+        return self._categories.cache_info()
+
     def is_alt_hip_hop_subgenre(self, subgenre: str) -> bool:
         """Check if subgenre belongs to Alternative Hip Hop"""
-        if not subgenre or not isinstance(subgenre, str):
-            return False
-        normalized = subgenre.lower().strip()
-        return any(sg.lower() in normalized for sg in self.ALT_HIP_HOP_SUBGENRES)
+        return _HIP_HOP in self.categories(subgenre)
 
     def is_alt_rock_subgenre(self, subgenre: str) -> bool:
         """Check if subgenre belongs to Alternative Rock (including Shoegaze)"""
-        if not subgenre or not isinstance(subgenre, str):
-            return False
-        normalized = subgenre.lower().strip()
-        return any(sg.lower() in normalized for sg in self.ALT_ROCK_SUBGENRES)
+        return _ROCK in self.categories(subgenre)
 
     def is_nu_metal_subgenre(self, subgenre: str) -> bool:
         """Check if subgenre is Nu-Metal (STRICT - only nu-metal variants)"""
-        if not subgenre or not isinstance(subgenre, str):
-            return False
-        normalized = subgenre.lower().strip()
-        return 'nu-metal' in normalized or 'nu metal' in normalized or 'nü-metal' in normalized
+        return _NU_METAL in self.categories(subgenre)
 
     def is_target_genre(self, genre: str, subgenre: str = None) -> bool:
         """Check if genre/subgenre combination is in target scope"""
         if not genre:
             return False
         
-        normalized_genre = genre.lower().strip()
+        cats = self.categories(genre)
         
-        if 'alternative hip hop' in normalized_genre or 'alt hip hop' in normalized_genre:
+        if _GENRE_HIP_HOP in cats:
             return self.is_alt_hip_hop_subgenre(subgenre) if subgenre else True
         
-        if 'alternative rock' in normalized_genre or 'alt rock' in normalized_genre:
+        if _GENRE_ROCK in cats:
             return self.is_alt_rock_subgenre(subgenre) if subgenre else True
         
-        if 'alternative metal' in normalized_genre or 'alt metal' in normalized_genre:
+        if _GENRE_METAL in cats:
             # For Alternative Metal, ONLY accept Nu-Metal subgenre
             return self.is_nu_metal_subgenre(subgenre) if subgenre else False
         
@@ -74,28 +104,73 @@ class GenreClassifier:
 
     def filter_to_target_genres(self, genres: List[str], subgenres: List[str]) -> Tuple[Set[str], Set[str]]:
         """Filter genres/subgenres to only target ones"""
+        return self._assemble(genres, subgenres, self.categories)
+
+    @staticmethod
+    def _assemble(genres, subgenres, categories) -> Tuple[Set[str], Set[str]]:
+        """One song's target genres/subgenres; categories(text) gives a string's rule categories"""
         target_genres = set()
         target_subgenres = set()
         
+        # Nu-metal check is per song, not per genre
+        has_nu_metal = None
+        
         for genre in genres:
-            normalized = genre.lower().strip()
+            cats = categories(genre)
             
-            if 'alternative hip hop' in normalized or 'alt hip hop' in normalized:
+            if _GENRE_HIP_HOP in cats:
                 target_genres.add('Alternative Hip Hop')
-            elif 'alternative rock' in normalized or 'alt rock' in normalized:
+            elif _GENRE_ROCK in cats:
                 target_genres.add('Alternative Rock')
-            elif 'alternative metal' in normalized or 'alt metal' in normalized:
+            elif _GENRE_METAL in cats:
                 # Only add if we have nu-metal subgenres
-                if any(self.is_nu_metal_subgenre(sg) for sg in subgenres):
+                if has_nu_metal is None:
+                    has_nu_metal = any(_NU_METAL in categories(sg) for sg in subgenres)
+                if has_nu_metal:
                     target_genres.add('Alternative Metal')
         
         for subgenre in subgenres:
-            if self.is_alt_hip_hop_subgenre(subgenre):
+            cats = categories(subgenre)
+            if _HIP_HOP in cats or _ROCK in cats:
                 target_subgenres.add(subgenre)
-            elif self.is_alt_rock_subgenre(subgenre):
-                target_subgenres.add(subgenre)
-            elif self.is_nu_metal_subgenre(subgenre):
+            elif _NU_METAL in cats:
                 target_subgenres.add('Nu-Metal')
         
         return target_genres, target_subgenres
 
+    def classify_batch(
+        self,
+        items: Iterable[Tuple[Union[str, Sequence[str], None], Sequence[str]]]
+    ) -> List[Tuple[Set[str], Set[str]]]:
+        """
+        Classify many (genre(s), subgenres) tuples, e.g. when backfilling song history.
+        Same results as calling filter_to_target_genres per row; a bare genre string
+        and non-string entries are accepted. Every distinct string in the batch is
+        normalized and matched once, then the rows are assembled from that table.
+        """
+        rows = [((genres,) if isinstance(genres, str) else tuple(genres or ()), tuple(subgenres or ())) for genres, subgenres in items]
+
+        strings = set()
+        for i, (genres, subgenres) in enumerate(rows):
+            try:
+                strings.update(genres)
+                strings.update(subgenres)
+            except TypeError:  # Unhashable entries (dicts, lists) never match - drop them
+                rows[i] = genres, subgenres = [g for g in genres if isinstance(g, str)], [s for s in subgenres if isinstance(s, str)]
+                strings.update(genres)
+                strings.update(subgenres)
+
+        # A local table rather than the LRU memo, so a large batch doesn't churn it
+        by_normalized: Dict[str, FrozenSet[str]] = {}
+        table = {text: self._table_entry(text, by_normalized) for text in strings}
+        lookup = table.__getitem__
+        return [self._assemble(genres, subgenres, lookup) for genres, subgenres in rows]
+
+    def _table_entry(self, text, by_normalized: Dict[str, FrozenSet[str]]) -> FrozenSet[str]:
+        if not text or not isinstance(text, str):
+            return frozenset()
+        normalized = text.lower().strip()
+        cats = by_normalized.get(normalized)
+        if cats is None:
+            cats = by_normalized[normalized] = self._categorize(normalized)
+        return cats
@@ -0,0 +1,549 @@
+# hangfm_bot/music/metadata_service.py
+# Concurrent song metadata lookup (Spotify, Discogs, MusicBrainz, Wikipedia) with a persistent cache
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from hangfm_bot.music.spotify_auth import SPOTIFY_AUTH_URL, SpotifyTokenManager
+from hangfm_bot.utils.single_flight import SingleFlight
+
+LOG = logging.getLogger("metadata")
+
+CACHE_FILE = Path(os.getenv("METADATA_CACHE_FILE", "metadata_cache.json"))
+
+USER_AGENT = "HangFM-Bot/1.0 (https://hang.fm)"
+
+_WS = re.compile(r"\s+")
+_YEAR = re.compile(r"(\d{4})")
+_INFOBOX = re.compile(r"\{\{\s*infobox\s+(?:song|single)\b", re.IGNORECASE)
+_WIKI_LINK = re.compile(r"\[\[(?:[^\]|]*\|)?([^\]]*)\]\]")
+_WIKI_JUNK = re.compile(r"<ref[^>]*/>|<ref[^>]*>.*?</ref>|<!--.*?-->|<[^>]+>|'{2,}", re.DOTALL)
+
+
+def normalize_key(artist: str, track: str) -> str:
+    """Cache key for an artist/track pair (case and whitespace insensitive)"""
+    artist = _WS.sub(" ", (artist or "").lower()).strip()
+    track = _WS.sub(" ", (track or "").lower()).strip()
+    return f"{artist}|{track}"
+
+
+def _year(value) -> Optional[str]:
+    """Pull a 4-digit year out of a date string / int"""
+    if value is None:
+        return None
+    match = _YEAR.search(str(value))
+    return match.group(1) if match else None
+
+
+class MetadataCache:
+    """
+    Song metadata keyed by normalized artist/track, persisted to metadata_cache.json.
+    Entries older than the TTL are treated as missing. set() only marks the cache
+    dirty; save() (periodic_save, shutdown) writes the file.
+    """
+
+    def __init__(self, data_file: Path = CACHE_FILE, ttl_seconds: float = 7 * 86400):
+        self.data_file = Path(data_file)
+        self.ttl_seconds = ttl_seconds
+        self.entries: Dict[str, dict] = {}
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        """Load cache from file, dropping expired entries"""
+        if not self.data_file.exists():
+            return
+        try:
+            with self.data_file.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            now = time.time()
+            self.entries = {k: v for k, v in data.items() if now - v.get("ts", 0) < self.ttl_seconds}
+            LOG.info(f"💾 Loaded metadata cache: {len(self.entries)} tracks")
+        except Exception as e:
+            LOG.warning(f"Failed to load metadata cache: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Write the cache to file if it changed. Safe to run in a worker thread."""
+        if not self.dirty:
+            return
+        self.dirty = False
+        entries = dict(self.entries)  # Lookups on the loop may add entries meanwhile
+        try:
+            tmp = self.data_file.with_suffix(".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                json.dump(entries, f, separators=(",", ":"))
+            tmp.replace(self.data_file)
+        except Exception as e:
+            self.dirty = True
+            LOG.error(f"Failed to save metadata cache: {e}")
+
+    def get(self, key: str) -> Optional[dict]:
+        """Get cached metadata, or None if missing/expired"""
+        entry = self.entries.get(key)
+        if not entry:
+            return None
+        if time.time() - entry.get("ts", 0) >= self.ttl_seconds:
+            del self.entries[key]
+            return None
+        return entry["data"]
+
+    def set(self, key: str, data: dict):
+        """Store metadata (persisted by the next save)"""
+        self.entries[key] = {"ts": time.time(), "data": data}
+        self.dirty = True
+
+    async def get_async(self, key: str) -> Optional[dict]:
+        """get() for callers on the event loop"""
+        return self.get(key)
+
+    async def set_async(self, key: str, data: dict):
+        """set() for callers on the event loop"""
+        self.set(key, data)
+
+
+class SharedMetadataCache(MetadataCache):
+    """
+    MetadataCache backed by the SharedStore, so every shard worker process sees
+    every lookup. Reads go straight to SQLite (no in-memory copy to go stale);
+    the async versions do it in a worker thread.
+    """
+
+    NAMESPACE = "metadata"
+
+    def __init__(self, store, ttl_seconds: float = 7 * 86400):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.entries: Dict[str, dict] = {}
+        self.dirty = False
+        store.prune(self.NAMESPACE, ttl_seconds)
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.store.get(self.NAMESPACE, key, max_age=self.ttl_seconds)
+
+    def set(self, key: str, data: dict):
+        self.store.set(self.NAMESPACE, key, data)
+
+    async def get_async(self, key: str) -> Optional[dict]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def set_async(self, key: str, data: dict):
+        await asyncio.to_thread(self.set, key, data)
+
+
+class MetadataSource:
+    """Base class for one metadata provider"""
+
+    name = "source"
+    min_interval = 0.0  # Seconds between lookups, for APIs with a published rate limit
+
+    def __init__(self, base_url: str, timeout: float = 5.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._next_slot = 0.0
+
+    def reserve_slot(self, now: Optional[float] = None) -> Optional[float]:
+        """
+        Claim the next lookup slot under min_interval and return how long to wait
+        for it, or None if it's further away than the timeout (skip this source).
+        """
+        if self.min_interval <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        start = max(now, self._next_slot)
+        if start - now > self.timeout:
+            return None
+        self._next_slot = start + self.min_interval
+        return start - now
+
+    @property
+    def enabled(self) -> bool:
+        return True
+
+    async def lookup(self, session: aiohttp.ClientSession, artist: str, track: str) -> Optional[dict]:
+        """
+        Return a partial result: any of album, year, genres, subgenres.
+        Return None when the source has nothing.
+        """
+        raise NotImplementedError
+
+
+class SpotifySource(MetadataSource):
+    """Spotify search + artist genres (client-credentials auth)"""
+
+    name = "spotify"
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        base_url: str = "https://api.spotify.com",
+        auth_url: str = SPOTIFY_AUTH_URL,
+        timeout: float = 5.0,
+        token_manager: Optional[SpotifyTokenManager] = None,
+    ):
+        super().__init__(base_url, timeout)
+        self.tokens = token_manager or SpotifyTokenManager.for_credentials(
+            client_id, client_secret, auth_url=auth_url, timeout=timeout
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.tokens.enabled
+
+    async def _get_json(self, session, url, params=None, retry=True):
+        token = await self.tokens.get_token()
+        if not token:
+            return None
+        async with session.get(url, params=params, headers={"Authorization": f"Bearer {token}"}) as resp:
+            if resp.status == 401 and retry:
+                # Token revoked/expired early - drop it (once) and try again
+                self.tokens.invalidate(token)
+                return await self._get_json(session, url, params, retry=False)
+            if resp.status != 200:
+                return None
+            return await resp.json()
+
+    async def lookup(self, session, artist, track):
+        data = await self._get_json(
+            session,
+            f"{self.base_url}/v1/search",
+            {"q": f"artist:{artist} track:{track}", "type": "track", "limit": "1"},
+        )
+        items = ((data or {}).get("tracks") or {}).get("items") or []
+        if not items:
+            return None
+
+        item = items[0]
+        album = item.get("album") or {}
+        genres = list(album.get("genres") or [])
+
+        # Artist genres are more accurate than album genres
+        artists = item.get("artists") or []
+        if artists and artists[0].get("id"):
+            artist_data = await self._get_json(session, f"{self.base_url}/v1/artists/{artists[0]['id']}")
+            if artist_data and artist_data.get("genres"):
+                genres = list(artist_data["genres"])
+
+        # Spotify genres are fine-grained ("shoegaze", "alternative rock") so they count as both
+        return {
+            "album": album.get("name"),
+            "year": _year(album.get("release_date")),
+            "genres": genres,
+            "subgenres": genres,
+        }
+
+
+class DiscogsSource(MetadataSource):
+    """Discogs database search (genre + style)"""
+
+    name = "discogs"
+    min_interval = 1.0  # 60 requests/minute for authenticated clients
+
+    def __init__(self, token: str, user_agent: str, base_url: str = "https://api.discogs.com", timeout: float = 5.0):
+        super().__init__(base_url, timeout)
+        self.token = token
+        self.user_agent = user_agent
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token)
+
+    async def lookup(self, session, artist, track):
+        headers = {"Authorization": f"Discogs token={self.token}", "User-Agent": self.user_agent}
+        params = {"q": f"{artist} {track}", "type": "release", "format": "album"}
+        async with session.get(f"{self.base_url}/database/search", params=params, headers=headers) as resp:
+            if resp.status != 200:
+                return None
+            data = await resp.json()
+
+        results = data.get("results") or []
+        if not results:
+            return None
+
+        release = results[0]
+        # Discogs titles are "Artist - Album"
+        title = release.get("title") or ""
+        return {
+            "album": title.split(" - ", 1)[-1] if title else None,
+            "year": _year(release.get("year")),
+            "genres": list(release.get("genre") or []),
+            "subgenres": list(release.get("style") or []),
+        }
+
+
+class MusicBrainzSource(MetadataSource):
+    """MusicBrainz recording search (album + year)"""
+
+    name = "musicbrainz"
+    min_interval = 1.0  # MusicBrainz allows about one request per second per client
+
+    def __init__(self, base_url: str = "https://musicbrainz.org", timeout: float = 5.0):
+        super().__init__(base_url, timeout)
+
+    async def lookup(self, session, artist, track):
+        params = {
+            "query": f'recording:"{track}" AND artist:"{artist}"',
+            "fmt": "json",
+            "limit": "5",
+            "inc": "releases",
+        }
+        async with session.get(f"{self.base_url}/ws/2/recording", params=params, headers={"User-Agent": USER_AGENT}) as resp:
+            if resp.status != 200:
+                return None
+            data = await resp.json()
+
+        recordings = data.get("recordings") or []
+        if not recordings:
+            return None
+
+        # Prefer a real album release with a date
+        for recording in recordings:
+            for release in (recording.get("releases") or [])[:1]:
+                if release.get("title") and release.get("title") != "Single" and release.get("date"):
+                    return {"album": release["title"], "year": _year(release["date"])}
+
+        releases = recordings[0].get("releases") or []
+        if not releases:
+            return None
+        return {"album": releases[0].get("title"), "year": _year(releases[0].get("date"))}
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split template text on | that aren't inside nested [[ ]] or {{ }}"""
+    parts, depth, start, i = [], 0, 0, 0
+    while i < len(text):
+        pair = text[i:i + 2]
+        if pair in ("[[", "{{"):
+            depth += 1
+            i += 2
+            continue
+        if pair in ("]]", "}}"):
+            depth = max(depth - 1, 0)
+            i += 2
+            continue
+        if text[i] == "|" and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+        i += 1
+    parts.append(text[start:])
+    return parts
+
+
+def _wiki_plain(value: str) -> str:
+    """Wikitext field value -> plain text (links resolved, refs/templates/markup dropped)"""
+    value = _WIKI_JUNK.sub("", value)
+    value = _WIKI_LINK.sub(r"\1", value)
+    while "{{" in value:
+        start = value.rfind("{{")
+        end = value.find("}}", start)
+        if end < 0:
+            break
+        value = value[:start] + value[end + 2:]
+    return _WS.sub(" ", value).strip(" \"")
+
+
+def parse_song_infobox(wikitext: str) -> Optional[Dict[str, str]]:
+    """Raw fields of the first {{Infobox song}} / {{Infobox single}} in a page, or None"""
+    match = _INFOBOX.search(wikitext or "")
+    if not match:
+        return None
+    depth, i = 0, match.start()
+    while i < len(wikitext):
+        pair = wikitext[i:i + 2]
+        if pair == "{{":
+            depth += 1
+            i += 2
+        elif pair == "}}":
+            depth -= 1
+            i += 2
+            if depth == 0:
+                break
+        else:
+            i += 1
+    fields = {}
+    for part in _split_top_level(wikitext[match.start() + 2:i - 2])[1:]:
+        name, eq, value = part.partition("=")
+        if eq:
+            fields[name.strip().lower()] = value.strip()
+    return fields
+
+
+class WikipediaSource(MetadataSource):
+    """
+    Album/year from a song's Wikipedia infobox (last resort). Only the
+    structured "album" and "released" fields are used, and only when the
+    infobox's artist matches - free text in articles is never scraped.
+    """
+
+    name = "wikipedia"
+
+    def __init__(self, base_url: str = "https://en.wikipedia.org", timeout: float = 5.0):
+        super().__init__(base_url, timeout)
+
+    async def _infobox(self, session, title) -> Optional[Dict[str, str]]:
+        params = {"action": "parse", "page": title, "prop": "wikitext", "section": "0", "redirects": "1", "format": "json", "formatversion": "2"}
+        async with session.get(f"{self.base_url}/w/api.php", params=params, headers={"User-Agent": USER_AGENT}) as resp:
+            if resp.status != 200:
+                return None
+            data = await resp.json()
+        return parse_song_infobox((data.get("parse") or {}).get("wikitext") or "")
+
+    async def lookup(self, session, artist, track):
+        wanted = normalize_key(artist, "")[:-1]
+        for title in (f"{track} ({artist} song)", f"{track} (song)", track):
+            fields = await self._infobox(session, title)
+            if not fields:
+                continue
+            box_artist = normalize_key(_wiki_plain(fields.get("artist", "")), "")[:-1]
+            if not box_artist or (wanted not in box_artist and box_artist not in wanted):
+                continue  # A different song with the same title
+            album = _wiki_plain(fields.get("album", "")) or None
+            year = _year(fields.get("released"))
+            if album or year:
+                return {"album": album, "year": year}
+            return None
+        return None
+
+
+class MetadataService:
+    """
+    Fans a lookup out to every enabled source at once (each with its own timeout),
+    merges the answers and caches the merged result on disk.
+    Replaying a cached track does no network calls. Rate-limited sources space
+    their lookups min_interval apart and sit out a lookup when the queue is too long.
+    """
+
+    # Which source wins for each single-valued field (first non-empty answer)
+    FIELD_PRIORITY = {
+        "album": ("spotify", "musicbrainz", "discogs", "wikipedia"),
+        "year": ("musicbrainz", "discogs", "spotify", "wikipedia"),
+    }
+
+    def __init__(self, sources: List[MetadataSource], cache: Optional[MetadataCache] = None):
+        self.sources = [s for s in sources if s.enabled]
+        self.cache = cache if cache is not None else MetadataCache()
+        self.session = None
+        self.network_lookups = 0
+        self.cache_hits = 0
+        self.rate_limited = 0  # Source queries skipped because the rate limit queue was too long
+        self.flights = SingleFlight("metadata")
+        LOG.debug(f"MetadataService initialized with sources: {[s.name for s in self.sources]}")
+
+    @classmethod
+    def from_settings(cls, settings=None) -> "MetadataService":
+        """Build the service from .env settings"""
+        if settings is None:
+            from hangfm_bot.config import settings
+        timeout = settings.metadata_source_timeout_sec
+        wanted = {name.strip().lower() for name in settings.metadata_sources.split(",") if name.strip()}
+        sources = [
+            SpotifySource(settings.spotify_client_id, settings.spotify_client_secret, timeout=timeout),
+            DiscogsSource(settings.discogs_user_token, settings.discogs_user_agent, timeout=timeout),
+            MusicBrainzSource(timeout=timeout),
+            WikipediaSource(timeout=timeout),
+        ]
+        sources = [s for s in sources if s.name.lower() in wanted]
+        ttl = settings.metadata_cache_ttl_hours * 3600
+        if settings.shared_store:
+            from hangfm_bot.shared_store import open_store
+            return cls(sources, SharedMetadataCache(open_store(settings.shared_store), ttl_seconds=ttl))
+        return cls(sources, MetadataCache(ttl_seconds=ttl))
+
+    async def _get_session(self):
+        """Get or create aiohttp session"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+        return self.session
+
+    async def _query(self, source: MetadataSource, session, artist, track) -> Optional[dict]:
+        delay = source.reserve_slot()
+        if delay is None:
+            self.rate_limited += 1
+            LOG.debug(f"{source.name} rate limit: skipped {artist} - {track}")
+            return None
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            return await asyncio.wait_for(source.lookup(session, artist, track), timeout=source.timeout)
+        except asyncio.TimeoutError:
+            LOG.debug(f"{source.name} lookup timed out for {artist} - {track}")
+        except Exception as e:
+            LOG.debug(f"{source.name} lookup failed for {artist} - {track}: {e}")
+        return None
+
+    def _merge(self, artist: str, track: str, results: Dict[str, dict]) -> dict:
+        merged = {
+            "artist": artist,
+            "track": track,
+            "album": None,
+            "year": None,
+            "genres": [],
+            "subgenres": [],
+            "sources": sorted(results.keys()),
+        }
+
+        for field, order in self.FIELD_PRIORITY.items():
+            # Unlisted sources still count, after the preferred ones
+            for name in list(order) + [n for n in results if n not in order]:
+                value = (results.get(name) or {}).get(field)
+                if value:
+                    merged[field] = value
+                    break
+
+        # Union genre lists, keeping first-seen order and dropping case duplicates
+        for field in ("genres", "subgenres"):
+            seen = set()
+            for result in results.values():
+                for value in result.get(field) or []:
+                    if value and value.lower() not in seen:
+                        seen.add(value.lower())
+                        merged[field].append(value)
+
+        return merged
+
+    async def lookup(self, artist: str, track: str) -> dict:
+        """Get merged metadata for a song (cache first, then all sources concurrently)"""
+        key = normalize_key(artist, track)
+        cached = await self.cache.get_async(key)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+
+        # Now-playing, genre checks and AI context often ask for the same song at once
+        return await self.flights.do(key, self._fetch, key, artist, track)
+
+    async def _fetch(self, key: str, artist: str, track: str) -> dict:
+        session = await self._get_session()
+        self.network_lookups += 1
+        answers = await asyncio.gather(*(self._query(s, session, artist, track) for s in self.sources))
+        results = {s.name: a for s, a in zip(self.sources, answers) if a}
+
+        merged = self._merge(artist, track, results)
+        if results:
+            # Don't pin "nothing found" for a whole TTL - sources may just be down
+            await self.cache.set_async(key, merged)
+        LOG.debug(f"🔎 Metadata for {artist} - {track} from {merged['sources'] or 'no sources'}")
+        return merged
+
+    @staticmethod
+    def classify(metadata: dict, classifier) -> tuple:
+        """Feed merged genres/subgenres into a GenreClassifier"""
+        return classifier.filter_to_target_genres(metadata.get("genres") or [], metadata.get("subgenres") or [])
+
+    async def close(self):
+        """Save the cache and close the aiohttp session (and any token manager sessions)"""
+        self.cache.save()
+        for source in self.sources:
+            if isinstance(source, SpotifySource):
+                await source.tokens.close()
+        if self.session and not self.session.closed:
+            await self.session.close()
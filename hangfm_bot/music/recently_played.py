@@ -0,0 +1,116 @@
+# hangfm_bot/music/recently_played.py
+# Bounded recently-played index with O(1) repeat and artist checks
+import json
+import logging
+import os
+from collections import Counter, deque
+from pathlib import Path
+from typing import Deque, List, Tuple
+
+from hangfm_bot.music.metadata_service import normalize_key
+
+LOG = logging.getLogger("recently_played")
+
+STATE_FILE = Path(os.getenv("RECENTLY_PLAYED_FILE", "recently_played.json"))
+
+
+class _Window:
+    """Sliding window of the last N keys plus a count of each key inside it"""
+
+    def __init__(self, limit: int):
+        self.limit = max(0, limit)
+        self.order: Deque[str] = deque()
+        self.counts: Counter = Counter()
+
+    def push(self, key: str):
+        if not self.limit:
+            return
+        self.order.append(key)
+        self.counts[key] += 1
+        if len(self.order) > self.limit:
+            old = self.order.popleft()
+            self.counts[old] -= 1
+            if not self.counts[old]:
+                del self.counts[old]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.counts
+
+
+class RecentlyPlayed:
+    """
+    Last `limit` songs (Settings.recently_played_limit) keyed on normalized artist/track,
+    plus a shorter artist window for "artist played too recently" checks.
+    Both lookups are dict hits, so they stay O(1) at tens of thousands of entries.
+    Persisted to recently_played.json (oldest first).
+    """
+
+    def __init__(self, limit: int = 50, artist_window: int = 10, data_file: Path = STATE_FILE):
+        self.data_file = Path(data_file)
+        self.songs = _Window(limit)
+        self.artists = _Window(artist_window)
+        # (artist, track) as played, oldest first - only what's needed to persist/rebuild
+        self.entries: Deque[Tuple[str, str]] = deque(maxlen=max(limit, artist_window, 1))
+        self.dirty = False
+        self._load()
+
+    @staticmethod
+    def artist_key(artist: str) -> str:
+        return normalize_key(artist, "")[:-1]
+
+    def _load(self):
+        """Load recent plays from file (trimmed to the current limits)"""
+        if not self.data_file.exists():
+            return
+        try:
+            with self.data_file.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            for artist, track in data[-self.entries.maxlen:]:
+                self._push(artist, track)
+            LOG.info(f"💾 Loaded {len(self.entries)} recently played songs")
+        except Exception as e:
+            LOG.warning(f"Failed to load recently played: {e}")
+
+    def save(self):
+        """Persist recent plays if anything changed"""
+        if not self.dirty:
+            return
+        try:
+            tmp = self.data_file.with_suffix(".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                json.dump(list(self.entries), f, separators=(",", ":"))
+            tmp.replace(self.data_file)
+            self.dirty = False
+        except Exception as e:
+            LOG.error(f"Failed to save recently played: {e}")
+
+    def _push(self, artist: str, track: str):
+        self.entries.append((artist, track))
+        self.songs.push(normalize_key(artist, track))
+        self.artists.push(self.artist_key(artist))
+
+    def add(self, artist: str, track: str):
+        """Record a play"""
+        if not artist or not track:
+            return
+        self._push(artist, track)
+        self.dirty = True
+
+    def was_played(self, artist: str, track: str) -> bool:
+        """Was this exact song among the last `limit` plays?"""
+        return normalize_key(artist, track) in self.songs
+
+    def artist_played_recently(self, artist: str) -> bool:
+        """Was this artist among the last `artist_window` plays?"""
+        return self.artist_key(artist) in self.artists
+
+    def is_repeat(self, artist: str, track: str) -> bool:
+        """Song repeat or artist too recent"""
+        return self.was_played(artist, track) or self.artist_played_recently(artist)
+
+    def recent(self, count: int = 10) -> List[Tuple[str, str]]:
+        """Most recent plays, newest first"""
+        return [self.entries[-i] for i in range(1, min(count, len(self.entries)) + 1)]
+
+    def __len__(self) -> int:
+        return len(self.songs.order)
@@ -0,0 +1,144 @@
+# hangfm_bot/music/spotify_auth.py
+# Spotify client-credentials token cache with proactive refresh and single-flight fetching
+
+import asyncio
+import base64
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+
+from hangfm_bot.utils.single_flight import SingleFlight
+
+LOG = logging.getLogger("spotify_auth")
+
+SPOTIFY_AUTH_URL = "https://accounts.spotify.com/api/token"
+
+
+class SpotifyTokenManager:
+    """
+    Holds one client-credentials access token per (client_id, client_secret).
+    - Cached until shortly before expiry
+    - Refreshed in the background ahead of expiry
+    - Concurrent callers share a single in-flight token request
+    """
+
+    _instances: Dict[Tuple[str, str], "SpotifyTokenManager"] = {}
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        auth_url: str = SPOTIFY_AUTH_URL,
+        refresh_margin: float = 60.0,
+        timeout: float = 5.0,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.auth_url = auth_url
+        self.refresh_margin = refresh_margin
+        self.timeout = timeout
+        self.access_token: Optional[str] = None
+        self.expires_at = 0.0
+        self.refresh_at = 0.0
+        self.token_requests = 0  # Number of actual calls to the token endpoint
+        self.session = None
+        self.flights = SingleFlight("spotify_token")
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def for_credentials(cls, client_id: str, client_secret: str, **kwargs) -> "SpotifyTokenManager":
+        """Get the shared manager for a set of credentials (created on first use)"""
+        key = (client_id, client_secret)
+        if key not in cls._instances:
+            cls._instances[key] = cls(client_id, client_secret, **kwargs)
+        return cls._instances[key]
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.client_id and self.client_secret)
+
+    def _is_fresh(self) -> bool:
+        return bool(self.access_token) and time.time() < self.refresh_at
+
+    async def _get_session(self):
+        """Get or create aiohttp session"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+        return self.session
+
+    async def get_token(self) -> Optional[str]:
+        """Return a valid access token, fetching one only if needed"""
+        if self._is_fresh():
+            return self.access_token
+        if self.access_token and time.time() < self.expires_at:
+            # Inside the refresh margin but still usable - refresh without waiting
+            self._start_refresh()
+            return self.access_token
+        return await self.refresh()
+
+    def invalidate(self, token: Optional[str] = None):
+        """Drop the cached token (e.g. after a 401). Ignored if it was already replaced."""
+        if token is None or token == self.access_token:
+            self.access_token = None
+            self.expires_at = 0.0
+            self.refresh_at = 0.0
+
+    async def refresh(self) -> Optional[str]:
+        """Fetch a new token; concurrent callers await the same request"""
+        return await self.flights.do("token", self._fetch_token)
+
+    def _start_refresh(self):
+        if not self.flights.in_flight("token"):
+            asyncio.ensure_future(self.refresh())
+
+    async def _fetch_token(self) -> Optional[str]:
+        if not self.enabled:
+            return None
+        self.token_requests += 1
+        auth = base64.b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
+        headers = {"Authorization": f"Basic {auth}", "Content-Type": "application/x-www-form-urlencoded"}
+        try:
+            session = await self._get_session()
+            async with session.post(
+                self.auth_url,
+                data="grant_type=client_credentials",
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            ) as resp:
+                if resp.status != 200:
+                    LOG.warning(f"❌ Spotify auth failed: {resp.status}")
+                    return None
+                data = await resp.json()
+        except Exception as e:
+            LOG.warning(f"❌ Spotify auth error: {e}")
+            return None
+
+        lifetime = float(data.get("expires_in", 3600))
+        # Short-lived tokens refresh at half-life instead of spinning on a 0s delay
+        self.access_token = data.get("access_token")
+        self.expires_at = time.time() + lifetime
+        self.refresh_at = self.expires_at - max(min(self.refresh_margin, lifetime / 2), 0.0)
+        LOG.debug("✅ Spotify access token obtained")
+        self._schedule_refresh()
+        return self.access_token
+
+    def _schedule_refresh(self):
+        """Refresh in the background just before the token expires"""
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+        delay = max(self.refresh_at - time.time(), 0.0)
+        self._refresh_task = asyncio.ensure_future(self._refresh_later(delay))
+
+    async def _refresh_later(self, delay: float):
+        await asyncio.sleep(delay)
+        self._refresh_task = None
+        await self.refresh()
+
+    async def close(self):
+        """Stop background refresh and close the aiohttp session"""
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+        if self.session and not self.session.closed:
+            await self.session.close()
@@ -0,0 +1,198 @@
+# hangfm_bot/music/taste_profiles.py
+# Per-user genre/artist taste vectors and vectorized DJ-lineup ranking
+import json
+import logging
+import math
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+LOG = logging.getLogger("taste_profiles")
+
+STATE_FILE = Path(os.getenv("TASTE_PROFILES_FILE", "taste_profiles.json"))
+
+
+class CandidateMatrix(NamedTuple):
+    """Sparse candidates x features matrix in coordinate form"""
+    rows: np.ndarray
+    cols: np.ndarray
+    vals: np.ndarray
+    size: int
+
+
+class TasteProfiles:
+    """
+    One sparse row per user ({feature: weight}, features like "genre:shoegaze" or
+    "artist:slowdive"), so memory grows with what each user actually played rather
+    than users x vocabulary. Ranking candidates against the current DJ lineup is
+    a single sparse (candidates x features) @ (features,) product.
+    """
+
+    def __init__(
+        self,
+        data_file: Path = STATE_FILE,
+        artist_weight: float = 1.0,
+        genre_weight: float = 0.5,
+        decay: float = 0.98,
+    ):
+        self.data_file = Path(data_file)
+        self.artist_weight = artist_weight
+        self.genre_weight = genre_weight
+        self.decay = decay  # Older plays fade so profiles follow current taste
+        self.rows: Dict[str, Dict[str, float]] = {}
+        self.scales: Dict[str, float] = {}
+        self.features: Dict[str, int] = {}  # Column index per feature, in memory only
+        self.dirty = False
+        self._load()
+
+    # ── vocabulary / storage ──────────────────────────────────────
+
+    @staticmethod
+    def artist_feature(artist: str) -> str:
+        return f"artist:{(artist or '').lower().strip()}"
+
+    @staticmethod
+    def genre_feature(genre: str) -> str:
+        return f"genre:{(genre or '').lower().strip()}"
+
+    def _feature_index(self, feature: str) -> int:
+        idx = self.features.get(feature)
+        if idx is None:
+            idx = self.features[feature] = len(self.features)
+        return idx
+
+    def _load(self):
+        """Load profiles from file"""
+        if not self.data_file.exists():
+            return
+        try:
+            with self.data_file.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.rows = {user: dict(row) for user, row in data.get("users", {}).items()}
+            self.scales = {user: 1.0 for user in self.rows}
+            for row in self.rows.values():
+                for feature in row:
+                    self._feature_index(feature)
+            LOG.info(f"💾 Loaded taste profiles: {len(self.rows)} users, {len(self.features)} features")
+        except Exception as e:
+            LOG.warning(f"Failed to load taste profiles: {e}")
+            self.rows, self.scales = {}, {}
+
+    def save(self):
+        """Persist profiles if anything changed. Safe to run in a worker thread."""
+        if not self.dirty:
+            return
+        self.dirty = False
+        # Plays recorded on the loop meanwhile land in the next save
+        snapshot = {
+            user: {feature: weight * self.scales.get(user, 1.0) for feature, weight in dict(row).items()}
+            for user, row in list(self.rows.items())
+        }
+        try:
+            tmp = self.data_file.with_suffix(".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                f.write(json.dumps({"users": snapshot}, separators=(",", ":")))  # dumps() uses the C encoder, dump() does not
+            tmp.replace(self.data_file)
+        except Exception as e:
+            self.dirty = True
+            LOG.error(f"Failed to save taste profiles: {e}")
+
+    # ── updates ───────────────────────────────────────────────────
+
+    def record_play(self, user: str, artist: str, genres: Iterable[str] = ()):
+        """Fold one play into the user's profile"""
+        if not user or not artist:
+            return
+        row = self.rows.setdefault(user, {})
+        features = {self.artist_feature(artist): self.artist_weight}
+        for genre in {g.lower().strip() for g in genres if g}:
+            features[self.genre_feature(genre)] = self.genre_weight
+
+        # Decay is applied lazily through a per-user scale so an update only touches
+        # this play's features; the row is folded back before the scale underflows
+        scale = self.scales.get(user, 1.0) * self.decay
+        if scale < 1e-6:
+            for feature in row:
+                row[feature] *= scale
+            scale = 1.0
+        self.scales[user] = scale
+        for feature, weight in features.items():
+            self._feature_index(feature)
+            row[feature] = row.get(feature, 0.0) + weight / scale
+        self.dirty = True
+
+    # ── scoring ───────────────────────────────────────────────────
+
+    def lineup_vector(self, users: Sequence[str]) -> Optional[np.ndarray]:
+        """Average of the (L2-normalized) profiles of users we know, or None"""
+        rows = [self.rows[u] for u in users if self.rows.get(u)]
+        if not rows:
+            return None
+        vector = np.zeros(len(self.features), dtype=np.float64)
+        for row in rows:
+            # The lazy decay scale cancels out once the row is normalized
+            norm = math.sqrt(sum(w * w for w in row.values())) or 1.0
+            for feature, weight in row.items():
+                vector[self.features[feature]] += weight / norm
+        return vector / len(rows)
+
+    def candidate_matrix(self, candidates: Sequence[dict]) -> CandidateMatrix:
+        """
+        Candidates as a sparse (row, feature, weight) matrix. Build it once for a
+        stable candidate set and pass it to score()/rank() on every pick.
+        """
+        rows, cols, vals = [], [], []
+        for i, candidate in enumerate(candidates):
+            rows.append(i)
+            cols.append(self._feature_index(self.artist_feature(candidate.get("artist"))))
+            vals.append(self.artist_weight)
+            genres = list(candidate.get("genres") or []) + list(candidate.get("subgenres") or [])
+            if candidate.get("genre"):
+                genres.append(candidate["genre"])
+            for genre in {g.lower().strip() for g in genres if g}:
+                rows.append(i)
+                cols.append(self._feature_index(self.genre_feature(genre)))
+                vals.append(self.genre_weight)
+        return CandidateMatrix(
+            np.asarray(rows, dtype=np.int64),
+            np.asarray(cols, dtype=np.int64),
+            np.asarray(vals, dtype=np.float32),
+            len(candidates),
+        )
+
+    def score(self, candidates: Sequence[dict], users: Sequence[str], matrix: Optional[CandidateMatrix] = None) -> np.ndarray:
+        """
+        Cosine affinity of each candidate to the lineup (zeros if nobody is known).
+        Pass a precomputed candidate_matrix() to skip rebuilding it for a stable candidate set.
+        """
+        if matrix is None:
+            matrix = self.candidate_matrix(candidates)
+        lineup = self.lineup_vector(users)
+        if lineup is None or not matrix.size:
+            return np.zeros(matrix.size, dtype=np.float32)
+        # Sparse matrix-vector product: one gather + one segmented sum over all non-zeros
+        dots = np.bincount(matrix.rows, weights=matrix.vals * lineup[matrix.cols], minlength=matrix.size)
+        norms = np.sqrt(np.bincount(matrix.rows, weights=matrix.vals.astype(np.float64) ** 2, minlength=matrix.size))
+        norms[norms == 0] = 1.0
+        return (dots / norms).astype(np.float32)
+
+    def rank(self, candidates: Sequence[dict], users: Sequence[str], top_k: int = 10, matrix: Optional[CandidateMatrix] = None) -> List[tuple]:
+        """Best `top_k` (candidate, score) pairs for the lineup, best first"""
+        if not candidates:
+            return []
+        scores = self.score(candidates, users, matrix)
+        k = min(top_k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(candidates[i], float(scores[i])) for i in top]
+
+    def top_features(self, user: str, kind: str = "artist", count: int = 5) -> List[str]:
+        """A user's strongest artists or genres"""
+        row = self.rows.get(user)
+        if not row:
+            return []
+        prefix = f"{kind}:"
+        named = sorted(((w, name) for name, w in row.items() if name.startswith(prefix) and w > 0), reverse=True)
+        return [name[len(prefix):] for _, name in named[:count]]
@@ -0,0 +1,16 @@
+# Platform adapters - Hang.fm and Deepcut.live rooms behind one interface
+from .base import PlatformAdapter
+from .hang import HangAdapter
+from .deepcut import DeepcutAdapter
+
+DEEPCUT_PREFIX = "deepcut:"
+
+
+def create_adapter(room_key: str, queue, session, relay_url: str) -> PlatformAdapter:
+    """Adapter for a room key: "deepcut:ROOMID" is a Deepcut room, anything else a Hang room UUID"""
+    if room_key.startswith(DEEPCUT_PREFIX):
+        return DeepcutAdapter(room_key[len(DEEPCUT_PREFIX):], queue, session)
+    return HangAdapter(room_key, queue, session, relay_url)
+
+
+__all__ = ['PlatformAdapter', 'HangAdapter', 'DeepcutAdapter', 'DEEPCUT_PREFIX', 'create_adapter']
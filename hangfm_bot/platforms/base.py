@@ -0,0 +1,70 @@
+# hangfm_bot/platforms/base.py
+# What the core pipeline needs from a music platform: events in, chat out
+
+import logging
+
+LOG = logging.getLogger("platforms")
+
+
+class PlatformAdapter:
+    """
+    One room on one platform. An adapter turns the platform's traffic into the
+    pipeline's event vocabulary and puts it on the room's MessageQueue:
+
+      chatMessage       {"text", "sender": {"uid", "name"}}
+      playedSong        {"artistName", "trackName", "djName", "djUuid"}
+      userJoined/Left   {"name", "uuid"}
+      addedDj/removedDj {"name", "uuid"}
+      votedOnSong       {"uuid", "like"}
+      roomStateUpdated  {"currentSong", "djs": [{"name", "uuid"}], "users": [{"name"}]}
+
+    and sends the pipeline's replies back as chat. process_queue_item,
+    CommandHandler and AIManager never see which platform a room is on.
+    """
+
+    name = "platform"
+
+    def __init__(self, room_id: str, queue):
+        self.room_id = room_id
+        self.queue = queue
+        self.on_connection_change = None  # Optional callback(connected: bool), set by the room
+        self.user_id = ""  # The bot's own user id on this platform
+
+    async def start(self, scheduler):
+        """Start delivering events to the queue"""
+        raise NotImplementedError
+
+    async def stop(self, scheduler):
+        """Stop delivering events and release connections"""
+        raise NotImplementedError
+
+    async def send_message(self, text: str) -> bool:
+        """Post a chat message to the room"""
+        raise NotImplementedError
+
+    async def request_room_state(self) -> bool:
+        """Ask for a fresh roomStateUpdated event"""
+        return False
+
+    # Room actions - platforms that can't do one return False
+
+    async def vote(self, like: bool = True) -> bool:
+        return False
+
+    async def hop_up(self) -> bool:
+        return False
+
+    async def hop_down(self, user_id: str = None) -> bool:
+        """Leave the stage, or remove user_id from it"""
+        return False
+
+    async def queue_song(self, song: dict) -> bool:
+        return False
+
+    @property
+    def connected(self) -> bool:
+        return True
+
+    def _connection_changed(self, connected: bool):
+        if self.on_connection_change:
+            self.on_connection_change(connected)
@@ -0,0 +1,299 @@
+# hangfm_bot/platforms/deepcut.py
+# Deepcut.live: one WebSocket per room speaking the turntable-style ~m~ protocol (see OG-DEEPCUT/bot.js)
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from hangfm_bot.config import settings
+from hangfm_bot.metrics import PLATFORM_CONNECTED, PLATFORM_EVENTS_DROPPED, PLATFORM_RECONNECTS, PLATFORM_SEND_SECONDS
+from hangfm_bot.platforms.base import LOG, PlatformAdapter
+
+_FRAME_RE = re.compile(r"~m~(\d+)~m~")
+
+
+def encode_frame(payload: str) -> str:
+    return f"~m~{len(payload)}~m~{payload}"
+
+
+def _sha1(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def decode_frames(data: str) -> List[str]:
+    """Split one WebSocket message into its ~m~len~m~payload frames"""
+    frames = []
+    pos = 0
+    while True:
+        match = _FRAME_RE.match(data, pos)
+        if not match:
+            break
+        start = match.end()
+        end = start + int(match.group(1))
+        frames.append(data[start:end])
+        pos = end
+    return frames
+
+
+class DeepcutAdapter(PlatformAdapter):
+    """
+    Deepcut.live room. Registers in the room, answers heartbeats, correlates API
+    replies by msgid and translates speak/newsong/registered/deregistered/
+    update_votes/add_dj/rem_dj and room.info into the Hang event names. Reconnects with
+    backoff when the socket drops. The reader never waits on the room queue (a full
+    queue drops the event) so replies to pending requests always get through.
+    """
+
+    name = "deepcut"
+
+    def __init__(self, room_id: str, queue, session: aiohttp.ClientSession, socket_url: str = None, userid: str = None, auth: str = None):
+        super().__init__(room_id, queue)
+        self.session = session
+        self.socket_url = socket_url or settings.deepcut_socket_url
+        self.userid = userid or settings.deepcut_userid
+        self.auth = auth or settings.deepcut_auth
+        self.user_id = self.userid
+        self.clientid = f"{int(time.time() * 1000)}-0.{random.randrange(10**15, 10**16)}"
+        self.users: Dict[str, str] = {}  # userid -> name
+        self.song_id: Optional[str] = None  # Current song's _id - room.vote hashes it
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._msgid = 0
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._registered = False
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.dropped = 0  # Events lost to a full room queue
+
+    @property
+    def connected(self) -> bool:
+        return self._registered
+
+    # ── protocol ──────────────────────────────────────────────────
+
+    async def _request(self, api: str, timeout: float = 10.0, **fields) -> dict:
+        """Send an API call and wait for the reply with the same msgid"""
+        if self._ws is None or self._ws.closed:
+            raise ConnectionError("not connected")
+        self._msgid += 1
+        msgid = self._msgid
+        request = {"api": api, **fields, "msgid": msgid, "clientid": self.clientid, "userid": self.userid, "userauth": self.auth}
+        future = asyncio.get_running_loop().create_future()
+        self._pending[msgid] = future
+        try:
+            await self._ws.send_str(encode_frame(json.dumps(request)))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(msgid, None)
+
+    async def _on_frame(self, frame: str):
+        if frame.startswith("~h~"):
+            await self._ws.send_str(encode_frame(frame))  # Heartbeat - echo it back
+            return
+        try:
+            message = json.loads(frame)
+        except ValueError:
+            LOG.debug("Deepcut %s: unparseable frame %r", self.room_id, frame[:80])
+            return
+        if message.get("msgid") is not None and not message.get("command"):
+            future = self._pending.get(message["msgid"])
+            if future and not future.done():
+                future.set_result(message)
+            return
+        for event in self.translate(message):
+            try:
+                self.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                PLATFORM_EVENTS_DROPPED.labels(self.name).inc()
+                LOG.warning("⚠️  Deepcut %s: room queue full, dropped %s", self.room_id, event[0])
+
+    def _remember(self, users) -> list:
+        users = [u for u in users or [] if isinstance(u, dict) and u.get("userid")]
+        for user in users:
+            self.users[user["userid"]] = user.get("name") or self.users.get(user["userid"], "Unknown")
+        return users
+
+    def _dj_users(self, message: dict) -> list:
+        users = self._remember(message.get("user"))
+        if not users and message.get("userid"):
+            users = [{"userid": message["userid"], "name": self.users.get(message["userid"])}]
+        return users
+
+    @staticmethod
+    def _song(current: dict) -> dict:
+        meta = current.get("metadata") or {}
+        return {
+            "artistName": meta.get("artist"),
+            "trackName": meta.get("song"),
+            "djName": current.get("djname") or meta.get("djname"),
+            "djUuid": current.get("djid") or meta.get("djid"),
+        }
+
+    def translate(self, message: dict) -> list:
+        """Deepcut command -> [(event_type, payload)] in the Hang vocabulary"""
+        command = message.get("command")
+        if command == "speak":
+            if message.get("userid") == self.userid:
+                return []
+            return [("chatMessage", {"text": message.get("text", ""), "sender": {"uid": message.get("userid", ""), "name": message.get("name", "Unknown")}})]
+        if command == "newsong":
+            current = ((message.get("room") or {}).get("metadata") or {}).get("current_song")
+            if not current:
+                return []
+            self.song_id = current.get("_id")
+            song = self._song(current)
+            if not song["djName"] and song["djUuid"]:
+                song["djName"] = self.users.get(song["djUuid"])
+            return [("playedSong", song)]
+        if command in ("registered", "deregistered"):
+            users = self._remember(message.get("user"))
+            if command == "deregistered":
+                for user in users:
+                    self.users.pop(user["userid"], None)
+            kind = "userJoined" if command == "registered" else "userLeft"
+            return [(kind, {"name": u.get("name"), "uuid": u["userid"]}) for u in users if u["userid"] != self.userid]
+        if command == "update_votes":
+            # votelog holds the vote(s) behind this update as [userid, "up"|"down"]
+            votelog = ((message.get("room") or {}).get("metadata") or {}).get("votelog") or []
+            return [("votedOnSong", {"uuid": entry[0], "like": entry[1] == "up"}) for entry in votelog if len(entry) >= 2 and entry[0] and entry[0] != self.userid]
+        if command in ("add_dj", "rem_dj"):
+            kind = "addedDj" if command == "add_dj" else "removedDj"
+            return [(kind, {"name": u.get("name") or "Unknown", "uuid": u["userid"]}) for u in self._dj_users(message)]
+        return []
+
+    def room_state(self, info: dict) -> tuple:
+        """room.info reply -> roomStateUpdated"""
+        self.users = {}
+        self._remember(info.get("users"))
+        metadata = (info.get("room") or {}).get("metadata") or {}
+        state = {
+            "djs": [{"name": self.users.get(dj), "uuid": dj} if isinstance(dj, str) else {"name": dj.get("name"), "uuid": dj.get("userid")} for dj in metadata.get("djs") or []],
+            "users": [{"name": name} for name in self.users.values()],
+        }
+        self.song_id = (metadata.get("current_song") or {}).get("_id")
+        if metadata.get("current_song"):
+            state["currentSong"] = self._song(metadata["current_song"])
+        return ("roomStateUpdated", state)
+
+    # ── connection ────────────────────────────────────────────────
+
+    async def _read(self):
+        async for msg in self._ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                if msg.type == aiohttp.WSMsgType.ERROR:
+                    break
+                continue
+            for frame in decode_frames(msg.data):
+                try:
+                    await self._on_frame(frame)
+                except Exception:
+                    LOG.exception("❌ Deepcut %s: failed to handle a frame", self.room_id)
+
+    async def _register(self):
+        await self._request("presence.update", status="available")
+        await self._request("user.modify", laptop="pc")
+        reply = await self._request("room.register", roomid=self.room_id)
+        if not reply.get("success"):
+            raise ConnectionError(f"room.register failed: {reply.get('err')}")
+        self._registered = True
+        PLATFORM_CONNECTED.labels(self.name).inc()
+        self._connection_changed(True)
+        LOG.info("✅ Deepcut room %s joined", self.room_id)
+        await self.request_room_state()
+
+    async def _run(self):
+        backoff = 5.0
+        while not self._stopping:
+            reader = None
+            try:
+                self._ws = await self.session.ws_connect(self.socket_url, heartbeat=None)
+                reader = asyncio.create_task(self._read())
+                await self._register()
+                backoff = 5.0
+                await reader
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LOG.warning("⚠️  Deepcut %s: %s", self.room_id, e)
+            finally:
+                if reader and not reader.done():
+                    reader.cancel()
+                if self._registered:
+                    self._registered = False
+                    PLATFORM_CONNECTED.labels(self.name).dec()
+                    self._connection_changed(False)
+                if self._ws is not None:
+                    await self._ws.close()
+                    self._ws = None
+                for future in self._pending.values():
+                    if not future.done():
+                        future.set_exception(ConnectionError("disconnected"))
+            if self._stopping:
+                break
+            PLATFORM_RECONNECTS.labels(self.name).inc()
+            LOG.info("🔄 Deepcut %s reconnecting in %.0fs", self.room_id, backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+    async def start(self, scheduler):
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(), name=f"deepcut:{self.room_id[:8]}")
+
+    async def stop(self, scheduler):
+        self._stopping = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ── pipeline side ─────────────────────────────────────────────
+
+    async def send_message(self, text: str) -> bool:
+        started = time.perf_counter()
+        try:
+            reply = await self._request("room.speak", roomid=self.room_id, section=None, text=text)
+            sent = reply.get("success", True)
+        except Exception as e:
+            LOG.error("❌ Deepcut %s: send failed: %s", self.room_id, e)
+            sent = False
+        PLATFORM_SEND_SECONDS.labels(self.name, "ok" if sent else "error").observe(time.perf_counter() - started)
+        return sent
+
+    async def _ok(self, api: str, **fields) -> bool:
+        try:
+            return bool((await self._request(api, roomid=self.room_id, section=None, **fields)).get("success"))
+        except Exception as e:
+            LOG.warning("⚠️  Deepcut %s: %s failed: %s", self.room_id, api, e)
+            return False
+
+    async def vote(self, like: bool = True) -> bool:
+        if not self.song_id:
+            return False
+        val = "up" if like else "down"
+        return await self._ok("room.vote", val=val, vh=_sha1(self.room_id + val + self.song_id), th=_sha1(str(random.random())), ph=_sha1(str(random.random())))
+
+    async def hop_up(self) -> bool:
+        return await self._ok("room.add_dj")
+
+    async def hop_down(self, user_id: str = None) -> bool:
+        return await self._ok("room.rem_dj", **({"djid": user_id} if user_id else {}))
+
+    async def request_room_state(self) -> bool:
+        try:
+            reply = await self._request("room.info", roomid=self.room_id)
+        except Exception as e:
+            LOG.debug("Deepcut %s: room.info failed: %s", self.room_id, e)
+            return False
+        if not reply.get("success"):
+            return False
+        await self.queue.put(self.room_state(reply))
+        return True
@@ -0,0 +1,74 @@
+# hangfm_bot/platforms/hang.py
+# Hang.fm: room events come from the Node relay (RelayReceiver), chat goes in and out via CometChat
+
+import aiohttp
+
+from hangfm_bot.config import settings
+from hangfm_bot.connection import CometChatManager, CometChatPoller, RelayActionClient, RelayMonitor
+from hangfm_bot.platforms.base import LOG, PlatformAdapter
+
+
+class HangAdapter(PlatformAdapter):
+    """
+    Hang.fm room. Chat is polled from and sent to CometChat; socket events arrive
+    through the process-wide RelayReceiver, which routes them to this room's
+    queue by the relay's "room" field. A RelayMonitor watches the relay and
+    re-fetches the room state whenever its socket (re)connects; room actions
+    go out through the relay's socket with a RelayActionClient.
+    """
+
+    name = "hang"
+
+    def __init__(self, room_id: str, queue, session: aiohttp.ClientSession, relay_url: str):
+        super().__init__(room_id, queue)
+        self.relay_url = relay_url
+        self.session = session
+        self.user_id = settings.cometchat_uid
+        self.cometchat = CometChatManager(room_uuid=room_id, session=session)
+        self.poller = CometChatPoller(queue, room_uuid=room_id, session=session)
+        self.actions = RelayActionClient(relay_url, session)
+        self.monitor = RelayMonitor(room_id, relay_url, session, self.request_room_state, on_change=self._connection_changed)
+
+    @property
+    def connected(self) -> bool:
+        return self.monitor.connected
+
+    async def start(self, scheduler):
+        await self.poller.start(scheduler)
+        self.monitor.start(scheduler)
+
+    async def stop(self, scheduler):
+        await self.monitor.stop(scheduler)
+        scheduler.remove(self.poller.job_name)
+        await self.poller.close()
+        await self.actions.close()
+
+    async def send_message(self, text: str) -> bool:
+        return await self.cometchat.send_message(text)
+
+    async def request_room_state(self) -> bool:
+        """Ask this room's relay to push a roomStateUpdated event"""
+        short_id = self.room_id[:8]
+        try:
+            async with self.session.get(f"{self.relay_url}/roomstate", timeout=aiohttp.ClientTimeout(total=5)) as resp:
+                data = await resp.json(content_type=None) if resp.status == 200 else {}
+                # The relay answers 200 with ok=false while its socket is down
+                if data.get("ok"):
+                    LOG.info("📊 Requested room state for %s from relay", short_id)
+                    return True
+                LOG.warning("⚠️  Room state request for %s failed: %s", short_id, data.get("error") or resp.status)
+        except Exception as e:
+            LOG.debug("Room state request for %s failed (relay might still be starting): %s", short_id, e)
+        return False
+
+    async def vote(self, like: bool = True) -> bool:
+        return await self.actions.vote(like)
+
+    async def hop_up(self) -> bool:
+        return await self.actions.hop_up()
+
+    async def hop_down(self, user_id: str = None) -> bool:
+        return await self.actions.hop_down(user_id)
+
+    async def queue_song(self, song: dict) -> bool:
+        return await self.actions.queue_song(song)
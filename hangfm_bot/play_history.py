@@ -0,0 +1,210 @@
+# hangfm_bot/play_history.py
+# Append-only song-play log with incrementally maintained stats
+import json
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+LOG = logging.getLogger("play_history")
+
+HISTORY_DIR = Path(os.getenv("PLAY_HISTORY_DIR", "play_history"))
+
+
+def normalize_key(text: str) -> str:
+    """Counter key: case and spacing don't make a different song, DJ or artist"""
+    return " ".join(text.split()).casefold()
+
+
+class TopN:
+    """
+    Top-N view over a Counter whose counts only ever go up.
+    Kept sorted on every increment so reads never touch the full counter.
+    """
+
+    def __init__(self, counter: Counter, size: int):
+        self.counter = counter
+        self.size = size
+        self.items: List[Tuple[str, int]] = []
+
+    def rebuild(self):
+        self.items = self.counter.most_common(self.size)
+
+    def bump(self, key: str):
+        count = self.counter[key]
+        for i, (k, _) in enumerate(self.items):
+            if k == key:
+                self.items[i] = (key, count)
+                break
+        else:
+            if len(self.items) < self.size:
+                self.items.append((key, count))
+            elif count > self.items[-1][1]:
+                self.items[-1] = (key, count)
+            else:
+                return
+        self.items.sort(key=lambda kv: kv[1], reverse=True)
+
+
+class PlayHistory:
+    """
+    Every playedSong is appended as one JSON line to the current segment file
+    (play_history/segment-000001.jsonl, ...). Plays per song/DJ/artist, top-N
+    lists and the per-hour histogram are updated on append and rebuilt by
+    replaying the segments on startup. Counters are keyed case- and
+    space-insensitively; stats show the first spelling seen.
+    """
+
+    def __init__(self, data_dir: Path = HISTORY_DIR, segment_size: int = 10000, top_size: int = 10):
+        self.data_dir = Path(data_dir)
+        self.segment_size = segment_size
+        self.total_plays = 0
+        self.song_plays: Counter = Counter()
+        self.dj_plays: Counter = Counter()
+        self.artist_plays: Counter = Counter()
+        self.names: Dict[str, str] = {}  # Normalized key -> display name
+        self.hour_histogram: List[int] = [0] * 24
+        self.first_play_ts: Optional[float] = None
+        self.top_songs = TopN(self.song_plays, top_size)
+        self.top_djs = TopN(self.dj_plays, top_size)
+        self.top_artists = TopN(self.artist_plays, top_size)
+        self._segment_index = 1
+        self._segment_count = 0
+        self._load()
+
+    def _segments(self) -> List[Path]:
+        return sorted(self.data_dir.glob("segment-*.jsonl"))
+
+    def _segment_path(self, index: int) -> Path:
+        return self.data_dir / f"segment-{index:06d}.jsonl"
+
+    def _load(self):
+        """Rebuild aggregates from every segment on disk"""
+        segments = self._segments()
+        if not segments:
+            LOG.info("📝 No play history found - starting fresh")
+            return
+
+        for segment in segments:
+            count = 0
+            try:
+                with segment.open("r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # Torn write at the end of a segment - skip it
+                            continue
+                        count += 1
+                        if self._valid(record):
+                            self._apply(record, bump_top=False)
+                        else:
+                            LOG.debug(f"Skipping malformed play in {segment.name}: {line[:80]}")
+            except Exception as e:
+                LOG.warning(f"Failed to read {segment.name}: {e}")
+            self._segment_index = int(segment.stem.split("-")[1])
+            self._segment_count = count
+
+        for top in (self.top_songs, self.top_djs, self.top_artists):
+            top.rebuild()
+        LOG.info(f"💾 Loaded play history: {self.total_plays} plays from {len(segments)} segments")
+
+    @staticmethod
+    def _valid(record) -> bool:
+        """Checked before _apply, so a bad line can't leave some counters bumped"""
+        return (
+            isinstance(record, dict)
+            and isinstance(record.get("artist"), str) and record["artist"].strip()
+            and isinstance(record.get("track"), str)
+            and isinstance(record.get("ts"), (int, float)) and not isinstance(record["ts"], bool)
+            and isinstance(record.get("dj") or "", str)
+        )
+
+    @staticmethod
+    def song_key(artist: str, track: str) -> str:
+        return normalize_key(f"{artist} - {track}")
+
+    def _key(self, display: str) -> str:
+        key = normalize_key(display)
+        self.names.setdefault(key, " ".join(display.split()))
+        return key
+
+    def _apply(self, record: dict, bump_top: bool = True):
+        """Fold one play record into the aggregates"""
+        song = self._key(f"{record['artist']} - {record['track']}")
+        dj = self._key(record.get("dj") or "Unknown")
+        artist = self._key(record["artist"])
+
+        self.total_plays += 1
+        self.song_plays[song] += 1
+        self.dj_plays[dj] += 1
+        self.artist_plays[artist] += 1
+        self.hour_histogram[datetime.fromtimestamp(record["ts"]).hour] += 1
+        if self.first_play_ts is None:
+            self.first_play_ts = record["ts"]
+
+        if bump_top:
+            self.top_songs.bump(song)
+            self.top_djs.bump(dj)
+            self.top_artists.bump(artist)
+
+    def record_play(self, artist: str, track: str, dj_name: str, dj_uuid: str = None, ts: float = None) -> dict:
+        """Append a play to the log and update aggregates"""
+        record = {"ts": ts if ts is not None else time.time(), "artist": artist, "track": track, "dj": dj_name}
+        if dj_uuid:
+            record["dj_uuid"] = dj_uuid
+        if not self._valid(record):
+            LOG.debug(f"Not recording incomplete play: {record}")
+            return record
+
+        if self._segment_count >= self.segment_size:
+            self._segment_index += 1
+            self._segment_count = 0
+
+        try:
+            self.data_dir.mkdir(parents=True, exist_ok=True)
+            with self._segment_path(self._segment_index).open("a", encoding="utf-8") as f:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self._segment_count += 1
+        except Exception as e:
+            LOG.error(f"Failed to append play history: {e}")
+
+        self._apply(record)
+        return record
+
+    def plays_for_song(self, artist: str, track: str) -> int:
+        return self.song_plays.get(self.song_key(artist, track), 0)
+
+    def plays_for_dj(self, dj_name: str) -> int:
+        return self.dj_plays.get(normalize_key(dj_name), 0)
+
+    def plays_for_artist(self, artist: str) -> int:
+        return self.artist_plays.get(normalize_key(artist), 0)
+
+    def busiest_hour(self) -> Optional[int]:
+        if not self.total_plays:
+            return None
+        return max(range(24), key=self.hour_histogram.__getitem__)
+
+    def _named(self, top: TopN, count: int) -> List[Tuple[str, int]]:
+        return [(self.names.get(key, key), plays) for key, plays in top.items[:count]]
+
+    def summary(self, top: int = 3) -> Dict:
+        """Snapshot of the headline stats (constant time)"""
+        return {
+            "total_plays": self.total_plays,
+            "unique_songs": len(self.song_plays),
+            "unique_artists": len(self.artist_plays),
+            "unique_djs": len(self.dj_plays),
+            "top_songs": self._named(self.top_songs, top),
+            "top_djs": self._named(self.top_djs, top),
+            "top_artists": self._named(self.top_artists, top),
+            "busiest_hour": self.busiest_hour(),
+            "first_play_ts": self.first_play_ts,
+        }
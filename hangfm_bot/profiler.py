@@ -0,0 +1,166 @@
+# hangfm_bot/profiler.py
+# On-demand sampling profiler + event-loop stall detector for live diagnosis
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+LOG = logging.getLogger("profiler")
+
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+
+# Leaf frames that mean the loop thread is waiting for I/O, not burning CPU
+_IDLE_LEAVES = {("selectors.py", "select"), ("selectors.py", "poll")}
+
+Stack = Tuple[Tuple[str, str], ...]  # (file, function) pairs, outermost first
+
+
+class ProfileResult:
+    def __init__(self, seconds: float, samples: Counter, stalls: List[Tuple[float, Stack]], stall_threshold: float):
+        self.seconds = seconds
+        self.samples = samples
+        self.stalls = stalls  # (duration, stack seen while the loop was blocked), worst first
+        self.stall_threshold = stall_threshold
+
+    @property
+    def total(self) -> int:
+        return sum(self.samples.values())
+
+    @property
+    def idle(self) -> int:
+        return sum(count for stack, count in self.samples.items() if stack and stack[-1] in _IDLE_LEAVES)
+
+    def top_functions(self, count: int = 5) -> List[Tuple[str, int]]:
+        """Busiest functions by self samples (leaf frame), idle waits excluded"""
+        leaves = Counter()
+        for stack, samples in self.samples.items():
+            if stack and stack[-1] not in _IDLE_LEAVES:
+                leaves[_frame_name(stack[-1])] += samples
+        return leaves.most_common(count)
+
+    def collapsed(self) -> str:
+        """Brendan Gregg collapsed-stack format, ready for flamegraph.pl / speedscope"""
+        return "".join(
+            f"{';'.join(_frame_name(frame) for frame in stack)} {count}\n"
+            for stack, count in self.samples.most_common()
+        )
+
+    def write(self, directory: Path = PROFILE_DIR) -> Path:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.folded"
+        path.write_text(self.collapsed(), encoding="utf-8")
+        return path
+
+
+def _frame_name(frame: Tuple[str, str]) -> str:
+    return f"{frame[1]} ({frame[0]})"
+
+
+class SamplingProfiler:
+    """
+    A daemon thread samples the event-loop thread's stack every `interval` seconds
+    (sys._current_frames - no tracing hooks, so the bot runs at full speed).
+    A heartbeat coroutine measures loop lag; the stacks sampled while the loop was
+    blocked for more than `stall_threshold` are kept as that stall's culprit.
+    """
+
+    def __init__(self, interval: float = 0.005, stall_threshold: float = 0.1, heartbeat: float = 0.02):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.heartbeat = heartbeat
+        self.running = False
+        self._code_names: Dict[object, Tuple[str, str]] = {}
+
+    def _stack(self, frame) -> Stack:
+        names = self._code_names
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            name = names.get(code)
+            if name is None:
+                name = names[code] = (os.path.basename(code.co_filename), code.co_name)
+            stack.append(name)
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def _sample_loop(self, thread_id: int, state: dict, stop: threading.Event):
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            stack = self._stack(frame)
+            state["samples"][stack] += 1
+            if time.perf_counter() - state["beat"] > self.stall_threshold:
+                state["stall"][stack] += 1
+            del frame
+
+    async def _heartbeat(self, state: dict, stalls: List[Tuple[float, Stack]], stop: threading.Event):
+        while not stop.is_set():
+            state["beat"] = time.perf_counter()
+            await asyncio.sleep(self.heartbeat)
+            lag = time.perf_counter() - state["beat"] - self.heartbeat
+            if lag > self.stall_threshold:
+                seen, state["stall"] = state["stall"], Counter()
+                culprit = seen.most_common(1)[0][0] if seen else ()
+                stalls.append((lag, culprit))
+            elif state["stall"]:
+                state["stall"] = Counter()
+
+    async def run(self, seconds: float) -> ProfileResult:
+        """Profile the running loop for `seconds` (one run at a time)"""
+        if self.running:
+            raise RuntimeError("A profile is already running")
+        self.running = True
+        state = {"samples": Counter(), "stall": Counter(), "beat": time.perf_counter()}
+        stalls: List[Tuple[float, Stack]] = []
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample_loop, args=(threading.get_ident(), state, stop), name="profiler", daemon=True
+        )
+        LOG.info(f"🔬 Profiling for {seconds:.0f}s (every {self.interval * 1000:.0f}ms)")
+        # The sampler needs the GIL to read frames; a shorter switch interval lets it in
+        # while the loop thread is busy instead of only when it goes idle (less bias)
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(switch_interval, self.interval / 5))
+        started = time.perf_counter()
+        sampler.start()
+        beat = asyncio.create_task(self._heartbeat(state, stalls, stop))
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            await beat
+            await asyncio.to_thread(sampler.join)
+            sys.setswitchinterval(switch_interval)
+            self.running = False
+        stalls.sort(key=lambda s: s[0], reverse=True)
+        return ProfileResult(time.perf_counter() - started, state["samples"], stalls, self.stall_threshold)
+
+
+def format_report(result: ProfileResult, path: Optional[Path] = None, top: int = 5) -> str:
+    """Chat-sized summary of a profile"""
+    total = result.total or 1
+    busy = 100 * (result.total - result.idle) / total
+    lines = [f"🔬 Profile: {result.seconds:.0f}s, {result.total} samples, loop busy {busy:.0f}%"]
+    hot = result.top_functions(top)
+    if hot:
+        lines.append("\n🔥 Hot functions:")
+        lines.extend(f"  {100 * count / total:.1f}% {name}" for name, count in hot)
+    if result.stalls:
+        lines.append(f"\n🧊 Loop stalls > {result.stall_threshold * 1000:.0f}ms: {len(result.stalls)}")
+        for lag, stack in result.stalls[:top]:
+            where = " → ".join(_frame_name(frame) for frame in stack[-2:]) or "unknown"
+            lines.append(f"  {lag * 1000:.0f}ms in {where}")
+    else:
+        lines.append("\n✅ No loop stalls")
+    if path:
+        lines.append(f"\n📁 {path}")
+    return "\n".join(lines)
@@ -5,14 +5,20 @@ import asyncio
 import logging
 from aiohttp import web
 
+from hangfm_bot.metrics import REGISTRY
+
 LOG = logging.getLogger("relay_receiver")
 
 
 class RelayReceiver:
-    def __init__(self, message_queue):
+    def __init__(self, message_queue, router=None):
         self.message_queue = message_queue
+        # Optional room_uuid -> MessageQueue lookup (multi-room); events without a room
+        # go to message_queue, events for a room not served here are rejected
+        self.router = router
         self.app = web.Application()
         self.app.router.add_post('/events', self.handle_event)
+        self.app.router.add_get('/metrics', self.handle_metrics)
         
     async def handle_event(self, request):
         """Handle incoming event from Node relay"""
@@ -22,22 +28,33 @@ class RelayReceiver:
             payload = data.get('payload')
             
             if event:
-                LOG.info(f"Received event: {event}")
-                await self.message_queue.put((event, payload))
+                LOG.info("Received event: %s", event)
+                room = data.get('room')
+                queue = self.router(room) if (room and self.router) else self.message_queue
+                if queue is None:
+                    return web.json_response({'ok': False, 'error': 'Unknown room'}, status=404)
+                await queue.put((event, payload))
                 return web.json_response({'ok': True})
             else:
                 return web.json_response({'ok': False, 'error': 'No event name'}, status=400)
                 
         except Exception as e:
-            LOG.error(f"Error handling relay event: {e}")
+            LOG.error("Error handling relay event: %s", e)
             return web.json_response({'ok': False, 'error': str(e)}, status=500)
     
+    async def handle_metrics(self, request):
+        """Prometheus scrape endpoint"""
+        return web.Response(
+            body=REGISTRY.render().encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+    
     async def start(self, port=4000):
         """Start the webhook server"""
         runner = web.AppRunner(self.app)
         await runner.setup()
         site = web.TCPSite(runner, '127.0.0.1', port)
         await site.start()
-        LOG.info(f"Relay receiver started on http://127.0.0.1:{port}/events")
+        LOG.info("Relay receiver started on http://127.0.0.1:%s/events", port)
         return runner
 
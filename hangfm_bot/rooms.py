@@ -0,0 +1,271 @@
+# hangfm_bot/rooms.py
+# Multi-room support: one RoomRuntime per room (context, queue, platform adapter, music state),
+# all sharing one HTTP session, AIManager, metadata cache and user memory in one event loop
+import asyncio
+import contextvars
+import logging
+import re
+import shutil
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from hangfm_bot.ai import RoomAI
+from hangfm_bot.message_queue import MessageQueue
+from hangfm_bot.music.discovery import DiscoveryEngine
+from hangfm_bot.music.recently_played import STATE_FILE as RECENTLY_PLAYED_FILE, RecentlyPlayed
+from hangfm_bot.music.taste_profiles import STATE_FILE as TASTE_PROFILES_FILE, TasteProfiles
+from hangfm_bot.platforms import create_adapter
+from hangfm_bot.play_history import HISTORY_DIR, PlayHistory
+from hangfm_bot.stage import StageManager
+
+LOG = logging.getLogger("rooms")
+
+# Set inside each room's worker task, so commands can tell which room they came from
+_CURRENT_ROOM: contextvars.ContextVar = contextvars.ContextVar("current_room", default=None)
+
+
+def parse_rooms(primary: str, extra: str, default_relay_url: str) -> List[Tuple[str, str]]:
+    """
+    Rooms to serve as (room_uuid, relay_url). `extra` is comma-separated
+    "uuid" or "uuid=relay_url" entries ("deepcut:ROOMID" for a Deepcut room);
+    the primary room always comes first.
+    """
+    rooms = [(primary, default_relay_url)]
+    seen = {primary}
+    for entry in extra.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        room_uuid, _, relay_url = entry.partition("=")
+        room_uuid = room_uuid.strip()
+        if room_uuid not in seen:
+            seen.add(room_uuid)
+            rooms.append((room_uuid, relay_url.strip().rstrip("/") or default_relay_url))
+    return rooms
+
+
+def room_state_dir(room_uuid: str, base_dir) -> Path:
+    """Directory for one room's state files (room IDs like "deepcut:ABC" made path-safe)"""
+    return Path(base_dir) / re.sub(r"[^A-Za-z0-9_.-]", "_", room_uuid)
+
+
+class SharedServices:
+    """
+    What every room's event pipeline shares within one process: command
+    handling, the content filter, user memory, metadata lookups, flood control
+    and link checks.
+    """
+
+    def __init__(self, command_handler, content_filter, user_memory, metadata_service=None, flood_control=None, link_safety=None):
+        self.command_handler = command_handler
+        self.content_filter = content_filter
+        self.user_memory = user_memory
+        self.metadata_service = metadata_service
+        self.flood_control = flood_control
+        self.link_safety = link_safety
+
+
+class RoomMusic:
+    """
+    A room's own music state, kept in its state directory: the play log and
+    stats, recently played (repeat checks), the DJs' taste profiles and the
+    discovery pools, which are screened against this room's recent plays.
+    """
+
+    def __init__(self, play_history: PlayHistory, recently_played: RecentlyPlayed, taste_profiles: TasteProfiles, discovery: Optional[DiscoveryEngine] = None):
+        self.play_history = play_history
+        self.recently_played = recently_played
+        self.taste_profiles = taste_profiles
+        self.discovery = discovery
+
+    @classmethod
+    def open(cls, data_dir, metadata_service=None, classifier=None, audio_hinter=None, settings=None, adopt_legacy: bool = False) -> "RoomMusic":
+        """
+        Load a room's state from data_dir. With adopt_legacy, a new data_dir takes over
+        the single-room files (play_history/, recently_played.json, ...) from the cwd.
+        """
+        if settings is None:
+            from hangfm_bot.config import settings
+        data_dir = Path(data_dir)
+        legacy = [HISTORY_DIR, RECENTLY_PLAYED_FILE, TASTE_PROFILES_FILE]
+        if adopt_legacy and not data_dir.exists() and any(path.exists() for path in legacy):
+            data_dir.mkdir(parents=True)
+            for path in legacy:
+                if path.exists():
+                    shutil.move(str(path), str(data_dir / path.name))
+            LOG.info(f"📦 Moved existing play history and taste files into {data_dir}")
+        data_dir.mkdir(parents=True, exist_ok=True)
+
+        recently_played = RecentlyPlayed(settings.recently_played_limit, settings.recently_played_artist_window, data_dir / RECENTLY_PLAYED_FILE.name)
+        discovery = None
+        if metadata_service is not None and classifier is not None:
+            discovery = DiscoveryEngine.from_settings(metadata_service, classifier, recently_played, settings, audio_hinter=audio_hinter)
+        return cls(PlayHistory(data_dir / HISTORY_DIR.name), recently_played, TasteProfiles(data_dir / TASTE_PROFILES_FILE.name), discovery)
+
+    def start(self):
+        if self.discovery:
+            self.discovery.start()
+
+    async def save(self):
+        """Periodic save (taste profiles can be large - written off the loop)"""
+        self.recently_played.save()
+        await asyncio.to_thread(self.taste_profiles.save)
+
+    async def close(self):
+        if self.discovery:
+            await self.discovery.stop()
+        self.recently_played.save()
+        self.taste_profiles.save()
+
+
+class RoomRuntime:
+    """
+    Everything that is per room: AI room context, message queue, the platform
+    adapter feeding it and sending replies, stage automation, music state
+    (play history, recently played, taste profiles, discovery pools), and the
+    worker task draining the queue. A slow AI reply in one room only holds up
+    that room's queue.
+    """
+
+    def __init__(self, room_uuid: str, ai_manager, session: aiohttp.ClientSession, relay_url: str, queue_size: int = 200, recorder=None, music: Optional[RoomMusic] = None):
+        self.room_uuid = room_uuid
+        self.queue = MessageQueue(maxsize=queue_size, recorder=recorder)
+        self.ai = RoomAI(ai_manager)
+        self.platform = create_adapter(room_uuid, self.queue, session, relay_url)
+        self.platform.on_connection_change = self._connection_changed
+        self.stage = StageManager.from_settings(self.platform)
+        self.music = music
+        self.events = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def short_id(self) -> str:
+        return self.room_uuid[:8]
+
+    @property
+    def context(self) -> dict:
+        return self.ai.room_context
+
+    def _connection_changed(self, connected: bool):
+        # While the room's socket is down the context can't be trusted - the AI prompt says so
+        self.ai.update_room_context({"stale": not connected})
+        if not connected:
+            LOG.warning("⚠️  Room %s has no %s connection - room context may be stale", self.short_id, self.platform.name)
+
+    async def start(self, scheduler, handler: Callable[["RoomRuntime", tuple], Awaitable[None]]):
+        """Start the platform adapter and process this room's queue with handler(room, item)"""
+        await self.platform.start(scheduler)
+        self.stage.start()
+        if self.music:
+            self.music.start()
+        self._task = asyncio.create_task(self._run(handler), name=f"room:{self.short_id}")
+
+    async def _run(self, handler):
+        _CURRENT_ROOM.set(self)
+        while True:
+            item = await self.queue.get()
+            self.events += 1
+            try:
+                await handler(self, item)
+            except Exception:
+                LOG.exception("❌ Room %s failed to process an item", self.short_id)
+
+    async def request_room_state(self) -> bool:
+        return await self.platform.request_room_state()
+
+    async def stop(self, scheduler):
+        await self.stage.stop()
+        await self.platform.stop(scheduler)
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.music:
+            await self.music.close()
+
+    def status(self) -> dict:
+        song = self.context.get("currentSong") or {}
+        return {
+            "room": self.room_uuid,
+            "platform": self.platform.name,
+            "connected": self.platform.connected,
+            "queued": self.queue.queue.qsize(),
+            "events": self.events,
+            "playing": f"{song.get('artistName')} - {song.get('trackName')}" if song else None,
+            "users": len(self.context.get("userList") or []),
+            "stage": self.stage.status(),
+        }
+
+
+class RoomRegistry:
+    """
+    The rooms this process serves. Owns the one aiohttp session (connection pool)
+    every room's platform adapter shares.
+    """
+
+    def __init__(
+        self,
+        ai_manager,
+        scheduler,
+        handler: Callable[[RoomRuntime, tuple], Awaitable[None]],
+        recorder=None,
+        queue_size: int = 200,
+        music_factory: Optional[Callable[[str], RoomMusic]] = None,
+    ):
+        self.ai_manager = ai_manager
+        self.scheduler = scheduler
+        self.handler = handler
+        self.recorder = recorder
+        self.queue_size = queue_size
+        self.music_factory = music_factory  # room_uuid -> that room's RoomMusic
+        self.session = aiohttp.ClientSession()
+        self.rooms: Dict[str, RoomRuntime] = {}
+        self.primary: Optional[RoomRuntime] = None
+        self._closed = asyncio.Event()
+
+    async def add(self, room_uuid: str, relay_url: str) -> RoomRuntime:
+        if room_uuid in self.rooms:
+            return self.rooms[room_uuid]
+        music = self.music_factory(room_uuid) if self.music_factory else None
+        room = RoomRuntime(room_uuid, self.ai_manager, self.session, relay_url, self.queue_size, self.recorder, music)
+        self.rooms[room_uuid] = room
+        if self.primary is None:
+            self.primary = room
+        await room.start(self.scheduler, self.handler)
+        LOG.info("🏠 Serving room %s (%s rooms)", room_uuid, len(self.rooms))
+        return room
+
+    async def remove(self, room_uuid: str):
+        room = self.rooms.pop(room_uuid, None)
+        if room is None:
+            return
+        await room.stop(self.scheduler)
+        if room is self.primary:
+            self.primary = next(iter(self.rooms.values()), None)
+        LOG.info("🏠 Stopped serving room %s", room_uuid)
+
+    def get(self, room_uuid: Optional[str]) -> Optional[RoomRuntime]:
+        return self.rooms.get(room_uuid) if room_uuid else None
+
+    def queue_for(self, room_uuid: Optional[str]) -> Optional[MessageQueue]:
+        """RelayReceiver router"""
+        room = self.get(room_uuid)
+        return room.queue if room else None
+
+    def current(self) -> RoomRuntime:
+        """The room whose event is being handled (the primary room outside a room worker)"""
+        return _CURRENT_ROOM.get() or self.primary
+
+    async def wait_closed(self):
+        await self._closed.wait()
+
+    async def close(self):
+        for room_uuid in list(self.rooms):
+            await self.remove(room_uuid)
+        await self.session.close()
+        self._closed.set()
@@ -0,0 +1,277 @@
+# hangfm_bot/scheduler.py
+# Central scheduler for periodic jobs: jittered timer wheel, one wakeup per due tick,
+# per-job runtime/CPU accounting and overrun detection
+import asyncio
+import inspect
+import logging
+import math
+import random
+import time
+import types
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+LOG = logging.getLogger("scheduler")
+
+JobFn = Callable[[], Union[None, Awaitable[None]]]
+
+
+@types.coroutine
+def _cpu_timed(coro, job: "Job"):
+    """
+    Drive `coro` step by step and add the thread CPU time of each step to job.cpu_time.
+    Time spent suspended (awaiting I/O) is not counted, so this is the job's own CPU cost
+    even while other coroutines interleave with it.
+    """
+    send, error = None, None
+    while True:
+        started = time.thread_time()
+        try:
+            if error is not None:
+                yielded = coro.throw(error)
+            else:
+                yielded = coro.send(send)
+        except StopIteration as stop:
+            job.cpu_time += time.thread_time() - started
+            return stop.value
+        except BaseException:
+            job.cpu_time += time.thread_time() - started
+            raise
+        job.cpu_time += time.thread_time() - started
+        try:
+            send, error = (yield yielded), None
+        except BaseException as e:
+            send, error = None, e
+
+
+class Job:
+    """A registered periodic job and its runtime counters"""
+
+    def __init__(self, name: str, fn: JobFn, interval: float, jitter: float = 0.1, run_immediately: bool = False):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.jitter = jitter  # Fraction of the interval each run may drift by (spreads jobs apart)
+        self.run_immediately = run_immediately
+        self.deadline = 0.0  # loop time of the next run
+        self.tick = 0  # wheel tick of the next run
+        self.task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.errors = 0
+        self.overruns = 0  # Runs that took longer than the interval
+        self.skipped = 0  # Runs dropped because the previous one was still going
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.max_wall = 0.0
+        self.last_wall = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def next_delay(self) -> float:
+        spread = self.interval * self.jitter
+        return max(0.0, self.interval + random.uniform(-spread, spread))
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "interval": self.interval,
+            "runs": self.runs,
+            "errors": self.errors,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "wall_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "avg_wall": self.wall_time / self.runs if self.runs else 0.0,
+            "max_wall": self.max_wall,
+            "last_wall": self.last_wall,
+        }
+
+
+class Scheduler:
+    """
+    Runs every periodic job from one loop. Deadlines are hashed into a timer wheel
+    of `wheel_size` slots, `resolution` seconds each; the loop sleeps until the next
+    occupied tick and fires everything due in that tick together, so jobs landing
+    close to each other share a single wakeup.
+
+    Each run is a separate task, so a slow job never delays the others. If a job is
+    still running when it comes due again, that run is skipped rather than stacked.
+    """
+
+    def __init__(self, resolution: float = 0.1, wheel_size: int = 1024, overrun_ratio: float = 1.0):
+        self.resolution = resolution
+        self.wheel_size = wheel_size
+        self.overrun_ratio = overrun_ratio  # A run slower than interval * ratio counts as an overrun
+        self.jobs: Dict[str, Job] = {}
+        self._wheel: List[List[Job]] = [[] for _ in range(wheel_size)]
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._started = 0.0
+        self._cursor = -1  # Last tick swept
+        self.wakeups = 0
+
+    # ── registration ──────────────────────────────────────────────
+
+    def add(self, name: str, fn: JobFn, every: float, jitter: float = 0.1, run_immediately: bool = False) -> Job:
+        """Register `fn` (sync or async, no arguments) to run every `every` seconds"""
+        if name in self.jobs:
+            self.remove(name)
+        job = Job(name, fn, every, jitter, run_immediately)
+        self.jobs[name] = job
+        if self._task is not None:
+            self._schedule(job, self._now() if run_immediately else self._now() + job.next_delay())
+        LOG.debug(f"Registered job {name} (every {every}s)")
+        return job
+
+    def job(self, name: str, every: float, jitter: float = 0.1, run_immediately: bool = False):
+        """Decorator form of add()"""
+        def register(fn: JobFn) -> JobFn:
+            self.add(name, fn, every, jitter, run_immediately)
+            return fn
+        return register
+
+    def remove(self, name: str):
+        job = self.jobs.pop(name, None)
+        if job is None:
+            return
+        slot = self._wheel[job.tick % self.wheel_size]
+        if job in slot:
+            slot.remove(job)
+        if job.running:
+            job.task.cancel()
+
+    # ── wheel ─────────────────────────────────────────────────────
+
+    def _now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def _tick_for(self, deadline: float) -> int:
+        # Small epsilon so float noise doesn't push an exact tick boundary into the next tick
+        return math.ceil((deadline - self._started) / self.resolution - 1e-6)
+
+    def _current_tick(self) -> int:
+        return math.floor((self._now() - self._started) / self.resolution + 1e-6)
+
+    def _schedule(self, job: Job, deadline: float):
+        job.deadline = deadline
+        # Never behind the cursor: ticks up to it have already been swept
+        job.tick = max(self._tick_for(deadline), self._cursor + 1)
+        self._wheel[job.tick % self.wheel_size].append(job)
+        self._wakeup.set()
+
+    def _next_tick(self) -> Optional[int]:
+        """Earliest occupied tick; scans at most one revolution of the wheel"""
+        for tick in range(self._cursor + 1, self._cursor + 1 + self.wheel_size):
+            if any(job.tick == tick for job in self._wheel[tick % self.wheel_size]):
+                return tick
+        # Every job is more than one revolution away
+        ticks = [job.tick for job in self.jobs.values()]
+        return min(ticks) if ticks else None
+
+    def _pop_due(self, tick: int) -> List[Job]:
+        """Sweep the slots between the cursor and `tick`, removing every job now due"""
+        due = []
+        for swept in range(self._cursor + 1, min(tick, self._cursor + self.wheel_size) + 1):
+            slot = self._wheel[swept % self.wheel_size]
+            if slot:
+                due.extend(job for job in slot if job.tick <= tick)
+                slot[:] = [job for job in slot if job.tick > tick]
+        self._cursor = tick
+        return due
+
+    # ── running ───────────────────────────────────────────────────
+
+    def start(self):
+        """Start the scheduler loop"""
+        if self._task is not None and not self._task.done():
+            return
+        self._started = self._now()
+        self._cursor = -1
+        for job in self.jobs.values():
+            self._schedule(job, self._started if job.run_immediately else self._started + job.next_delay())
+        self._task = asyncio.create_task(self._run())
+        LOG.info(f"⏱️ Scheduler started with {len(self.jobs)} jobs")
+
+    async def stop(self):
+        """Stop the loop and cancel any job runs in progress"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        running = [job.task for job in self.jobs.values() if job.running]
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            next_tick = self._next_tick()
+            if next_tick is None:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._started + next_tick * self.resolution - self._now()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    continue  # A job was added - recompute the next tick
+                except asyncio.TimeoutError:
+                    pass
+
+            self.wakeups += 1
+            for job in self._pop_due(max(self._current_tick(), next_tick)):
+                self._fire(job)
+
+    def _fire(self, job: Job):
+        now = self._now()
+        if job.running:
+            job.skipped += 1
+            LOG.warning(f"⏱️ Job {job.name} still running from its last run - skipping this one")
+        else:
+            job.task = asyncio.create_task(self._execute(job))
+
+        # Next deadline counts from the scheduled time so runs don't drift; runs missed
+        # while the loop was blocked are dropped instead of fired back to back
+        deadline = job.deadline + job.next_delay()
+        if deadline <= now:
+            deadline = now + job.next_delay()
+        if job.name in self.jobs:
+            self._schedule(job, deadline)
+
+    async def _execute(self, job: Job):
+        started = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(job.fn):
+                await _cpu_timed(job.fn(), job)
+            else:
+                cpu_started = time.thread_time()
+                try:
+                    job.fn()
+                finally:
+                    job.cpu_time += time.thread_time() - cpu_started
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.errors += 1
+            LOG.error(f"Job {job.name} failed: {e}")
+        finally:
+            elapsed = time.perf_counter() - started
+            job.runs += 1
+            job.wall_time += elapsed
+            job.last_wall = elapsed
+            job.max_wall = max(job.max_wall, elapsed)
+            if elapsed > job.interval * self.overrun_ratio:
+                job.overruns += 1
+                LOG.warning(f"⏱️ Job {job.name} overran: {elapsed:.2f}s (interval {job.interval}s)")
+
+    # ── reporting ─────────────────────────────────────────────────
+
+    def report(self) -> List[dict]:
+        """Per-job stats, biggest CPU consumers first"""
+        return sorted((job.stats() for job in self.jobs.values()), key=lambda s: s["cpu_time"], reverse=True)
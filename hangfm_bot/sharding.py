@@ -0,0 +1,348 @@
+# hangfm_bot/sharding.py
+# Multi-process mode: a supervisor runs N worker processes (each a normal bot serving a
+# subset of rooms), assigns rooms by consistent hashing and re-homes a crashed worker's rooms
+import asyncio
+import bisect
+import hashlib
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from hangfm_bot.metrics import SHARD_REHOMED, SHARD_RESTARTS, SHARD_UNROUTED, SHARD_WORKERS
+
+LOG = logging.getLogger("sharding")
+
+MAIN_PY = Path(__file__).resolve().parent.parent / "main.py"
+
+
+class HashRing:
+    """
+    Consistent hashing with virtual nodes: adding or removing a worker only
+    moves the rooms on that worker's arcs of the ring.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 64):
+        self.vnodes = vnodes
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+    @property
+    def nodes(self) -> List[str]:
+        return sorted(set(self._owners.values()))
+
+    def add(self, node: str):
+        for i in range(self.vnodes):
+            point = self._hash(f"{node}#{i}")
+            if point not in self._owners:
+                bisect.insort(self._points, point)
+                self._owners[point] = node
+
+    def remove(self, node: str):
+        points = [p for p, owner in self._owners.items() if owner == node]
+        for point in points:
+            del self._owners[point]
+        drop = set(points)
+        self._points = [p for p in self._points if p not in drop]
+
+    def node_for(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+    def assign(self, keys: Iterable[str]) -> Dict[str, List[str]]:
+        """node -> keys it owns (every ring node appears, possibly with none)"""
+        result: Dict[str, List[str]] = {node: [] for node in self.nodes}
+        for key in keys:
+            node = self.node_for(key)
+            if node is not None:
+                result[node].append(key)
+        return result
+
+
+def worker_state_path(path, worker_id: str = "") -> Path:
+    """
+    Where a worker process keeps a state file or directory that isn't in the
+    shared store: <dir>/workers/<worker_id>/<name>, so workers never write the
+    same file. Outside shard mode (no worker_id) the path is unchanged.
+    """
+    path = Path(path)
+    if not worker_id:
+        return path
+    scoped = path.parent / "workers" / worker_id / path.name
+    scoped.parent.mkdir(parents=True, exist_ok=True)
+    return scoped
+
+
+class ShardMember:
+    """
+    Worker side: heartbeats into the shared store and keeps this process's
+    RoomRegistry in step with the rooms the supervisor assigned to it. Store
+    calls run in a worker thread so a busy SQLite file never stalls the loop.
+    """
+
+    def __init__(self, worker_id: str, store, rooms, port: int):
+        self.worker_id = worker_id
+        self.store = store
+        self.rooms = rooms
+        self.port = port
+
+    async def heartbeat(self):
+        beat = {"pid": os.getpid(), "port": self.port, "rooms": len(self.rooms.rooms)}
+        await asyncio.to_thread(self.store.set, "workers", self.worker_id, beat)
+
+    async def sync(self):
+        assigned = await asyncio.to_thread(self.store.get, "assignments", self.worker_id)
+        wanted = {room_uuid: relay_url for room_uuid, relay_url in (assigned or [])}
+        for room_uuid in [r for r in self.rooms.rooms if r not in wanted]:
+            await self.rooms.remove(room_uuid)
+        for room_uuid, relay_url in wanted.items():
+            if room_uuid not in self.rooms.rooms:
+                await self.rooms.add(room_uuid, relay_url)  # Its adapter fetches fresh room state once connected
+
+
+class _Worker:
+    def __init__(self, worker_id: str, port: int):
+        self.worker_id = worker_id
+        self.port = port
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        self.spawned_at = 0.0
+        self.live = False  # In the ring (has heartbeated since its last spawn)
+        self.live_since = 0.0
+        self.crashes = 0  # Consecutive - sets the restart backoff
+        self.restart_at: Optional[float] = None
+
+
+class Supervisor:
+    """
+    Spawns worker processes (main.py with SHARD_WORKER_ID set), writes each
+    worker's room assignment to the shared store and fronts the relays: every
+    relay posts to the supervisor's port, which forwards the event to the
+    worker that owns the room. A worker that exits or stops heartbeating is
+    dropped from the ring (its rooms move to the others) and restarted with
+    backoff; once it heartbeats again it gets its rooms back. Store calls run
+    in a worker thread so relay forwarding never waits on SQLite.
+    """
+
+    def __init__(
+        self,
+        rooms: List[Tuple[str, str]],
+        workers: int,
+        store,
+        port: int,
+        worker_port_base: Optional[int] = None,
+        heartbeat_timeout: float = 15.0,
+        max_backoff: float = 60.0,
+        worker_cmd: Optional[List[str]] = None,
+        worker_env: Optional[Dict[str, str]] = None,
+    ):
+        self.rooms = dict(rooms)  # room_uuid -> relay_url
+        self.primary_room = rooms[0][0]
+        self.store = store
+        self.port = port
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_backoff = max_backoff
+        self.worker_cmd = worker_cmd or [sys.executable, str(MAIN_PY)]
+        self.worker_env = worker_env or {}
+        base = worker_port_base or port + 1
+        self.workers = {f"w{i}": _Worker(f"w{i}", base + i) for i in range(workers)}
+        self.ring = HashRing()
+        self.owner: Dict[str, str] = {}  # room_uuid -> worker_id
+        self.session = None
+        self._runner = None
+        self._stopping = False
+
+    # ── workers ───────────────────────────────────────────────────
+
+    async def _spawn(self, worker: _Worker):
+        env = dict(os.environ)
+        env.update(self.worker_env)
+        env.update({
+            "SHARD_WORKERS": "0",
+            "SHARD_WORKER_ID": worker.worker_id,
+            "SHARED_STORE": str(self.store.path.resolve()),
+            "RELAY_RECEIVER_PORT": str(worker.port),
+        })
+        await asyncio.to_thread(self.store.delete, "workers", worker.worker_id)
+        worker.proc = await asyncio.create_subprocess_exec(*self.worker_cmd, env=env)
+        worker.spawned_at = time.monotonic()
+        worker.restart_at = None
+        LOG.info("🚀 Worker %s started (pid %s, port %s)", worker.worker_id, worker.proc.pid, worker.port)
+
+    async def _kill(self, worker: _Worker):
+        if worker.proc and worker.proc.returncode is None:
+            worker.proc.kill()
+            await worker.proc.wait()
+
+    async def _rebalance(self):
+        """Recompute room owners from the ring and publish every worker's assignment"""
+        assignment = self.ring.assign(self.rooms)
+        owner = {room: worker_id for worker_id, rooms in assignment.items() for room in rooms}
+        moved = sum(1 for room, worker_id in owner.items() if room in self.owner and self.owner[room] != worker_id)
+        if moved:
+            SHARD_REHOMED.inc(moved)
+        self.owner = owner
+        await asyncio.to_thread(self.store.replace_all, "assignments", {
+            worker_id: [[room, self.rooms[room]] for room in assignment.get(worker_id, [])]
+            for worker_id in self.workers
+        })
+        SHARD_WORKERS.set(len(self.ring.nodes))
+        LOG.info("🧭 Rooms assigned: %s", ", ".join(f"{w}={len(r)}" for w, r in sorted(assignment.items())) or "no live workers")
+
+    async def _drop(self, worker: _Worker, reason: str):
+        LOG.warning("💥 Worker %s %s - re-homing its rooms", worker.worker_id, reason)
+        if worker.live:
+            worker.live = False
+            self.ring.remove(worker.worker_id)
+            await self._rebalance()
+        if time.monotonic() - worker.live_since > 60:
+            worker.crashes = 0  # Ran fine for a while - start the backoff over
+        worker.crashes += 1
+        backoff = min(2 ** (worker.crashes - 1), self.max_backoff)
+        worker.restart_at = time.monotonic() + backoff
+        SHARD_RESTARTS.inc()
+
+    async def _check(self):
+        now = time.monotonic()
+        ages = await asyncio.to_thread(self.store.ages, "workers")  # Seconds since each worker's heartbeat
+        for worker in self.workers.values():
+            if worker.restart_at is not None:
+                if now >= worker.restart_at:
+                    await self._spawn(worker)
+                continue
+            if worker.proc.returncode is not None:
+                await self._drop(worker, f"exited with code {worker.proc.returncode}")
+                continue
+            age = ages.get(worker.worker_id)
+            if not worker.live:
+                if age is not None:
+                    worker.live = True
+                    worker.live_since = now
+                    self.ring.add(worker.worker_id)
+                    await self._rebalance()
+                elif now - worker.spawned_at > self.heartbeat_timeout * 2:
+                    await self._kill(worker)
+                    await self._drop(worker, "never heartbeated")
+            elif age is None or age > self.heartbeat_timeout:
+                await self._kill(worker)
+                await self._drop(worker, f"stopped heartbeating ({age or 0:.0f}s)")
+
+    # ── front door for the relays ─────────────────────────────────
+
+    async def _handle_event(self, request):
+        from aiohttp import web
+
+        data = await request.json()
+        room = data.get("room") or self.primary_room
+        data["room"] = room
+        worker = self.workers.get(self.owner.get(room, ""))
+        if worker is None or not worker.live:
+            SHARD_UNROUTED.inc()
+            return web.json_response({"ok": False, "error": "no live worker for room"}, status=503)
+        try:
+            async with self.session.post(f"http://127.0.0.1:{worker.port}/events", json=data) as resp:
+                return web.json_response(await resp.json(), status=resp.status)
+        except Exception as e:
+            SHARD_UNROUTED.inc()
+            return web.json_response({"ok": False, "error": str(e)}, status=502)
+
+    async def _handle_metrics(self, request):
+        from aiohttp import web
+        from hangfm_bot.metrics import REGISTRY
+
+        return web.Response(
+            body=REGISTRY.render().encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    async def _handle_shards(self, request):
+        from aiohttp import web
+
+        return web.json_response(await self.status())
+
+    async def status(self) -> dict:
+        heartbeats = await asyncio.to_thread(self.store.items, "workers")
+        return {
+            worker_id: {
+                "live": worker.live,
+                "pid": worker.proc.pid if worker.proc else None,
+                "port": worker.port,
+                "rooms": sorted(room for room, owner in self.owner.items() if owner == worker_id),
+                "crashes": worker.crashes,
+                "heartbeat": heartbeats.get(worker_id),
+            }
+            for worker_id, worker in self.workers.items()
+        }
+
+    # ── lifecycle ─────────────────────────────────────────────────
+
+    async def start(self):
+        import aiohttp
+        from aiohttp import web
+
+        await asyncio.to_thread(self.store.replace_all, "assignments", {})
+        await asyncio.to_thread(self.store.replace_all, "workers", {})
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        app = web.Application()
+        app.router.add_post("/events", self._handle_event)
+        app.router.add_get("/metrics", self._handle_metrics)
+        app.router.add_get("/shards", self._handle_shards)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", self.port).start()
+        for worker in self.workers.values():
+            await self._spawn(worker)
+        LOG.info("🧩 Supervisor on :%s - %s rooms across %s workers", self.port, len(self.rooms), len(self.workers))
+
+    async def run(self, check_interval: float = 0.5):
+        await self.start()
+        try:
+            while not self._stopping:
+                await self._check()
+                await asyncio.sleep(check_interval)
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        self._stopping = True
+        for worker in self.workers.values():
+            if worker.proc and worker.proc.returncode is None:
+                worker.proc.terminate()
+        for worker in self.workers.values():
+            if worker.proc:
+                try:
+                    await asyncio.wait_for(worker.proc.wait(), timeout=10)
+                except asyncio.TimeoutError:
+                    await self._kill(worker)
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+
+async def run_supervisor():
+    """`SHARD_WORKERS=N python main.py` entry point"""
+    from hangfm_bot.config import settings
+    from hangfm_bot.log_pipeline import setup_logging, stop_logging
+    from hangfm_bot.rooms import parse_rooms
+    from hangfm_bot.shared_store import open_store
+
+    setup_logging(getattr(logging, settings.log_level.upper(), logging.INFO), settings.log_format, settings.log_file, settings.log_rate_per_sec)
+    rooms = parse_rooms(settings.room_uuid, settings.extra_rooms, settings.relay_url)
+    store = open_store(settings.shared_store or "shared_store.db")
+    supervisor = Supervisor(rooms, settings.shard_workers, store, settings.relay_receiver_port)
+    try:
+        await supervisor.run()
+    finally:
+        stop_logging()
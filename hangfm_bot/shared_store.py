@@ -0,0 +1,133 @@
+# hangfm_bot/shared_store.py
+# SQLite key/value store shared by shard worker processes: metadata cache, user memory,
+# plus the supervisor's room assignments and worker heartbeats
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+LOG = logging.getLogger("shared_store")
+
+
+class SharedStore:
+    """
+    Namespaced JSON values in one SQLite file. WAL mode, so any number of
+    processes can read while one writes; every write is its own short
+    transaction. Each value keeps its write time for max_age checks.
+
+    Every call can wait up to busy_timeout on another process's write, so
+    code on the event loop runs them through asyncio.to_thread.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = Path(path)
+        self._lock = threading.Lock()  # One connection per process, shared with to_thread workers
+        self._db = sqlite3.connect(str(self.path), timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            "ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, ts REAL NOT NULL, "
+            "PRIMARY KEY (ns, key))"
+        )
+        LOG.debug("SharedStore opened: %s", self.path)
+
+    def get(self, ns: str, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """Value for key, or None if missing (or older than max_age seconds)"""
+        with self._lock:
+            row = self._db.execute("SELECT value, ts FROM kv WHERE ns = ? AND key = ?", (ns, key)).fetchone()
+        if row is None or (max_age is not None and time.time() - row[1] >= max_age):
+            return None
+        return json.loads(row[0])
+
+    def set(self, ns: str, key: str, value: Any):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO kv (ns, key, value, ts) VALUES (?, ?, ?, ?)",
+                (ns, key, json.dumps(value), time.time()),
+            )
+
+    def replace_all(self, ns: str, values: Dict[str, Any]):
+        """Atomically swap a whole namespace for `values`"""
+        now = time.time()
+        rows = [(ns, key, json.dumps(value), now) for key, value in values.items()]
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("DELETE FROM kv WHERE ns = ?", (ns,))
+                self._db.executemany("INSERT INTO kv (ns, key, value, ts) VALUES (?, ?, ?, ?)", rows)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def merge(self, ns: str, updates: Dict[str, Callable[[Optional[Any]], Any]]) -> Dict[str, Any]:
+        """
+        Read-modify-write several keys in one transaction: each fn gets the current
+        value (or None) and returns the new one. No other process can write in
+        between, so concurrent updates to the same key are never lost.
+        """
+        merged = {}
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for key, fn in updates.items():
+                    row = self._db.execute("SELECT value FROM kv WHERE ns = ? AND key = ?", (ns, key)).fetchone()
+                    merged[key] = fn(json.loads(row[0]) if row else None)
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO kv (ns, key, value, ts) VALUES (?, ?, ?, ?)",
+                        (ns, key, json.dumps(merged[key]), now),
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return merged
+
+    def delete(self, ns: str, key: str):
+        with self._lock:
+            self._db.execute("DELETE FROM kv WHERE ns = ? AND key = ?", (ns, key))
+
+    def items(self, ns: str, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """Every (fresh enough) value in a namespace"""
+        oldest = time.time() - max_age if max_age is not None else float("-inf")
+        with self._lock:
+            rows = self._db.execute("SELECT key, value FROM kv WHERE ns = ? AND ts > ?", (ns, oldest)).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def age(self, ns: str, key: str) -> Optional[float]:
+        """Seconds since key was last written, or None if missing"""
+        with self._lock:
+            row = self._db.execute("SELECT ts FROM kv WHERE ns = ? AND key = ?", (ns, key)).fetchone()
+        return time.time() - row[0] if row else None
+
+    def ages(self, ns: str) -> Dict[str, float]:
+        """Seconds since each key in a namespace was last written"""
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute("SELECT key, ts FROM kv WHERE ns = ?", (ns,)).fetchall()
+        return {key: now - ts for key, ts in rows}
+
+    def prune(self, ns: str, max_age: float) -> int:
+        """Drop values older than max_age seconds"""
+        with self._lock:
+            return self._db.execute("DELETE FROM kv WHERE ns = ? AND ts <= ?", (ns, time.time() - max_age)).rowcount
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_stores: Dict[str, SharedStore] = {}
+
+
+def open_store(path: str) -> SharedStore:
+    """One SharedStore per file per process"""
+    key = str(Path(path).resolve())
+    if key not in _stores:
+        _stores[key] = SharedStore(path)
+    return _stores[key]
@@ -0,0 +1,351 @@
+# hangfm_bot/stage.py
+# AFK-DJ removal and auto hop up/down (the OG bot's checkAFKDJs / checkAutoStageManagement),
+# driven by an activity index and a deadline heap instead of periodic scans of the stage
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from hangfm_bot.metrics import STAGE_ACTIONS
+
+LOG = logging.getLogger("stage")
+
+
+def user_id_of(data: dict) -> str:
+    """User UUID from any of the payload shapes the platforms send"""
+    if not isinstance(data, dict):
+        return ""
+    return (
+        data.get("uuid") or data.get("userUuid") or data.get("djUuid") or data.get("userId") or data.get("uid")
+        or (data.get("userProfile") or {}).get("uuid") or (data.get("user") or {}).get("uuid") or ""
+    )
+
+
+def name_of(data: dict) -> str:
+    if not isinstance(data, dict):
+        return ""
+    profile = data.get("userProfile") or data.get("user") or {}
+    return data.get("name") or data.get("nickname") or data.get("displayName") or profile.get("nickname") or profile.get("name") or ""
+
+
+class ActivityIndex:
+    """
+    Last activity time per user UUID. touch() and last() are O(1); at most
+    max_users users are remembered, least recently active dropped first.
+    """
+
+    def __init__(self, max_users: int = 5000, clock: Callable[[], float] = time.monotonic):
+        self.max_users = max_users
+        self.clock = clock
+        self._last: "OrderedDict[str, float]" = OrderedDict()
+
+    def touch(self, user_uuid: str, now: float = None) -> float:
+        now = self.clock() if now is None else now
+        self._last[user_uuid] = now
+        self._last.move_to_end(user_uuid)
+        if len(self._last) > self.max_users:
+            self._last.popitem(last=False)
+        return now
+
+    def last(self, user_uuid: str) -> Optional[float]:
+        return self._last.get(user_uuid)
+
+    def forget(self, user_uuid: str):
+        self._last.pop(user_uuid, None)
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+
+class _Dj:
+    __slots__ = ("name", "stint", "warned_at")
+
+    def __init__(self, name: str, stint: int):
+        self.name = name
+        self.stint = stint  # Heap entries from an earlier time on stage carry an older stint and are dropped
+        self.warned_at = 0.0
+
+
+class StageManager:
+    """
+    One room's stage automation. Chat, vote, play and DJ events update the
+    activity index and the DJ set in O(1); everything time-based is an entry
+    in one min-heap of (due, seq, kind, key):
+
+      "afk"   one per DJ on stage, due when they go idle for afk_timeout
+              (warn in chat) and again afk_warning later (remove from stage).
+              Activity doesn't touch the heap: when the entry comes due it is
+              pushed back to last activity + afk_timeout if they were active.
+      "stage" re-check auto hop up/down now or when the hop cooldown ends
+      "vote"  upvote the current song auto_upvote after it started
+
+    A single task sleeps until the earliest entry is due, so nothing is
+    scanned on a timer. Actions go out through the room's platform adapter
+    (hop_up / hop_down / vote), off the room's queue worker.
+    """
+
+    def __init__(
+        self,
+        platform,
+        afk_timeout: float = 36 * 60,
+        afk_warning: float = 36.0,
+        auto_stage: bool = False,
+        hop_up_max_djs: int = 3,
+        hop_down_humans: int = 3,
+        hop_cooldown: float = 120.0,
+        auto_upvote: float = 0.0,
+        activity: Optional[ActivityIndex] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.platform = platform
+        self.afk_timeout = afk_timeout  # 0 = no AFK removal
+        self.afk_warning = afk_warning
+        self.auto_stage = auto_stage
+        self.hop_up_max_djs = hop_up_max_djs
+        self.hop_down_humans = hop_down_humans
+        self.hop_cooldown = hop_cooldown
+        self.auto_upvote = auto_upvote  # Seconds after a song starts; 0 = off
+        self.clock = clock
+        self.activity = activity or ActivityIndex(clock=clock)
+        self.glued = False  # Kept off stage by /.glue
+        self.djs: "OrderedDict[str, _Dj]" = OrderedDict()
+        self.bot_songs = 0  # Songs the bot has played since it last hopped up
+        self._cooldown_until = 0.0
+        self._stage_due: Optional[float] = None
+        self._song = 0
+        self._heap: List[Tuple[float, int, str, object]] = []
+        self._seq = itertools.count()
+        self._stints = itertools.count(1)
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_settings(cls, platform) -> "StageManager":
+        from hangfm_bot.config import settings
+
+        return cls(
+            platform,
+            afk_timeout=settings.afk_timeout_sec,
+            afk_warning=settings.afk_warning_sec,
+            auto_stage=settings.auto_stage,
+            hop_up_max_djs=settings.auto_stage_hop_up_max_djs,
+            hop_down_humans=settings.auto_stage_hop_down_humans,
+            hop_cooldown=settings.auto_stage_cooldown_sec,
+            auto_upvote=settings.auto_upvote_delay_sec,
+        )
+
+    @property
+    def bot_id(self) -> str:
+        return self.platform.user_id
+
+    @property
+    def bot_on_stage(self) -> bool:
+        return bool(self.bot_id) and self.bot_id in self.djs
+
+    # ── deadline heap ─────────────────────────────────────────────
+
+    def _push(self, due: float, kind: str, key=None):
+        wake = not self._heap or due < self._heap[0][0]
+        heapq.heappush(self._heap, (due, next(self._seq), kind, key))
+        if wake:
+            self._wake.set()
+
+    def _schedule_stage(self, due: float):
+        if self._stage_due is None or due < self._stage_due:
+            self._stage_due = due
+            self._push(due, "stage")
+
+    def pop_due(self, now: float) -> List[Tuple[str, object]]:
+        """Remove and return the (kind, key) of every entry due by now"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, kind, key = heapq.heappop(self._heap)
+            due.append((kind, key))
+        return due
+
+    @property
+    def next_due(self) -> Optional[float]:
+        return self._heap[0][0] if self._heap else None
+
+    # ── events (called from the room's queue worker, O(1) each) ───
+
+    def touch(self, user_uuid: str):
+        """Chat or vote from a user"""
+        if not user_uuid:
+            return
+        self.activity.touch(user_uuid)
+        dj = self.djs.get(user_uuid)
+        if dj is not None and dj.warned_at:
+            dj.warned_at = 0.0
+            LOG.info("✅ %s is back - AFK warning cleared", dj.name or user_uuid)
+
+    def dj_added(self, user_uuid: str, name: str = ""):
+        if not user_uuid or user_uuid in self.djs:
+            return
+        dj = self.djs[user_uuid] = _Dj(name, next(self._stints))
+        now = self.activity.touch(user_uuid)  # Hopping up counts as activity
+        if user_uuid == self.bot_id:
+            self.bot_songs = 0
+        elif self.afk_timeout:
+            self._push(now + self.afk_timeout, "afk", (user_uuid, dj.stint))
+        self._schedule_stage(now)
+
+    def dj_removed(self, user_uuid: str):
+        # Its "afk" entry is dropped when it comes due (the DJ, or their stint, is gone)
+        if self.djs.pop(user_uuid, None) is not None:
+            self._schedule_stage(self.clock())
+
+    def sync_djs(self, djs: list):
+        """Reconcile with a full room state; DJs without a UUID leave the set alone"""
+        ids = [(user_id_of(dj), name_of(dj)) for dj in djs if isinstance(dj, dict)]
+        if not ids or not all(uuid for uuid, _ in ids):
+            return
+        current = {uuid for uuid, _ in ids}
+        for uuid in [uuid for uuid in self.djs if uuid not in current]:
+            self.djs.pop(uuid)
+        for uuid, name in ids:
+            self.dj_added(uuid, name)
+        self._schedule_stage(self.clock())
+
+    def song_played(self, dj_uuid: str):
+        if dj_uuid:
+            self.activity.touch(dj_uuid)
+            if dj_uuid == self.bot_id:
+                self.bot_songs += 1
+        self._song += 1
+        now = self.clock()
+        if self.auto_upvote and dj_uuid != self.bot_id:
+            self._push(now + self.auto_upvote, "vote", self._song)
+        self._schedule_stage(now)
+
+    def handle_event(self, event_type: str, data):
+        """Feed one pipeline event in"""
+        if not isinstance(data, dict):
+            return
+        if event_type == "addedDj":
+            self.dj_added(user_id_of(data), name_of(data))
+        elif event_type == "removedDj":
+            self.dj_removed(user_id_of(data))
+        elif event_type == "votedOnSong":
+            self.touch(user_id_of(data))
+        elif event_type == "statelessMessage" and data.get("name") == "votedOnSong":
+            self.touch(user_id_of(data.get("params") or {}))
+        elif event_type == "playedSong":
+            self.song_played(data.get("djUuid") or user_id_of(data.get("user") or {}))
+        elif event_type == "roomStateUpdated" and isinstance(data.get("djs"), list):
+            self.sync_djs(data["djs"])
+
+    # ── due work ──────────────────────────────────────────────────
+
+    async def _afk(self, key, now: float):
+        user_uuid, stint = key
+        dj = self.djs.get(user_uuid)
+        if dj is None or dj.stint != stint or not self.afk_timeout:
+            return
+        last = self.activity.last(user_uuid)
+        if last is None:  # Dropped from the index - start their clock over
+            last = self.activity.touch(user_uuid, now)
+        name = dj.name or user_uuid[:8]
+        if dj.warned_at:
+            if now < dj.warned_at + self.afk_warning:
+                self._push(dj.warned_at + self.afk_warning, "afk", key)
+                return
+            LOG.info("⏰ AFK timeout: removing %s from stage", name)
+            if await self.platform.hop_down(user_uuid):
+                STAGE_ACTIONS.labels("afk_remove").inc()
+                await self.platform.send_message(f"⏰ AFK Removal: {name} was removed from stage due to inactivity.")
+                self.djs.pop(user_uuid, None)
+            else:
+                dj.warned_at = 0.0  # Start over rather than retrying every tick
+                self._push(now + self.afk_timeout, "afk", key)
+            return
+        if now < last + self.afk_timeout:
+            self._push(last + self.afk_timeout, "afk", key)
+            return
+        dj.warned_at = now
+        minutes = int((now - last) // 60)
+        LOG.info("⚠️ AFK detected: %s inactive for %s minutes", name, minutes)
+        STAGE_ACTIONS.labels("afk_warn").inc()
+        await self.platform.send_message(f"⚠️ AFK Warning: @{name} - You've been inactive for {minutes} minutes. Vote or chat within {self.afk_warning:.0f} seconds or you'll be removed from stage.")
+        self._push(now + self.afk_warning, "afk", key)
+
+    async def _stage(self, now: float):
+        self._stage_due = None
+        if not self.auto_stage or not self.bot_id or not self.platform.connected:
+            return
+        count = len(self.djs)
+        if not self.bot_on_stage:
+            if self.glued or count > self.hop_up_max_djs:
+                return
+            if now < self._cooldown_until:
+                self._schedule_stage(self._cooldown_until)
+                return
+            LOG.info("🎧 Auto hop up: only %s DJs on stage", count)
+            if await self.platform.hop_up():
+                STAGE_ACTIONS.labels("hop_up").inc()
+                self.dj_added(self.bot_id, "")
+            else:
+                self._cooldown_until = now + self.hop_cooldown
+            return
+        humans = count - 1
+        if humans >= self.hop_down_humans and self.bot_songs >= 1:
+            LOG.info("🎧 Auto hop down: %s humans on stage (making room)", humans)
+            if await self.platform.hop_down():
+                STAGE_ACTIONS.labels("hop_down").inc()
+                self.djs.pop(self.bot_id, None)
+            self._cooldown_until = now + self.hop_cooldown  # Don't hop straight back up
+
+    async def _vote(self, song: int):
+        if song == self._song and await self.platform.vote(True):
+            STAGE_ACTIONS.labels("upvote").inc()
+
+    async def run_due(self, now: float = None):
+        now = self.clock() if now is None else now
+        for kind, key in self.pop_due(now):
+            try:
+                if kind == "afk":
+                    await self._afk(key, now)
+                elif kind == "stage":
+                    await self._stage(now)
+                elif kind == "vote":
+                    await self._vote(key)
+            except Exception:
+                LOG.exception("❌ Stage %s job failed", kind)
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            due = self.next_due
+            timeout = None if due is None else max(due - self.clock(), 0.0)
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                    continue  # An earlier entry was pushed - look again
+                except asyncio.TimeoutError:
+                    pass
+            await self.run_due()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"stage:{self.platform.room_id[:8]}")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> dict:
+        return {
+            "djs": len(self.djs),
+            "bot_on_stage": self.bot_on_stage,
+            "afk_warned": sum(1 for dj in self.djs.values() if dj.warned_at),
+            "glued": self.glued,
+            "pending": len(self._heap),
+        }
@@ -0,0 +1,55 @@
+# hangfm_bot/startup.py
+# Startup-phase timing: how long interpreter start, imports, settings, persistence and the first event took
+import os
+import time
+from typing import List, Tuple
+
+
+def _process_age() -> float:
+    """Seconds since this process started (Linux /proc, ~10ms resolution); 0.0 if unknown"""
+    try:
+        with open("/proc/self/stat") as f:
+            # starttime (field 22) in clock ticks since boot; fields after the ")" of the command name
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+# Anchored at process start, so the report covers the interpreter and every import
+# (main.py imports this module before anything else)
+_STARTED = time.perf_counter() - _process_age()
+
+
+class StartupTimer:
+    """Marks named phases; each phase's time is measured from the previous mark"""
+
+    def __init__(self, started: float = _STARTED):
+        self.started = started
+        self.phases: List[Tuple[str, float]] = []  # (phase, seconds since start)
+
+    def mark(self, phase: str):
+        if not any(name == phase for name, _ in self.phases):
+            self.phases.append((phase, time.perf_counter() - self.started))
+
+    def done(self, phase: str) -> bool:
+        return any(name == phase for name, _ in self.phases)
+
+    def durations(self) -> List[Tuple[str, float]]:
+        previous = 0.0
+        result = []
+        for name, at in self.phases:
+            result.append((name, at - previous))
+            previous = at
+        return result
+
+    def report(self) -> str:
+        parts = [f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.durations()]
+        total = self.phases[-1][1] if self.phases else 0.0
+        return f"⏱️ Startup {total:.2f}s: " + ", ".join(parts)
+
+
+STARTUP = StartupTimer()
+STARTUP.mark("interpreter")  # Python start-up and anything that ran before main.py imported this
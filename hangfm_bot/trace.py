@@ -0,0 +1,75 @@
+# hangfm_bot/trace.py
+# Record every event entering the MessageQueue to a gzip'd JSON-lines trace for offline replay
+import gzip
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Iterator, Tuple
+
+LOG = logging.getLogger("trace")
+
+TraceEvent = Tuple[float, str, object]  # (seconds since trace start, event_type, payload)
+
+
+class TraceRecorder:
+    """
+    Appends one line per event: {"t": offset_seconds, "e": event_type, "p": payload}.
+    The first line is a header with the wall-clock start time. Writes go through
+    gzip's buffer; flush() (scheduled) and close() (shutdown) push them to disk.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = gzip.open(self.path, "at", encoding="utf-8")
+        self._started = time.perf_counter()
+        self.events = 0
+        self._write({"trace": 1, "started": time.time(), "pid": os.getpid()})
+        LOG.info(f"📼 Recording event trace to {self.path}")
+
+    def _write(self, record: dict):
+        self._file.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+
+    def record(self, item):
+        """Record one (event_type, payload) queue item"""
+        if self._file is None:
+            return
+        event_type, payload = item
+        try:
+            self._write({"t": round(time.perf_counter() - self._started, 6), "e": event_type, "p": payload})
+            self.events += 1
+        except Exception as e:
+            LOG.debug(f"Trace write failed: {e}")
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            LOG.info(f"📼 Trace closed: {self.events} events in {self.path}")
+
+
+def read_trace(path) -> Iterator[TraceEvent]:
+    """
+    Yield (offset, event_type, payload) from a trace file. A recorder appending to an
+    existing file starts a new segment; offsets are shifted so segments play back to back.
+    """
+    base = 0.0
+    last = 0.0
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Torn write at the end of a trace - stop there
+                break
+            if "trace" in record:
+                base = last
+                continue
+            last = base + record["t"]
+            yield last, record["e"], record["p"]
@@ -1,21 +1,107 @@
 # user_memory.py
+import asyncio
 import json
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional
 from datetime import datetime
 from pathlib import Path
 
+from hangfm_bot.utils.pattern_matcher import get_shared_matcher
+
 LOG = logging.getLogger(__name__)
 
 class UserMemory:
-    """Track user sentiment and conversation history (like OG bot)"""
+    """
+    Track user sentiment and conversation history (like OG bot).
+    With a SharedStore, each user is one row shared by every shard worker
+    instead of one JSON file per process. Changes are kept as per-user deltas
+    and merged into the row by flush() in a worker thread (one transaction,
+    so two workers never overwrite each other); refresh() re-reads a row
+    off the loop before a message is handled.
+    """
+    
+    NAMESPACE = "user_memory"
+    CONTEXT_LIMIT = 10
     
-    def __init__(self, data_file: str = "user_memory.json"):
+    def __init__(self, data_file: str = "user_memory.json", store=None):
         self.data_file = Path(data_file)
+        self.store = store
         self.users: Dict[str, dict] = {}
-        self._load()
+        self._pending: Dict[str, dict] = {}  # user_uuid -> changes not yet in the shared store
+        if store is None:
+            self._load()
         LOG.debug(f"UserMemory initialized with {len(self.users)} users")
     
+    @staticmethod
+    def _new_user(user_name: str) -> dict:
+        now = datetime.now().isoformat()
+        return {
+            "name": user_name,
+            "sentiment": "neutral",  # neutral, positive, negative
+            "interactions": 0,
+            "first_seen": now,
+            "last_seen": now,
+            "context": []  # Recent conversation history
+        }
+    
+    @classmethod
+    def _apply(cls, row: Optional[dict], delta: dict) -> dict:
+        """Fold one user's pending changes into a row: counters add, context appends, the rest overwrite"""
+        row = dict(row) if row else cls._new_user(delta.get("name", "Unknown"))
+        row["interactions"] = row.get("interactions", 0) + delta.get("interactions", 0)
+        row["context"] = (list(row.get("context") or []) + delta.get("context", []))[-cls.CONTEXT_LIMIT:]
+        for field in ("name", "sentiment", "last_seen"):
+            if field in delta:
+                row[field] = delta[field]
+        return row
+    
+    def _change(self, user_uuid: str, **fields):
+        """Record a change for the next flush (shared store only)"""
+        if self.store is None:
+            return
+        delta = self._pending.setdefault(user_uuid, {})
+        for field, value in fields.items():
+            if field == "interactions":
+                delta["interactions"] = delta.get("interactions", 0) + value
+            elif field == "context":
+                delta.setdefault("context", []).append(value)
+            else:
+                delta[field] = value
+    
+    async def refresh(self, user_uuid: str):
+        """Pick up what other workers wrote for this user (no-op without a shared store)"""
+        if self.store is None:
+            return
+        shared = await asyncio.to_thread(self.store.get, self.NAMESPACE, user_uuid)
+        if shared is not None:
+            pending = self._pending.get(user_uuid)
+            self.users[user_uuid] = self._apply(shared, pending) if pending else shared
+    
+    async def flush(self):
+        """Merge pending changes into the shared store, off the loop"""
+        if self.store is None or not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        updates = {user_uuid: (lambda row, delta=delta: self._apply(row, delta)) for user_uuid, delta in pending.items()}
+        try:
+            merged = await asyncio.to_thread(self.store.merge, self.NAMESPACE, updates)
+        except Exception as e:
+            LOG.error(f"Failed to save user memory: {e}")
+            for user_uuid, delta in pending.items():  # Keep them for the next flush, ahead of newer changes
+                newer = self._pending.get(user_uuid)
+                self._pending[user_uuid] = self._apply_delta(delta, newer) if newer else delta
+            return
+        for user_uuid, row in merged.items():
+            newer = self._pending.get(user_uuid)
+            self.users[user_uuid] = self._apply(row, newer) if newer else row
+    
+    @staticmethod
+    def _apply_delta(older: dict, newer: dict) -> dict:
+        combined = {**older, **newer}
+        combined["interactions"] = older.get("interactions", 0) + newer.get("interactions", 0)
+        combined["context"] = older.get("context", []) + newer.get("context", [])
+        return combined
+    
     def _load(self):
         """Load user memory from file"""
         if self.data_file.exists():
@@ -28,7 +114,9 @@ class UserMemory:
                 self.users = {}
     
     def _save(self):
-        """Save user memory to file"""
+        """Save user memory to file (the shared store is written by flush())"""
+        if self.store is not None:
+            return
         try:
             with open(self.data_file, 'w') as f:
                 json.dump(self.users, f, indent=2)
@@ -38,19 +126,14 @@ class UserMemory:
     def get_user_data(self, user_uuid: str, user_name: str = "Unknown") -> dict:
         """Get or create user data"""
         if user_uuid not in self.users:
-            self.users[user_uuid] = {
-                "name": user_name,
-                "sentiment": "neutral",  # neutral, positive, negative
-                "interactions": 0,
-                "first_seen": datetime.now().isoformat(),
-                "last_seen": datetime.now().isoformat(),
-                "context": []  # Recent conversation history
-            }
+            self.users[user_uuid] = self._new_user(user_name)
+            self._change(user_uuid, name=user_name)
             self._save()
         else:
             # Update last seen and name
             self.users[user_uuid]["last_seen"] = datetime.now().isoformat()
             self.users[user_uuid]["name"] = user_name
+            self._change(user_uuid, name=user_name, last_seen=self.users[user_uuid]["last_seen"])
         
         return self.users[user_uuid]
     
@@ -58,21 +141,19 @@ class UserMemory:
         """Update user sentiment based on their message (simple heuristic)"""
         user_data = self.get_user_data(user_uuid)
         user_data["interactions"] += 1
+        self._change(user_uuid, interactions=1)
         
-        # Simple sentiment detection (like OG bot)
-        negative_words = ['fuck you', 'bitch', 'stupid', 'dumb', 'idiot', 'shut up', 'useless']
-        positive_words = ['thanks', 'thank you', 'cool', 'nice', 'awesome', 'great', 'good']
-        
-        msg_lower = message.lower()
+        # Simple sentiment detection (like OG bot) - one pass over all lexicons
+        hits = get_shared_matcher().lexicon_hits(message)
         
         # Check for negative sentiment
-        if any(word in msg_lower for word in negative_words):
+        if "negative" in hits:
             if user_data["sentiment"] == "positive":
                 user_data["sentiment"] = "neutral"
             else:
                 user_data["sentiment"] = "negative"
         # Check for positive sentiment
-        elif any(word in msg_lower for word in positive_words):
+        elif "positive" in hits:
             if user_data["sentiment"] == "negative":
                 user_data["sentiment"] = "neutral"
             else:
@@ -82,22 +163,25 @@ class UserMemory:
             if user_data["interactions"] > 5:
                 user_data["sentiment"] = "neutral"
         
+        self._change(user_uuid, sentiment=user_data["sentiment"])
         self._save()
         return user_data["sentiment"]
     
     def add_to_context(self, user_uuid: str, role: str, content: str):
         """Add message to user's conversation context"""
         user_data = self.get_user_data(user_uuid)
-        user_data["context"].append({
+        message = {
             "role": role,
             "content": content,
             "timestamp": datetime.now().isoformat()
-        })
+        }
+        user_data["context"].append(message)
         
         # Keep only last 10 messages
-        if len(user_data["context"]) > 10:
-            user_data["context"] = user_data["context"][-10:]
+        if len(user_data["context"]) > self.CONTEXT_LIMIT:
+            user_data["context"] = user_data["context"][-self.CONTEXT_LIMIT:]
         
+        self._change(user_uuid, context=message)
         self._save()
     
     def get_context(self, user_uuid: str, limit: int = 5) -> List[dict]:
@@ -1,6 +1,10 @@
 # Utility modules
 from .content_filter import ContentFilter
+from .flood_control import FloodControl
+from .link_safety import LinkSafety, LinkVerdict, extract_urls
 from .role_checker import RoleChecker
+from .pattern_matcher import PatternMatcher, get_shared_matcher, reload_shared_matcher
+from .single_flight import SingleFlight
 
-__all__ = ['ContentFilter', 'RoleChecker']
+__all__ = ['ContentFilter', 'FloodControl', 'LinkSafety', 'LinkVerdict', 'extract_urls', 'RoleChecker', 'PatternMatcher', 'get_shared_matcher', 'reload_shared_matcher', 'SingleFlight']
 
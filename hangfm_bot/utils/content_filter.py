@@ -1,6 +1,8 @@
 # content_filter.py
 import logging
 
+from hangfm_bot.utils.pattern_matcher import get_shared_matcher
+
 class ContentFilter:
     def __init__(self, languages=('en',)):
         # Permissive filter - only block empty/invalid messages
@@ -16,11 +18,17 @@ class ContentFilter:
             return False
         return len(text.strip()) > 0
 
-    def censor(self, text: str) -> str:
-        """Censor profanity in text"""
+    def censor(self, text: str, lexicon: str = "profanity") -> str:
+        """Star out words from a lexicon (the "profanity" list in lexicons.json by default)"""
         if not self.enabled or not text:
             return text
-        return profanity.censor(text)
+        hits = [hit for hit in get_shared_matcher().find_all(text) if hit.lexicon == lexicon]
+        if not hits or len(text.lower()) != len(text):
+            return text  # Match positions are in the lowercased text
+        chars = list(text)
+        for hit in hits:
+            chars[hit.start:hit.end] = "*" * (hit.end - hit.start)
+        return "".join(chars)
     
     @staticmethod
     def is_allowed(text: str) -> bool:
@@ -0,0 +1,179 @@
+# flood_control.py
+# Per-user and per-room sliding-window flood control with escalating mutes
+
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Optional
+
+from hangfm_bot.metrics import FLOOD_BLOCKED, FLOOD_MUTES
+
+LOG = logging.getLogger("flood_control")
+
+
+class SlidingWindow:
+    """
+    Events in the last `window` seconds, at most `limit` of them. Only the newest
+    `limit` timestamps are kept, which is all the check needs: the window is full
+    when the oldest of them is still inside it.
+    """
+
+    __slots__ = ("limit", "window", "times")
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.times = deque(maxlen=limit)
+
+    def full(self, now: float) -> bool:
+        return len(self.times) == self.limit and now - self.times[0] < self.window
+
+    def hit(self, now: float) -> bool:
+        """Record an event; False if it was over the limit (and not recorded)"""
+        if self.full(now):
+            return False
+        self.times.append(now)
+        return True
+
+    def idle(self, now: float) -> bool:
+        return not self.times or now - self.times[-1] >= self.window
+
+
+class _UserState:
+    __slots__ = ("messages", "ai", "muted_until", "strikes")
+
+    def __init__(self, messages: SlidingWindow, ai: SlidingWindow):
+        self.messages = messages
+        self.ai = ai
+        self.muted_until = 0.0
+        self.strikes = 0  # Offences since the last quiet spell - each one doubles the mute
+
+
+class FloodControl:
+    """
+    Runs on every chat message before any command or AI work:
+
+      - a user sending more than user_messages in user_window seconds is muted
+      - a user triggering the AI more than ai_limit times in ai_window seconds
+        is muted (the OG bot's checkAiKeywordSpam)
+      - a room doing more than room_actions commands/AI replies in room_window
+        seconds drops the excess until the window frees up
+
+    Mutes start at mute_sec and double with each repeat offence, up to
+    mute_max_sec; strikes are forgotten once mute_max_sec passes after the
+    last mute ended without another offence.
+    Muted users are ignored silently. Staff (is_exempt) are never limited.
+    State is kept for at most max_users users and max_rooms rooms, least
+    recently seen dropped first. A limit of 0 turns that check off.
+    """
+
+    def __init__(
+        self,
+        user_messages: int = 6,
+        user_window: float = 10.0,
+        ai_limit: int = 3,
+        ai_window: float = 150.0,
+        room_actions: int = 20,
+        room_window: float = 10.0,
+        mute_sec: float = 30.0,
+        mute_max_sec: float = 900.0,
+        is_exempt: Optional[Callable[[str], bool]] = None,
+        max_users: int = 5000,
+        max_rooms: int = 500,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.user_messages, self.user_window = user_messages, user_window
+        self.ai_limit, self.ai_window = ai_limit, ai_window
+        self.room_actions, self.room_window = room_actions, room_window
+        self.mute_sec, self.mute_max_sec = mute_sec, mute_max_sec
+        self.is_exempt = is_exempt
+        self.max_users, self.max_rooms = max_users, max_rooms
+        self.clock = clock
+        self._users: "OrderedDict[tuple, _UserState]" = OrderedDict()  # (room, user) -> state
+        self._rooms: "OrderedDict[str, SlidingWindow]" = OrderedDict()
+
+    @classmethod
+    def from_settings(cls, is_exempt: Optional[Callable[[str], bool]] = None) -> "FloodControl":
+        from hangfm_bot.config import settings
+
+        return cls(
+            user_messages=settings.flood_user_messages,
+            user_window=settings.flood_user_window_sec,
+            ai_limit=settings.flood_ai_limit,
+            ai_window=settings.flood_ai_window_sec,
+            room_actions=settings.flood_room_actions,
+            room_window=settings.flood_room_window_sec,
+            mute_sec=settings.flood_mute_sec,
+            mute_max_sec=settings.flood_mute_max_sec,
+            is_exempt=is_exempt,
+        )
+
+    def _user(self, room: str, user_uuid: str) -> _UserState:
+        key = (room, user_uuid)
+        state = self._users.get(key)
+        if state is None:
+            state = self._users[key] = _UserState(
+                SlidingWindow(max(self.user_messages, 1), self.user_window),
+                SlidingWindow(max(self.ai_limit, 1), self.ai_window),
+            )
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(key)
+        return state
+
+    def _room(self, room: str) -> SlidingWindow:
+        window = self._rooms.get(room)
+        if window is None:
+            window = self._rooms[room] = SlidingWindow(max(self.room_actions, 1), self.room_window)
+            if len(self._rooms) > self.max_rooms:
+                self._rooms.popitem(last=False)
+        else:
+            self._rooms.move_to_end(room)
+        return window
+
+    def _mute(self, state: _UserState, now: float, user_uuid: str, reason: str) -> str:
+        if now - state.muted_until > self.mute_max_sec:
+            state.strikes = 0
+        state.strikes += 1
+        duration = min(self.mute_sec * 2 ** (state.strikes - 1), self.mute_max_sec)
+        state.muted_until = now + duration
+        FLOOD_MUTES.inc()
+        LOG.warning("🔇 Muted %s for %.0fs (%s, strike %s)", user_uuid, duration, reason, state.strikes)
+        return reason
+
+    def check(self, user_uuid: str, is_command: bool, is_ai: bool, room: str = "") -> Optional[str]:
+        """
+        None if the message may go on to command/AI handling, otherwise why not:
+        "muted", "user_flood", "ai_spam" or "room_flood".
+        """
+        if self.is_exempt and self.is_exempt(user_uuid):
+            return None
+        now = self.clock()
+        state = self._user(room, user_uuid)
+        reason = None
+        if now < state.muted_until:
+            reason = "muted"
+        elif self.user_messages and not state.messages.hit(now):
+            reason = self._mute(state, now, user_uuid, "user_flood")
+        elif is_ai and self.ai_limit and not state.ai.hit(now):
+            reason = self._mute(state, now, user_uuid, "ai_spam")
+        elif (is_command or is_ai) and self.room_actions and not self._room(room).hit(now):
+            reason = "room_flood"
+        if reason:
+            FLOOD_BLOCKED.labels(reason).inc()
+        return reason
+
+    def prune(self) -> int:
+        """Forget users with no recent activity and no mute/strikes still in force"""
+        now = self.clock()
+        stale = [
+            key for key, state in self._users.items()
+            if now - state.muted_until > self.mute_max_sec
+            and state.messages.idle(now) and state.ai.idle(now)
+        ]
+        for key in stale:
+            del self._users[key]
+        for room in [room for room, window in self._rooms.items() if window.idle(now)]:
+            del self._rooms[room]
+        return len(stale)
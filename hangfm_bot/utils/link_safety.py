@@ -0,0 +1,356 @@
+# link_safety.py
+# Link and image URL checks for chat (the OG bot's checkAndHandleLinks / checkLinkSafety /
+# checkImageExplicitContent) with verdicts cached per domain and per URL
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import aiohttp
+
+from hangfm_bot.metrics import LINK_CHECKS, LINK_BLOCKED
+from hangfm_bot.utils.single_flight import SingleFlight
+
+LOG = logging.getLogger("link_safety")
+
+VERDICTS_FILE = Path(os.getenv("LINK_VERDICTS_FILE", "link_verdicts.json"))
+
+SAFE_BROWSING_URL = "https://safebrowsing.googleapis.com/v4/threatMatches:find"
+
+_URL_RE = re.compile(r"https?://[^\s<>\"']+", re.IGNORECASE)
+_TRAILING = ".,;:!?)]}'\""
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+_TRACKING_PARAMS = frozenset({"fbclid", "gclid", "si", "feature"})  # Plus every utm_*
+
+# Same lists as the OG bot; domains match on a suffix (OG used a substring test)
+SAFE_DOMAINS = frozenset({
+    "youtube.com", "youtu.be", "spotify.com", "soundcloud.com", "bandcamp.com",
+    "giphy.com", "tenor.com", "twitter.com", "x.com", "instagram.com", "tiktok.com",
+    "reddit.com", "discogs.com", "musicbrainz.org", "last.fm", "genius.com",
+    "rateyourmusic.com", "wikipedia.org", "hang.fm", "tt.fm", "tt.live",
+})
+SHORTENER_DOMAINS = frozenset({"bit.ly", "tinyurl.com", "goo.gl", "ow.ly"})
+INVITE_DOMAINS = frozenset({"discord.gg"})
+NSFW_DOMAINS = frozenset({"onlyfans.com", "chaturbate.com", "pornhub.com", "xvideos.com", "redtube.com"})
+SUSPICIOUS_TLDS = frozenset({"ru", "cn"})
+
+_IMAGE_RE = re.compile(r"\.(?:gif|png|jpe?g|webp)$", re.IGNORECASE)
+_NSFW_RE = re.compile(r"porn|xxx|nsfw|nude|naked|sex|adult|explicit|onlyfans|chaturbate|xvideos|redtube", re.IGNORECASE)
+_SPAM_RE = re.compile(r"free.*download|click.*here|prize|winner", re.IGNORECASE)
+_EXECUTABLE_RE = re.compile(r"\.(?:exe|dmg|apk|zip|rar|msi|scr)$", re.IGNORECASE)
+
+
+class LinkVerdict(NamedTuple):
+    verdict: str  # "safe", "unknown", "suspicious", "explicit" or "error" (lookup failed, never cached)
+    reason: str = ""
+
+    @property
+    def blocked(self) -> bool:
+        return self.verdict in ("suspicious", "explicit")
+
+
+SAFE = LinkVerdict("safe")
+UNKNOWN = LinkVerdict("unknown")
+ERROR = LinkVerdict("error", "lookup failed")
+
+
+def _domain_in(domain: str, domains: frozenset) -> bool:
+    """domain is one of `domains` or a subdomain of one"""
+    while True:
+        if domain in domains:
+            return True
+        _, dot, domain = domain.partition(".")
+        if not dot:
+            return False
+
+
+def normalize_url(url: str) -> Optional[str]:
+    """
+    Canonical form for caching: lowercase scheme/host, no www., no default
+    port, no fragment, no tracking parameters. None if it isn't a usable URL.
+    """
+    url = url.rstrip(_TRAILING)
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if scheme not in _DEFAULT_PORTS or not host:
+        return None
+    if host.startswith("www."):
+        host = host[4:]
+    if port and port != _DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+    query = parts.query
+    if query:
+        query = urlencode([(k, v) for k, v in parse_qsl(query, keep_blank_values=True) if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS])
+    return urlunsplit((scheme, host, parts.path.rstrip("/") or "/", query, ""))
+
+
+def extract_urls(text: str) -> List[str]:
+    """Every distinct normalized http(s) URL in a message, in order of appearance"""
+    if "://" not in text:
+        return []
+    urls = {}
+    for match in _URL_RE.finditer(text):
+        url = normalize_url(match.group(0))
+        if url:
+            urls[url] = None
+    return list(urls)
+
+
+def domain_of(url: str) -> str:
+    return urlsplit(url).hostname or ""
+
+
+class LinkSafety:
+    """
+    Checks every link in a chat message. Local rules first (the OG bot's
+    safe-domain list, shorteners, invite links, suspicious TLDs, NSFW and
+    executable patterns), then Google Safe Browsing when an API key is set.
+
+    Verdicts are cached per domain (safe-listed or blocked domains need no
+    per-URL check) and per URL, each with its own TTL, in the SharedStore
+    when one is configured or link_verdicts.json otherwise. Links in one
+    message are checked concurrently and identical checks in flight are shared,
+    so a link that keeps getting pasted is only ever looked at once per TTL.
+    """
+
+    NAMESPACE = "link_verdicts"
+
+    def __init__(
+        self,
+        store=None,
+        data_file: Path = VERDICTS_FILE,
+        domain_ttl: float = 7 * 86400,
+        url_ttl: float = 86400,
+        api_key: str = "",
+        timeout: float = 3.0,
+        session: Optional[aiohttp.ClientSession] = None,
+    ):
+        self.store = store
+        self.data_file = Path(data_file)
+        self.domain_ttl = domain_ttl
+        self.url_ttl = url_ttl
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = session
+        self._owns_session = session is None
+        self.entries: Dict[str, dict] = {}  # "d:<domain>" / "u:<url>" -> {"ts", "verdict", "reason"}
+        self.dirty = False
+        self._flight = SingleFlight("link_safety")
+        if store is not None:
+            store.prune(self.NAMESPACE, max(domain_ttl, url_ttl))
+        else:
+            self._load()
+
+    @classmethod
+    def from_settings(cls, store=None, data_file: Path = VERDICTS_FILE) -> "LinkSafety":
+        from hangfm_bot.config import settings
+
+        return cls(
+            store=store,
+            data_file=data_file,
+            domain_ttl=settings.link_domain_ttl_hours * 3600,
+            url_ttl=settings.link_url_ttl_hours * 3600,
+            api_key=settings.safe_browsing_api_key,
+            timeout=settings.link_check_timeout_sec,
+        )
+
+    # ── verdict cache ─────────────────────────────────────────────
+
+    def _load(self):
+        """Load cached verdicts from file, dropping expired entries"""
+        if not self.data_file.exists():
+            return
+        try:
+            with self.data_file.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            now = time.time()
+            self.entries = {k: v for k, v in data.items() if now - v.get("ts", 0) < self._ttl(k)}
+            LOG.info(f"💾 Loaded link verdicts: {len(self.entries)}")
+        except Exception as e:
+            LOG.warning(f"Failed to load link verdicts: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Persist verdicts if anything changed (the SharedStore is written through)"""
+        if not self.dirty or self.store is not None:
+            return
+        try:
+            tmp = self.data_file.with_suffix(".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                json.dump(self.entries, f, separators=(",", ":"))
+            tmp.replace(self.data_file)
+            self.dirty = False
+        except Exception as e:
+            LOG.error(f"Failed to save link verdicts: {e}")
+
+    def _ttl(self, key: str) -> float:
+        return self.domain_ttl if key.startswith("d:") else self.url_ttl
+
+    async def _cached(self, key: str) -> Optional[LinkVerdict]:
+        if self.store is not None:
+            entry = await asyncio.to_thread(self.store.get, self.NAMESPACE, key, self._ttl(key))
+        else:
+            entry = self.entries.get(key)
+            if entry and time.time() - entry["ts"] >= self._ttl(key):
+                del self.entries[key]
+                entry = None
+        return LinkVerdict(entry["verdict"], entry.get("reason", "")) if entry else None
+
+    async def _remember(self, key: str, verdict: LinkVerdict):
+        entry = {"verdict": verdict.verdict, "reason": verdict.reason}
+        if self.store is not None:
+            await asyncio.to_thread(self.store.set, self.NAMESPACE, key, entry)
+        else:
+            self.entries[key] = {"ts": time.time(), **entry}
+            self.dirty = True
+
+    def prune(self) -> int:
+        """Drop expired verdicts"""
+        if self.store is not None:
+            return self.store.prune(self.NAMESPACE, max(self.domain_ttl, self.url_ttl))
+        now = time.time()
+        expired = [k for k, v in self.entries.items() if now - v["ts"] >= self._ttl(k)]
+        for key in expired:
+            del self.entries[key]
+        self.dirty = self.dirty or bool(expired)
+        return len(expired)
+
+    # ── rules ─────────────────────────────────────────────────────
+
+    @staticmethod
+    def domain_rules(domain: str) -> LinkVerdict:
+        """Verdict that holds for every URL on a domain, or UNKNOWN"""
+        host = domain.split(":", 1)[0]
+        if _domain_in(host, SAFE_DOMAINS):
+            return SAFE
+        if _domain_in(host, NSFW_DOMAINS):
+            return LinkVerdict("explicit", "adult site")
+        if _domain_in(host, SHORTENER_DOMAINS):
+            return LinkVerdict("suspicious", "URL shortener")
+        if _domain_in(host, INVITE_DOMAINS):
+            return LinkVerdict("suspicious", "invite link")
+        if host.rsplit(".", 1)[-1] in SUSPICIOUS_TLDS:
+            return LinkVerdict("suspicious", "suspicious TLD")
+        return UNKNOWN
+
+    @staticmethod
+    def url_rules(url: str, domain_verdict: LinkVerdict) -> LinkVerdict:
+        """Per-URL checks for links the domain alone doesn't settle"""
+        parts = urlsplit(url)
+        rest = f"{parts.path}?{parts.query}"
+        image = bool(_IMAGE_RE.search(parts.path)) or _domain_in(parts.hostname or "", frozenset({"giphy.com", "tenor.com"}))
+        if image and _NSFW_RE.search(rest):
+            return LinkVerdict("explicit", "explicit image")
+        if domain_verdict.verdict == "safe":
+            return SAFE
+        if _NSFW_RE.search(rest):
+            return LinkVerdict("explicit", "explicit link")
+        if (parts.hostname or "").endswith("discord.com") and parts.path.startswith("/invite"):
+            return LinkVerdict("suspicious", "invite link")
+        if _EXECUTABLE_RE.search(parts.path):
+            return LinkVerdict("suspicious", "executable download")
+        if _SPAM_RE.search(rest):
+            return LinkVerdict("suspicious", "spam link")
+        return UNKNOWN
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+            self._owns_session = True
+        return self.session
+
+    async def remote_check(self, url: str) -> LinkVerdict:
+        """Google Safe Browsing lookup; UNKNOWN when not configured, ERROR when it didn't answer"""
+        if not self.api_key:
+            return UNKNOWN
+        body = {
+            "client": {"clientId": "hangfm-bot", "clientVersion": "2.0"},
+            "threatInfo": {
+                "threatTypes": ["MALWARE", "SOCIAL_ENGINEERING", "UNWANTED_SOFTWARE", "POTENTIALLY_HARMFUL_APPLICATION"],
+                "platformTypes": ["ANY_PLATFORM"],
+                "threatEntryTypes": ["URL"],
+                "threatEntries": [{"url": url}],
+            },
+        }
+        try:
+            session = await self._get_session()
+            async with session.post(SAFE_BROWSING_URL, params={"key": self.api_key}, json=body, timeout=aiohttp.ClientTimeout(total=self.timeout)) as resp:
+                if resp.status != 200:
+                    LOG.debug("Safe Browsing returned %s for %s", resp.status, url)
+                    return ERROR
+                matches = (await resp.json(content_type=None)).get("matches") or []
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            LOG.debug("Safe Browsing lookup failed for %s: %s", url, e)
+            return ERROR
+        if matches:
+            return LinkVerdict("suspicious", matches[0].get("threatType", "threat").lower().replace("_", " "))
+        return SAFE
+
+    # ── checks ────────────────────────────────────────────────────
+
+    async def _domain_verdict(self, domain: str) -> LinkVerdict:
+        key = f"d:{domain}"
+        verdict = await self._cached(key)
+        if verdict is None:
+            verdict = self.domain_rules(domain)
+            await self._remember(key, verdict)
+        return verdict
+
+    async def _check_uncached(self, url: str) -> LinkVerdict:
+        domain_verdict = await self._domain_verdict(domain_of(url))
+        if domain_verdict.blocked:
+            verdict = domain_verdict
+        else:
+            verdict = self.url_rules(url, domain_verdict)
+            if verdict.verdict == "unknown":
+                verdict = await self.remote_check(url)
+        if verdict is not ERROR:  # An outage must not vouch for a link for a whole TTL
+            await self._remember(f"u:{url}", verdict)
+        return verdict
+
+    async def check(self, url: str) -> LinkVerdict:
+        """Verdict for one normalized URL"""
+        verdict = await self._cached(f"u:{url}")
+        if verdict is not None:
+            LINK_CHECKS.labels("hit").inc()
+            return verdict
+        LINK_CHECKS.labels("miss").inc()
+        return await self._flight.do(url, self._check_uncached, url)
+
+    async def check_message(self, text: str) -> Optional[tuple]:
+        """(url, verdict) for the first blocked link in a message, or None if all are fine"""
+        urls = extract_urls(text)
+        if not urls:
+            return None
+        verdicts = [await self._cached(f"u:{url}") for url in urls]
+        LINK_CHECKS.labels("hit").inc(sum(v is not None for v in verdicts))
+        misses = [i for i, verdict in enumerate(verdicts) if verdict is None]
+        if misses:
+            LINK_CHECKS.labels("miss").inc(len(misses))
+            checked = await asyncio.gather(*(self._flight.do(urls[i], self._check_uncached, urls[i]) for i in misses), return_exceptions=True)
+            for i, verdict in zip(misses, checked):
+                verdicts[i] = verdict
+        for url, verdict in zip(urls, verdicts):
+            if isinstance(verdict, Exception):
+                LOG.warning("⚠️  Link check failed for %s: %s", url, verdict)  # On error, allow the link (OG behaviour)
+                continue
+            if verdict.blocked:
+                LINK_BLOCKED.labels(verdict.verdict).inc()
+                return url, verdict
+        return None
+
+    async def close(self):
+        self.save()
+        if self._owns_session and self.session is not None and not self.session.closed:
+            await self.session.close()
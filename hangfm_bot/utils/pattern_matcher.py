@@ -0,0 +1,188 @@
+# pattern_matcher.py
+# Aho-Corasick multi-pattern matcher shared by sentiment, spam and moderation word lists
+
+import json
+import logging
+import os
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+
+LOG = logging.getLogger("pattern_matcher")
+
+LEXICONS_FILE = Path(os.getenv("LEXICONS_FILE", "lexicons.json"))
+
+# Built-in word lists (same words the OG bot used for sentiment)
+DEFAULT_LEXICONS: Dict[str, List[str]] = {
+    "negative": ['fuck you', 'bitch', 'stupid', 'dumb', 'idiot', 'shut up', 'useless'],
+    "positive": ['thanks', 'thank you', 'cool', 'nice', 'awesome', 'great', 'good'],
+}
+
+# A lexicon is either a plain word list or {"words": [...], "word_boundary": bool}
+LexiconSpec = Union[Iterable[str], dict]
+
+
+class Match(NamedTuple):
+    lexicon: str
+    pattern: str
+    start: int
+    end: int
+
+
+class PatternMatcher:
+    """
+    Compiled Aho-Corasick automaton over any number of named word lists.
+    Text is scanned once no matter how many lexicons/words are loaded.
+    Matching is case-insensitive; positions refer to the lowercased text.
+    """
+
+    def __init__(self, lexicons: Optional[Dict[str, LexiconSpec]] = None, word_boundary: bool = True):
+        self.word_boundary = word_boundary
+        self._automaton = self._compile({})
+        self.reload(lexicons or {})
+
+    def reload(self, lexicons: Dict[str, LexiconSpec]):
+        """Rebuild the automaton from scratch and swap it in atomically"""
+        self._automaton = self._compile(lexicons)
+        LOG.debug(f"PatternMatcher compiled {len(self._automaton[3])} patterns from {len(self.lexicons)} lexicons")
+
+    @property
+    def lexicons(self) -> Set[str]:
+        return set(self._automaton[4])
+
+    def _compile(self, lexicons: Dict[str, LexiconSpec]) -> Tuple:
+        goto: List[Dict[str, int]] = [{}]
+        fail: List[int] = [0]
+        out: List[List[int]] = [[]]
+        # pattern id -> (lexicon, pattern, needs word boundary)
+        patterns: List[Tuple[str, str, bool]] = []
+        seen: Set[Tuple[str, str]] = set()
+
+        for name, spec in lexicons.items():
+            if isinstance(spec, dict):
+                words = spec.get("words", [])
+                boundary = bool(spec.get("word_boundary", self.word_boundary))
+            else:
+                words = spec
+                boundary = self.word_boundary
+
+            for word in words:
+                if not word or not isinstance(word, str):
+                    continue
+                word = word.lower().strip()
+                if not word or (name, word) in seen:
+                    continue
+                seen.add((name, word))
+
+                state = 0
+                for ch in word:
+                    nxt = goto[state].get(ch)
+                    if nxt is None:
+                        nxt = len(goto)
+                        goto[state][ch] = nxt
+                        goto.append({})
+                        fail.append(0)
+                        out.append([])
+                    state = nxt
+                out[state].append(len(patterns))
+                patterns.append((name, word, boundary))
+
+        # Breadth-first pass to wire failure links and merge outputs
+        # (depth-1 states already fail back to the root)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+
+        return goto, fail, out, patterns, frozenset(lexicons.keys())
+
+    @staticmethod
+    def _is_word_char(ch: str) -> bool:
+        return ch.isalnum() or ch == "_"
+
+    def find_all(self, text: str) -> List[Match]:
+        """Return every (possibly overlapping) hit across all lexicons in one pass"""
+        if not text or not isinstance(text, str):
+            return []
+
+        goto, fail, out, patterns, _ = self._automaton
+        if not patterns:
+            return []
+
+        text = text.lower()
+        last = len(text) - 1
+        hits: List[Match] = []
+        state = 0
+
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+
+            for pid in out[state]:
+                name, word, boundary = patterns[pid]
+                start = i - len(word) + 1
+                if boundary:
+                    if start > 0 and self._is_word_char(text[start - 1]):
+                        continue
+                    if i < last and self._is_word_char(text[i + 1]):
+                        continue
+                hits.append(Match(name, word, start, i + 1))
+
+        return hits
+
+    def lexicon_hits(self, text: str) -> Dict[str, Set[str]]:
+        """Group hits by lexicon name: {lexicon: {matched words}}"""
+        grouped: Dict[str, Set[str]] = {}
+        for hit in self.find_all(text):
+            grouped.setdefault(hit.lexicon, set()).add(hit.pattern)
+        return grouped
+
+    def contains(self, text: str, lexicon: str) -> bool:
+        """Check if text hits a specific lexicon"""
+        return any(hit.lexicon == lexicon for hit in self.find_all(text))
+
+
+def load_lexicons() -> Dict[str, LexiconSpec]:
+    """Merge built-in lexicons with any extra lists from lexicons.json"""
+    lexicons: Dict[str, LexiconSpec] = {name: list(words) for name, words in DEFAULT_LEXICONS.items()}
+
+    if LEXICONS_FILE.exists():
+        try:
+            with LEXICONS_FILE.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            for name, spec in data.items():
+                if isinstance(spec, (list, dict)):
+                    lexicons[name] = spec
+            LOG.info(f"💾 Loaded {len(data)} lexicons from {LEXICONS_FILE}")
+        except Exception as e:
+            LOG.warning(f"Failed to load lexicons: {e}")
+
+    return lexicons
+
+
+_shared_matcher: Optional[PatternMatcher] = None
+
+
+def get_shared_matcher() -> PatternMatcher:
+    """Get the process-wide matcher, building it on first use"""
+    global _shared_matcher
+    if _shared_matcher is None:
+        _shared_matcher = PatternMatcher(load_lexicons())
+    return _shared_matcher
+
+
+def reload_shared_matcher() -> PatternMatcher:
+    """Re-read lexicons.json and recompile the shared matcher in place"""
+    matcher = get_shared_matcher()
+    matcher.reload(load_lexicons())
+    LOG.info(f"🔄 Lexicons reloaded: {', '.join(sorted(matcher.lexicons))}")
+    return matcher
@@ -12,9 +12,9 @@ class RoleChecker:
         
         # Role-to-permission mapping (higher roles inherit lower role permissions)
         self.role_to_permissions: Dict[str, Set[str]] = {
-            "admin": {"ban", "kick", "add_dj", "remove_dj", "track", "queue", "discover", "ai", "debug", "adminhelp", "uptime", "help", "stats", "commands", "room", "gitlink", "ty", "addcoowner", "addmod", "removecoowner", "removemod", "listperms", "myuuid"},
+            "admin": {"ban", "kick", "add_dj", "remove_dj", "track", "queue", "discover", "ai", "debug", "adminhelp", "uptime", "help", "stats", "commands", "room", "gitlink", "ty", "addcoowner", "addmod", "removecoowner", "removemod", "listperms", "reloadlexicons", "jobs", "perf", "profile", "rooms", "hopup", "hopdown", "vote", "glue", "myuuid"},
             "moderator": {"kick", "add_dj", "remove_dj", "track", "queue", "discover", "adminhelp", "uptime", "help", "stats", "commands", "room", "gitlink", "ty", "myuuid"},
-            "coowner": {"add_dj", "remove_dj", "track", "queue", "discover", "ai", "grant", "adminhelp", "uptime", "help", "stats", "commands", "room", "gitlink", "ty", "addcoowner", "addmod", "removecoowner", "removemod", "listperms", "myuuid"},
+            "coowner": {"add_dj", "remove_dj", "track", "queue", "discover", "ai", "grant", "adminhelp", "uptime", "help", "stats", "commands", "room", "gitlink", "ty", "addcoowner", "addmod", "removecoowner", "removemod", "listperms", "reloadlexicons", "jobs", "perf", "profile", "rooms", "hopup", "hopdown", "vote", "glue", "myuuid"},
             "dj": {"add_dj", "remove_dj", "queue", "discover", "uptime", "help", "stats", "commands", "room", "gitlink", "ty", "myuuid"},
             "user": {"queue", "discover", "help", "stats", "commands", "uptime", "room", "gitlink", "ty", "myuuid"},
         }
@@ -0,0 +1,58 @@
+# single_flight.py
+# Collapse identical concurrent async calls into one shared awaitable
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+LOG = logging.getLogger("single_flight")
+
+
+class SingleFlight:
+    """
+    While a call for a key is in flight, further callers with the same key
+    await that call instead of starting their own, and all get its result
+    (or its exception). Nothing is cached once the call finishes.
+    """
+
+    def __init__(self, name: str = "single_flight"):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0  # Total do() calls
+        self.executions = 0  # Calls that actually ran the function
+        self.shared = 0  # Calls saved by joining an in-flight call
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) for key, or join the run already in progress"""
+        self.calls += 1
+        future = self._inflight.get(key)
+        if future is None:
+            self.executions += 1
+            future = asyncio.ensure_future(fn(*args, **kwargs))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f, key=key: self._forget(key, f))
+        else:
+            self.shared += 1
+            LOG.debug(f"{self.name}: joined in-flight call for {key!r}")
+        # Shield so one cancelled caller doesn't cancel the call for everyone
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # Mark exceptions as retrieved when every waiter was cancelled
+        if not future.cancelled():
+            future.exception()
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Check if a call for key is currently running"""
+        return key in self._inflight
+
+    def stats(self) -> dict:
+        """Counters for how many calls were coalesced"""
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "shared": self.shared,
+            "in_flight": len(self._inflight),
+        }
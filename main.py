@@ -1,24 +1,40 @@
 # main.py - DEBUG VERSION
 # This version logs the raw payload structure so we can fix the parsing
 
+from hangfm_bot.startup import STARTUP  # First, so startup timing covers every import below
+
 import asyncio
 import json
 import logging
 import signal
 import sys
+import time
 from datetime import datetime
 
+import aiohttp
+
 from hangfm_bot.config import settings
+STARTUP.mark("settings")
 from hangfm_bot.ai import AIManager
-from hangfm_bot.utils import RoleChecker, ContentFilter
+from hangfm_bot.utils import RoleChecker, ContentFilter, FloodControl, LinkSafety, reload_shared_matcher
 from hangfm_bot.handlers import CommandHandler
-from hangfm_bot.music import GenreClassifier
-from hangfm_bot.message_queue import MessageQueue
+from hangfm_bot.music import GenreClassifier, MetadataService
 from hangfm_bot.relay_receiver import RelayReceiver
-from hangfm_bot.connection import CometChatManager, CometChatPoller
+from hangfm_bot.rooms import RoomMusic, RoomRegistry, SharedServices, parse_rooms, room_state_dir
+from hangfm_bot.shared_store import open_store
+from hangfm_bot.sharding import ShardMember, worker_state_path
 from hangfm_bot import uptime as uptime_module
 from hangfm_bot.user_memory import UserMemory
+from hangfm_bot.music.audio_features import STORE_DIR as AUDIO_FEATURES_DIR
+from hangfm_bot.utils.link_safety import VERDICTS_FILE as LINK_VERDICTS_FILE
 from hangfm_bot.permissions import PermissionsManager
+from hangfm_bot.scheduler import Scheduler
+from hangfm_bot import metrics
+from hangfm_bot.metrics import EVENT_ERRORS, EVENT_SECONDS, event_label
+from hangfm_bot.profiler import SamplingProfiler, format_report
+from hangfm_bot.trace import TraceRecorder
+from hangfm_bot.log_pipeline import setup_logging, stop_logging
+STARTUP.mark("imports")
 
 LOG = logging.getLogger("hangfm_bot")
 
@@ -36,11 +52,51 @@ def setup_signal_handlers(uptime_manager: uptime_module.UptimeManager):
         except Exception:
             pass
 
-async def process_queue_item(item, ai_manager, command_handler, content_filter, cometchat, user_memory):
-    """Process queue items"""
+async def enrich_current_song(metadata_service, ai_manager, artist, track, dj_name=None, taste_profiles=None):
+    """Look up song metadata in the background, attach it to room context and learn DJ taste"""
+    meta = {}
+    try:
+        meta = await metadata_service.lookup(artist, track)
+        current = ai_manager.room_context.get("currentSong") or {}
+        # Only attach if the song is still playing
+        if current.get("artistName", artist) == artist:
+            ai_manager.update_room_context({"currentSongMeta": meta})
+    except Exception as e:
+        LOG.debug("Metadata lookup failed for %s - %s: %s", artist, track, e)
+    
+    if taste_profiles and dj_name:
+        taste_profiles.record_play(dj_name, artist, (meta.get("genres") or []) + (meta.get("subgenres") or []))
+
+
+async def link_blocked(link_safety, text, sender_name, cometchat) -> bool:
+    """Check the links in a chat message; call out and stop the message if one is bad"""
+    if link_safety is None or "://" not in text:
+        return False
+    bad = await link_safety.check_message(text)
+    if not bad:
+        return False
+    url, verdict = bad
+    LOG.warning("🚨 %s link from %s: %s (%s)", verdict.verdict.capitalize(), sender_name, url, verdict.reason)
+    if verdict.verdict == "explicit":
+        await cometchat.send_message(f"🚫 {sender_name}, keep links and images SFW.")
+    else:
+        await cometchat.send_message(f"🚫 {sender_name}, please don't post potentially harmful links ({verdict.reason}).")
+    return True
+
+
+async def process_queue_item(item, room, services):
+    """Process one queue item for a room (RoomRuntime) using the process-wide SharedServices"""
     event_type, data = item
+    started = time.perf_counter()
+    ai_manager, cometchat, stage, room_id = room.ai, room.platform, room.stage, room.room_uuid
+    command_handler, content_filter, user_memory = services.command_handler, services.content_filter, services.user_memory
+    metadata_service, flood_control, link_safety = services.metadata_service, services.flood_control, services.link_safety
+    music = room.music
     
     try:
+        if stage is not None:
+            stage.handle_event(event_type, data)  # DJ set, plays and votes for AFK / auto stage
+
         # Handle chat messages from CometChat WebSocket
         if event_type == "chatMessage":
             text = data.get("text", "")
@@ -54,17 +110,25 @@ async def process_queue_item(item, ai_manager, command_handler, content_filter,
             
             # Skip system messages (like "played" notifications from CometChat)
             if sender_uuid == "app_system" or "<@uid:" in text:
-                LOG.debug(f"Skipping system message: {text[:50]}")
+                LOG.debug("Skipping system message: %s", text[:50])
                 return
             
-            LOG.info(f"💬 {sender_name} ({sender_uuid}): {text[:50]}")
+            LOG.info("💬 %s (%s): %s", sender_name, sender_uuid, text[:50])
+            if stage is not None:
+                stage.touch(sender_uuid)
 
             if not content_filter.is_clean(text):
                 LOG.warning("🚫 Filtered message from %s: profanity", sender_name)
                 return
 
+            is_command = text.startswith(("/", ".", "!"))
+            if flood_control and flood_control.check(sender_uuid, is_command, "bot" in text.lower(), room_id):
+                return
+            if await link_blocked(link_safety, text, sender_name, cometchat):
+                return
+
             # Handle commands (/, /., !, .)
-            if text.startswith("/") or text.startswith(".") or text.startswith("!"):
+            if is_command:
                 response = await command_handler.handle_message(sender_uuid, text, sender_name)
                 if response:
                     await cometchat.send_message(response)
@@ -72,7 +136,7 @@ async def process_queue_item(item, ai_manager, command_handler, content_filter,
 
             # Handle AI keywords
             if "bot" in text.lower():
-                LOG.info(f"🤖 AI: {sender_name} asked")
+                LOG.info("🤖 AI: %s asked", sender_name)
                 ai_response = await ai_manager.generate_response(text, "user", [])
                 if ai_response:
                     await cometchat.send_message(ai_response)
@@ -124,18 +188,26 @@ async def process_queue_item(item, ai_manager, command_handler, content_filter,
             if not text or not sender_uuid:
                 return
             
-            LOG.debug(f"📨 Socket.IO message from {sender_name}: {text[:50]}")
+            LOG.debug("📨 Socket.IO message from %s: %s", sender_name, text[:50])
+            if stage is not None:
+                stage.touch(sender_uuid)
 
             if not content_filter.is_clean(text):
                 LOG.warning("🚫 Filtered message from %s: profanity", sender_name)
                 return
 
+            is_command = text.startswith(("/", "!"))
+            if flood_control and flood_control.check(sender_uuid, is_command, "bot" in text.lower(), room_id):
+                return
+            if await link_blocked(link_safety, text, sender_name, cometchat):
+                return
+
             # Handle commands
-            if text.startswith("/") or text.startswith("!"):
-                LOG.info(f"⚡ Command detected: {text}")
+            if is_command:
+                LOG.info("⚡ Command detected: %s", text)
                 response = await command_handler.handle_message(sender_uuid, text, sender_name)
                 if response:
-                    LOG.info(f"💬 Sending command response: {response[:100]}")
+                    LOG.info("💬 Sending command response: %s", response[:100])
                     sent = await cometchat.send_message(response)  # ✅ AWAIT async call
                     if sent:
                         LOG.info("✅ Command response sent")
@@ -145,12 +217,13 @@ async def process_queue_item(item, ai_manager, command_handler, content_filter,
 
             # Handle AI keywords
             if "bot" in text.lower():
-                LOG.info(f"🤖 AI keyword triggered by {sender_name}: {text}")
+                LOG.info("🤖 AI keyword triggered by %s: %s", sender_name, text)
                 
                 # Update user sentiment based on message (like OG bot)
+                await user_memory.refresh(sender_uuid)  # Another shard worker may have talked to them since
                 sentiment = user_memory.update_sentiment(sender_uuid, text)
                 sentiment_prompt, sentiment_desc = user_memory.get_personality_for_user(sender_uuid)
-                LOG.info(f"🎭 Sentiment: {sentiment} ({sentiment_desc})")
+                LOG.info("🎭 Sentiment: %s (%s)", sentiment, sentiment_desc)
                 
                 # Get conversation context for this user
                 user_context = user_memory.get_context(sender_uuid, limit=5)
@@ -169,7 +242,7 @@ async def process_queue_item(item, ai_manager, command_handler, content_filter,
                     return
                     
                 if ai_response:
-                    LOG.info(f"✅ AI response generated: {ai_response[:100]}")
+                    LOG.info("✅ AI response generated: %s", ai_response[:100])
                     
                     # Save to conversation history
                     user_memory.add_to_context(sender_uuid, "user", text)
@@ -188,7 +261,7 @@ async def process_queue_item(item, ai_manager, command_handler, content_filter,
             
             # Debug: show the structure if allow_debug is enabled
             if settings.allow_debug:
-                LOG.info(f"🔍 playedSong data structure: {list(song_info.keys())}")
+                LOG.info("🔍 playedSong data structure: %s", list(song_info.keys()))
             
             # Try multiple field names for song data
             artist = (song_info.get("artistName") or 
@@ -203,46 +276,54 @@ async def process_queue_item(item, ai_manager, command_handler, content_filter,
                       song_info.get("user", {}).get("name"))
             
             if artist and track and dj_name:
-                LOG.info(f"🎵 Now playing: {artist} - {track} (DJ: {dj_name})")
-                ai_manager.update_room_context({"currentSong": song_info, "lastDJ": dj_name})
+                LOG.info("🎵 Now playing: %s - %s (DJ: %s)", artist, track, dj_name)
+                ai_manager.update_room_context({"currentSong": song_info, "lastDJ": dj_name, "currentSongMeta": None})
+                if music:
+                    dj_uuid = song_info.get("djUuid") or song_info.get("user", {}).get("uuid")
+                    music.play_history.record_play(artist, track, dj_name, dj_uuid)
+                    music.recently_played.add(artist, track)
+                if metadata_service:
+                    asyncio.create_task(enrich_current_song(metadata_service, ai_manager, artist, track, dj_name, music.taste_profiles if music else None))
+                elif music:
+                    music.taste_profiles.record_play(dj_name, artist)
             else:
-                LOG.debug(f"playedSong event with incomplete data: {list(song_info.keys())}")
+                LOG.debug("playedSong event with incomplete data: %s", list(song_info.keys()))
         
         elif event_type == "userJoined":
             if isinstance(data, dict):
                 # Debug: show the structure if allow_debug is enabled
                 if settings.allow_debug:
-                    LOG.info(f"🔍 userJoined data structure: {list(data.keys())}")
+                    LOG.info("🔍 userJoined data structure: %s", list(data.keys()))
                 
                 user_name = (data.get("name") or 
                            data.get("nickname") or 
                            data.get("username") or
                            data.get("user", {}).get("name"))
                 if user_name:
-                    LOG.info(f"👋 {user_name} joined the room")
+                    LOG.info("👋 %s joined the room", user_name)
                     ai_manager.update_room_context({"lastJoin": user_name})
                 else:
                     # Only show keys if not in debug mode
                     if not settings.allow_debug:
-                        LOG.debug(f"userJoined event with no name: {list(data.keys())}")
+                        LOG.debug("userJoined event with no name: %s", list(data.keys()))
         
         elif event_type == "userLeft":
             if isinstance(data, dict):
                 # Debug: show the structure if allow_debug is enabled
                 if settings.allow_debug:
-                    LOG.info(f"🔍 userLeft data structure: {list(data.keys())}")
+                    LOG.info("🔍 userLeft data structure: %s", list(data.keys()))
                 
                 user_name = (data.get("name") or 
                            data.get("nickname") or 
                            data.get("username") or
                            data.get("user", {}).get("name"))
                 if user_name:
-                    LOG.info(f"👋 {user_name} left the room")
+                    LOG.info("👋 %s left the room", user_name)
                     ai_manager.update_room_context({"lastLeave": user_name})
                 else:
                     # Only show keys if not in debug mode
                     if not settings.allow_debug:
-                        LOG.debug(f"userLeft event with no name: {list(data.keys())}")
+                        LOG.debug("userLeft event with no name: %s", list(data.keys()))
         
         elif event_type == "addedDj":
             if isinstance(data, dict):
@@ -251,7 +332,7 @@ async def process_queue_item(item, ai_manager, command_handler, content_filter,
                           data.get("username") or
                           data.get("user", {}).get("name"))
                 if dj_name:
-                    LOG.info(f"🎧 {dj_name} hopped on stage")
+                    LOG.info("🎧 %s hopped on stage", dj_name)
                     ai_manager.update_room_context({"lastDJAdd": dj_name})
         
         elif event_type == "removedDj":
@@ -261,7 +342,7 @@ async def process_queue_item(item, ai_manager, command_handler, content_filter,
                           data.get("username") or
                           data.get("user", {}).get("name"))
                 if dj_name:
-                    LOG.info(f"🎧 {dj_name} left the stage")
+                    LOG.info("🎧 %s left the stage", dj_name)
                     ai_manager.update_room_context({"lastDJRemove": dj_name})
 
         elif event_type == "roomStateUpdated":
@@ -274,14 +355,14 @@ async def process_queue_item(item, ai_manager, command_handler, content_filter,
                     song = data['currentSong']
                     room_info['currentSong'] = song
                     room_info['lastDJ'] = song.get('djName', 'Unknown')
-                    LOG.info(f"🎵 Playing: {song.get('artistName', 'Unknown')} - {song.get('trackName', 'Unknown')} (DJ: {room_info['lastDJ']})")
+                    LOG.info("🎵 Playing: %s - %s (DJ: %s)", song.get('artistName', 'Unknown'), song.get('trackName', 'Unknown'), room_info['lastDJ'])
                 
                 # Get DJs on stage
                 if data.get('djs'):
                     dj_names = [dj.get('name', 'Unknown') for dj in data['djs'] if dj.get('name')]
                     if dj_names:
                         room_info['djList'] = dj_names
-                        LOG.info(f"🎧 On stage: {', '.join(dj_names)}")
+                        LOG.info("🎧 On stage: %s", ', '.join(dj_names))
                 
                 # Get users in room
                 if data.get('users'):
@@ -291,23 +372,24 @@ async def process_queue_item(item, ai_manager, command_handler, content_filter,
                         preview = ', '.join(user_names[:5])
                         if len(user_names) > 5:
                             preview += f" (+{len(user_names) - 5} more)"
-                        LOG.info(f"👥 In room ({len(user_names)}): {preview}")
+                        LOG.info("👥 In room (%s): %s", len(user_names), preview)
                 
                 ai_manager.update_room_context(room_info)
             else:
                 ai_manager.update_room_context({"roomState": data})
 
     except Exception as exc:
+        EVENT_ERRORS.labels(event_label(event_type)).inc()
         LOG.exception("❌ Error processing queue item: %s", exc)
+    finally:
+        EVENT_SECONDS.labels(event_label(event_type)).observe(time.perf_counter() - started)
 
 
 async def main():
     # Set up clean logging
     log_level = getattr(logging, settings.log_level.upper(), logging.INFO)
-    logging.basicConfig(
-        level=log_level,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
+    # Records are queued here and written by a background thread (no file/console I/O on the loop)
+    setup_logging(log_level, settings.log_format, settings.log_file, settings.log_rate_per_sec)
     
     # Silence noisy libraries
     logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -321,21 +403,61 @@ async def main():
     LOG.info("   🎵 HANG.FM BOT v2.0")
     LOG.info("=" * 60)
     LOG.info(f"🤖 Bot: {settings.bot_name}")
-    LOG.info(f"🆔 Room: {settings.room_uuid}")
+    room_list = parse_rooms(settings.room_uuid, settings.extra_rooms, settings.relay_url)
+    if settings.shard_worker_id:
+        LOG.info(f"🆔 Worker {settings.shard_worker_id}: rooms assigned by the supervisor")
+    else:
+        LOG.info(f"🆔 Room: {settings.room_uuid}" + (f" (+{len(room_list) - 1} more)" if len(room_list) > 1 else ""))
     LOG.info("=" * 60)
     
     content_filter = ContentFilter()
     ai_manager = AIManager()
     permissions_manager = PermissionsManager()  # Load permissions from file
     role_checker = RoleChecker(permissions_manager)
+    flood_control = FloodControl.from_settings(is_exempt=lambda uuid: role_checker.get_user_role(uuid) in ("coowner", "moderator"))
     genre_classifier = GenreClassifier()
     command_handler = CommandHandler(role_checker)
-    message_queue = MessageQueue(maxsize=200)
-    cometchat = CometChatManager()
-    user_memory = UserMemory()  # Track user sentiment and conversation history
+    trace_recorder = TraceRecorder(settings.trace_file) if settings.trace_file else None
+    store = open_store(settings.shared_store) if settings.shared_store else None  # Shared with other worker processes
+    # Process-wide state files outside the shared store get a workers/<id>/ copy per shard worker
+    def state_path(path):
+        return worker_state_path(path, settings.shard_worker_id)
+
+    user_memory = UserMemory(store=store)  # Track user sentiment and conversation history
+    link_safety = LinkSafety.from_settings(store, state_path(LINK_VERDICTS_FILE)) if settings.link_safety else None  # Cached link verdicts
+    metadata_service = MetadataService.from_settings()  # Spotify/Discogs/MusicBrainz/Wikipedia + disk cache
+    audio_hinter = None
+    if settings.audio_genre_hints:
+        from hangfm_bot.music.audio_features import AudioGenreHinter, FeatureStore
+        audio_hinter = AudioGenreHinter(FeatureStore(state_path(AUDIO_FEATURES_DIR)))  # One process pool for every room
+    services = SharedServices(command_handler, content_filter, user_memory, metadata_service, flood_control, link_safety)
+    scheduler = Scheduler()  # All periodic jobs (saves, health check, chat polling)
+    profiler = SamplingProfiler()  # On-demand via /.profile
+
+    def open_room_music(room_uuid):
+        # Play history, recently played, taste profiles and discovery pools are per room. A room
+        # has one owner at a time, so shard workers can share ROOM_STATE_DIR (state follows the room)
+        return RoomMusic.open(
+            room_state_dir(room_uuid, settings.room_state_dir),
+            metadata_service,
+            genre_classifier,
+            audio_hinter,
+            adopt_legacy=room_uuid == settings.room_uuid and not settings.shard_worker_id,
+        )
+
+    # Each room gets its own context, queue, platform adapter (hang.fm or Deepcut) and music state;
+    # AI, metadata, user memory and the HTTP connection pool are shared
+    async def handle_room_item(room, item):
+        await process_queue_item(item, room, services)
+        if not STARTUP.done("first_event"):
+            STARTUP.mark("first_event")
+            LOG.info(STARTUP.report())
+
+    rooms = RoomRegistry(ai_manager, scheduler, handle_room_item, recorder=trace_recorder, music_factory=open_room_music)
 
     uptime_manager = uptime_module.UptimeManager()
     setup_signal_handlers(uptime_manager)
+    STARTUP.mark("persistence")
 
     # Commands
     async def uptime_cmd(user_uuid, argline, user_nickname):
@@ -346,7 +468,7 @@ async def main():
     
     async def room_cmd(user_uuid, argline, user_nickname):
         """Show current room context"""
-        ctx = ai_manager.room_context
+        ctx = rooms.current().context
         if not ctx:
             return "📭 No room events yet"
         
@@ -379,6 +501,51 @@ async def main():
         
         return info.strip() or "📭 No recent events"
 
+    async def stats_cmd(user_uuid, argline, user_nickname):
+        """Show play stats for this room"""
+        stats = rooms.current().music.play_history.summary(top=3)
+        if not stats["total_plays"]:
+            return "📊 No plays recorded yet"
+        
+        info = f"📊 Stats\n\n🎵 {stats['total_plays']} plays • {stats['unique_songs']} songs • {stats['unique_artists']} artists • {stats['unique_djs']} DJs\n"
+        
+        if stats["top_songs"]:
+            info += "\n🔥 Top songs:\n"
+            info += "\n".join(f"  {i}. {song} ({count})" for i, (song, count) in enumerate(stats["top_songs"], 1))
+        if stats["top_artists"]:
+            info += "\n\n🎤 Top artists:\n"
+            info += "\n".join(f"  {i}. {artist} ({count})" for i, (artist, count) in enumerate(stats["top_artists"], 1))
+        if stats["top_djs"]:
+            info += "\n\n🎧 Top DJs:\n"
+            info += "\n".join(f"  {i}. {dj} ({count})" for i, (dj, count) in enumerate(stats["top_djs"], 1))
+        if stats["busiest_hour"] is not None:
+            info += f"\n\n⏰ Busiest hour: {stats['busiest_hour']:02d}:00"
+        
+        return info
+    
+    async def discover_cmd(user_uuid, argline, user_nickname):
+        """Suggest a song from the pre-verified discovery pools"""
+        genre_map = {
+            "hiphop": "Alternative Hip Hop",
+            "hip-hop": "Alternative Hip Hop",
+            "rock": "Alternative Rock",
+            "metal": "Alternative Metal",
+            "numetal": "Alternative Metal",
+        }
+        arg = argline.strip().lower()
+        genre = genre_map.get(arg) if arg else None
+        if arg and not genre:
+            return "Usage: /discover [hiphop|rock|metal]"
+        
+        # Prefer songs that fit the DJs currently on stage
+        room = rooms.current()
+        pick = room.music.discovery.pick_for_lineup(room.music.taste_profiles, room.context.get("djList") or [], genre)
+        if not pick:
+            return "🎲 Discovery pools are still warming up - try again in a bit"
+        
+        details = " • ".join(d for d in (pick.get("year"), pick.get("genre"), ", ".join(pick.get("subgenres", [])[:2])) if d)
+        return f"🎲 Try: {pick['artist']} - {pick['track']}\n   {details}"
+    
     async def help_cmd(user_uuid, argline, user_nickname):
         # Check if user is admin
         user_role = role_checker.get_user_role(user_uuid)
@@ -387,6 +554,8 @@ async def main():
 
 📊 Info
   /uptime - Bot uptime
+  /stats - Play stats
+  /discover [hiphop|rock|metal] - Song suggestion
 
 🤖 AI Chat
   Say "bot" to chat with AI"""
@@ -474,6 +643,7 @@ async def main():
             return f"❌ {provider.upper()} is not configured (missing API key)"
         
         ai_manager.set_provider_override(matching_models[0])
+        asyncio.create_task(ai_manager.warm_up())  # Import that provider's SDK now, not on the first reply
         return f"✅ AI switched to {provider.upper()} ({matching_models[0]})"
     
     async def adminhelp_cmd(user_uuid, argline, user_nickname):
@@ -493,6 +663,14 @@ async def main():
   /.removecoowner <uuid> - Remove co-owner
   /.removemod <uuid> - Remove moderator
   /.listperms - List all permissions
+  /.reloadlexicons - Reload word lists
+  /.jobs - Scheduled job runtime stats
+  /.perf - Latency summary (full metrics at :4000/metrics)
+  /.profile [seconds] - Sample hot functions + loop stalls
+  /.rooms - Rooms served by this bot
+  /.hopup, /.hopdown - Bot on/off stage
+  /.vote [up|down] - Bot votes on the current song
+  /.glue - Toggle glued to floor (no auto hop up)
 
 """
         
@@ -612,12 +790,145 @@ The music sharing community"""
         
         return permissions_manager.list_all()
     
+    async def reloadlexicons_cmd(user_uuid, argline, user_nickname):
+        """Recompile word lists from lexicons.json (co-owner only)"""
+        user_role = role_checker.get_user_role(user_uuid)
+        
+        if user_role != "coowner":
+            return "❌ Only co-owners can reload word lists."
+        
+        matcher = reload_shared_matcher()
+        return f"🔄 Word lists reloaded: {', '.join(sorted(matcher.lexicons))}"
+    
+    async def jobs_cmd(user_uuid, argline, user_nickname):
+        """Show periodic job runtime, biggest CPU users first (co-owner only)"""
+        user_role = role_checker.get_user_role(user_uuid)
+        
+        if user_role != "coowner":
+            return "❌ Only co-owners can view scheduler stats."
+        
+        lines = ["⏱️ Scheduled jobs (by CPU time)\n"]
+        for job in scheduler.report():
+            line = f"  {job['name']} every {job['interval']:g}s: {job['runs']} runs, cpu {job['cpu_time'] * 1000:.0f}ms, avg {job['avg_wall'] * 1000:.0f}ms, max {job['max_wall'] * 1000:.0f}ms"
+            if job["overruns"] or job["skipped"]:
+                line += f" ⚠️ {job['overruns']} overruns, {job['skipped']} skipped"
+            if job["errors"]:
+                line += f" ❌ {job['errors']} errors"
+            lines.append(line)
+        return "\n".join(lines)
+    
+    async def perf_cmd(user_uuid, argline, user_nickname):
+        """Latency summary from the metrics registry (co-owner only)"""
+        user_role = role_checker.get_user_role(user_uuid)
+        
+        if user_role != "coowner":
+            return "❌ Only co-owners can view performance stats."
+        
+        def ms(seconds):
+            return f"{seconds * 1000:.0f}ms" if seconds >= 0.01 else f"{seconds * 1000:.1f}ms"
+        
+        def section(title, family, top=5):
+            rows = metrics.latency_summary(family)[:top]
+            if not rows:
+                return []
+            lines = [f"\n{title}"]
+            for row in rows:
+                name = "/".join(row["labels"]) or "all"
+                lines.append(f"  {name}: {row['count']}× p50 {ms(row['p50'])} p95 {ms(row['p95'])} p99 {ms(row['p99'])}")
+            return lines
+        
+        lines = [f"📈 Performance\n\n{STARTUP.report()}\n📥 Queue depth {metrics.QUEUE_DEPTH.get():.0f}"]
+        lines += section("⏳ Queue wait", metrics.QUEUE_WAIT)
+        lines += section("⚙️ Events", metrics.EVENT_SECONDS)
+        lines += section("⌨️ Commands", metrics.COMMAND_SECONDS)
+        lines += section("🤖 AI", metrics.AI_SECONDS)
+        lines += section("💬 Chat send", metrics.SEND_SECONDS)
+        return "\n".join(lines)
+    
+    async def profile_cmd(user_uuid, argline, user_nickname):
+        """Sample the event loop for N seconds and post hot functions + stalls (co-owner only)"""
+        user_role = role_checker.get_user_role(user_uuid)
+        
+        if user_role != "coowner":
+            return "❌ Only co-owners can run the profiler."
+        if profiler.running:
+            return "🔬 A profile is already running"
+        
+        try:
+            seconds = min(max(int(argline.strip() or 10), 1), 60)
+        except ValueError:
+            return "Usage: /.profile [seconds 1-60]"
+        
+        # Run in the background - awaiting here would stall the message loop we want to profile
+        room = rooms.current()
+        async def run_profile():
+            try:
+                result = await profiler.run(seconds)
+                path = await asyncio.to_thread(result.write)
+                await room.platform.send_message(format_report(result, path))
+            except Exception as e:
+                LOG.error(f"❌ Profile failed: {e}")
+        
+        asyncio.create_task(run_profile())
+        return f"🔬 Profiling for {seconds}s..."
+    
+    async def rooms_cmd(user_uuid, argline, user_nickname):
+        """List the rooms this process serves (co-owner only)"""
+        user_role = role_checker.get_user_role(user_uuid)
+        
+        if user_role != "coowner":
+            return "❌ Only co-owners can view rooms."
+        
+        lines = [f"🏠 Serving {len(rooms.rooms)} room(s)\n"]
+        for room in rooms.rooms.values():
+            status = room.status()
+            line = f"  {status['room'][:16]} [{status['platform']}{'' if status['connected'] else ', offline'}]: {status['events']} events, {status['queued']} queued, {status['users']} users"
+            if status["playing"]:
+                line += f" • 🎵 {status['playing']}"
+            if status["stage"]["djs"]:
+                line += f" • 🎧 {status['stage']['djs']} DJs" + (f" ({status['stage']['afk_warned']} AFK)" if status["stage"]["afk_warned"] else "")
+            lines.append(line)
+        return "\n".join(lines)
+    
+    async def hopup_cmd(user_uuid, argline, user_nickname):
+        """Put the bot on stage (co-owner only)"""
+        if role_checker.get_user_role(user_uuid) != "coowner":
+            return "❌ Only co-owners can move the bot on stage."
+        return "🎧 Hopped up" if await rooms.current().platform.hop_up() else "❌ Couldn't hop up"
+    
+    async def hopdown_cmd(user_uuid, argline, user_nickname):
+        """Take the bot off stage (co-owner only)"""
+        if role_checker.get_user_role(user_uuid) != "coowner":
+            return "❌ Only co-owners can move the bot on stage."
+        return "🎧 Hopped down" if await rooms.current().platform.hop_down() else "❌ Couldn't hop down"
+    
+    async def glue_cmd(user_uuid, argline, user_nickname):
+        """Toggle whether auto stage may hop the bot up (co-owner only)"""
+        if role_checker.get_user_role(user_uuid) != "coowner":
+            return "❌ Only co-owners can glue the bot to the floor."
+        stage = rooms.current().stage
+        stage.glued = not stage.glued
+        return "🔒 Glued to the floor - no auto hop up" if stage.glued else "🔓 Unglued - auto hop up allowed"
+    
+    async def vote_cmd(user_uuid, argline, user_nickname):
+        """Vote on the current song (co-owner only)"""
+        if role_checker.get_user_role(user_uuid) != "coowner":
+            return "❌ Only co-owners can make the bot vote."
+        choice = argline.strip().lower() or "up"
+        if choice not in ("up", "down"):
+            return "Usage: /.vote [up|down]"
+        if await rooms.current().platform.vote(choice == "up"):
+            return "👍 Voted up" if choice == "up" else "👎 Voted down"
+        return "❌ Vote failed"
+    
     async def myuuid_cmd(user_uuid, argline, user_nickname):
         """Show your UUID"""
         return f"🔑 Your UUID: {user_uuid}\n\n📝 Use /.addcoowner or /.addmod to grant permissions"
 
     command_handler.register("uptime", uptime_cmd)
     command_handler.register("commands", help_cmd)
+    command_handler.register("stats", stats_cmd)
+    command_handler.register("discover", discover_cmd)
     command_handler.register("ai", ai_switch_cmd)
     command_handler.register("adminhelp", adminhelp_cmd)
     command_handler.register("gitlink", gitlink_cmd)
@@ -627,86 +938,117 @@ The music sharing community"""
     command_handler.register("removecoowner", removecoowner_cmd)
     command_handler.register("removemod", removemod_cmd)
     command_handler.register("listperms", listperms_cmd)
+    command_handler.register("reloadlexicons", reloadlexicons_cmd)
+    command_handler.register("jobs", jobs_cmd)
+    command_handler.register("perf", perf_cmd)
+    command_handler.register("profile", profile_cmd)
+    command_handler.register("rooms", rooms_cmd)
+    command_handler.register("hopup", hopup_cmd)
+    command_handler.register("hopdown", hopdown_cmd)
+    command_handler.register("vote", vote_cmd)
+    command_handler.register("glue", glue_cmd)
     command_handler.register("myuuid", myuuid_cmd)
 
-    # Start relay receiver
-    receiver = RelayReceiver(message_queue)
-    runner = await receiver.start(port=4000)
+    # Start rooms (platform adapter + a queue worker each)
+    if settings.shard_worker_id:
+        # Supervisor worker: rooms come from the shared store and can move here at any time
+        shard = ShardMember(settings.shard_worker_id, store, rooms, settings.relay_receiver_port)
+        await shard.heartbeat()
+        await shard.sync()
+        scheduler.add("shard_heartbeat", shard.heartbeat, every=2)
+        scheduler.add("shard_sync", shard.sync, every=1)
+    else:
+        for room_uuid, relay_url in room_list:
+            await rooms.add(room_uuid, relay_url)
+    LOG.info("✅ Rooms started")
     
-    # Start CometChat HTTP Poller (for receiving chat messages)
-    cometchat_poller = CometChatPoller(message_queue)
-    await cometchat_poller.start()
-    LOG.info("✅ CometChat HTTP polling started")
+    # Start relay receiver - events are routed by their "room" field, unnamed ones go to the primary room
+    receiver = RelayReceiver(rooms.primary.queue if rooms.primary else None, router=rooms.queue_for)
+    runner = await receiver.start(port=settings.relay_receiver_port)
+    STARTUP.mark("listeners")
 
     # Send boot greeting
     try:
         greeting_text = await command_handler.handle_message("system", "/uptime", settings.bot_name)
         if greeting_text:
             outgoing = f"👋 {settings.bot_name} online! {greeting_text}"
-            await cometchat.send_message(outgoing)
+            await asyncio.gather(*(room.platform.send_message(outgoing) for room in rooms.rooms.values()))
             LOG.info("✅ Bot online and visible in room")
     except Exception as e:
         LOG.error(f"❌ Boot greeting failed: {e}")
     
-    # Request room state from relay
-    try:
-        import aiohttp
-        async with aiohttp.ClientSession() as session:
-            async with session.get("http://127.0.0.1:3000/roomstate", timeout=aiohttp.ClientTimeout(total=5)) as resp:
-                if resp.status == 200:
-                    LOG.info("📊 Requested room state from relay")
-                else:
-                    LOG.warning(f"⚠️  Room state request failed: {resp.status}")
-    except Exception as e:
-        LOG.debug(f"Room state request failed (relay might still be starting): {e}")
+    # Room state is fetched by each room's adapter once its relay / socket is connected
 
     # Periodic uptime save (every 60 seconds to prevent data loss)
+    @scheduler.job("periodic_save", every=60)
     async def periodic_save():
-        while True:
-            await asyncio.sleep(60)
-            uptime_manager.save_periodic()
+        uptime_manager.save_periodic()
+        if link_safety:
+            link_safety.save()
+        for room in list(rooms.rooms.values()):
+            await room.music.save()
+        if audio_hinter:
+            await audio_hinter.save()
+        await asyncio.to_thread(metadata_service.cache.save)  # Can be thousands of entries - keep it off the loop
+    
+    scheduler.add("flood_prune", flood_control.prune, every=300)  # Drop idle users' windows
+    if store:
+        scheduler.add("user_memory_flush", user_memory.flush, every=1)  # Write-behind into the shared store
+    if link_safety:
+        scheduler.add("link_prune", link_safety.prune, every=3600)  # Drop expired link verdicts
+    
+    if trace_recorder:
+        scheduler.add("trace_flush", trace_recorder.flush, every=5)
     
     # Health check: verify bot is still visible in room (every 5 minutes)
+    @scheduler.job("health_check", every=300)
     async def health_check():
-        while True:
-            await asyncio.sleep(300)  # 5 minutes
-            try:
-                # Try to send a heartbeat to verify connection
-                session = await cometchat._get_session()
-                url = f"{cometchat.base_url}/v3/users/{settings.cometchat_uid}"
-                async with session.get(url, headers=cometchat.headers, timeout=aiohttp.ClientTimeout(total=10)) as resp:
-                    if resp.status == 200:
-                        LOG.debug("✅ Health check passed - bot is connected")
-                    else:
-                        LOG.error(f"⚠️  Health check failed: {resp.status} - bot may not be visible!")
-            except Exception as e:
-                LOG.error(f"⚠️  Health check error: {e} - connection may be lost!")
+        try:
+            # Try to send a heartbeat to verify connection
+            hang_room = next((room for room in rooms.rooms.values() if room.platform.name == "hang"), None)
+            if hang_room is None:
+                return
+            cometchat = hang_room.platform.cometchat
+            session = await cometchat._get_session()
+            url = f"{cometchat.base_url}/v3/users/{settings.cometchat_uid}"
+            async with session.get(url, headers=cometchat.headers, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+                if resp.status == 200:
+                    LOG.debug("✅ Health check passed - bot is connected")
+                else:
+                    LOG.error(f"⚠️  Health check failed: {resp.status} - bot may not be visible!")
+        except Exception as e:
+            LOG.error(f"⚠️  Health check error: {e} - connection may be lost!")
     
-    # Message processing loop
-    async def process_messages():
-        while True:
-            item = await message_queue.get()
-            await process_queue_item(item, ai_manager, command_handler, content_filter, cometchat, user_memory)
-
     try:
-        # Start background tasks
-        save_task = asyncio.create_task(periodic_save())
-        health_task = asyncio.create_task(health_check())
+        # Start background tasks (each room's discovery pools started with the room)
+        scheduler.start()
+        asyncio.create_task(ai_manager.warm_up())
         
-        # Run message processing (this blocks until shutdown)
-        await process_messages()
+        # Room workers process messages; this blocks until shutdown
+        await rooms.wait_closed()
     finally:
         LOG.info("Shutting down, persisting uptime")
-        save_task.cancel()
-        health_task.cancel()
+        await scheduler.stop()
+        if trace_recorder:
+            trace_recorder.close()
         uptime_manager.record_shutdown()
-        await cometchat.close()  # Close aiohttp session
-        await cometchat_poller.close()  # Stop polling
+        await rooms.close()  # Stop polling and room workers, save each room's music state, close the shared HTTP session
+        await user_memory.flush()
+        if audio_hinter:
+            await audio_hinter.close()
+        await metadata_service.close()
+        if link_safety:
+            await link_safety.close()
         await runner.cleanup()
+        stop_logging()
 
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if settings.shard_workers > 0:
+            from hangfm_bot.sharding import run_supervisor
+            asyncio.run(run_supervisor())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         logging.info("Shutdown complete")
@@ -6,6 +6,7 @@ const express = require('express');
 const bodyParser = require('body-parser');
 const { SocketClient } = require('ttfm-socket');
 const axios = require('axios');
+const { WebSocketServer } = require('ws');
 
 const SOCKET_URL = process.env.TTFM_SOCKET_BASE_URL || 'https://socket.prod.tt.fm';
 const TOKEN = process.env.TTFM_API_TOKEN;
@@ -30,30 +31,31 @@ function relayAuth(req, res, next) {
   next();
 }
 
+// Run one outbound socket action. ttfm-socket's action() resolves with the server's ack;
+// plain emit() is the fallback for socket clients without it.
+async function runAction(event, payload, expectAck, timeoutMs = 5000) {
+  if (!socket || !socket.connected) return { ok: false, error: 'socket not connected', status: 503 };
+  if (!expectAck) {
+    socket.emit(event, payload);
+    return { ok: true };
+  }
+  const ackPromise = typeof socket.action === 'function'
+    ? socket.action(event, payload).then((ack) => ({ ok: true, ack }), (err) => ({ ok: false, error: err.message || String(err) }))
+    : new Promise((resolve) => socket.emit(event, payload, (ack) => resolve({ ok: true, ack })));
+  return Promise.race([
+    ackPromise,
+    new Promise((r) => setTimeout(() => r({ ok: false, error: 'ack timeout' }), timeoutMs))
+  ]);
+}
+
 // Outbound: Python posts here to ask relay to emit to socket
 app.post('/send', relayAuth, async (req, res) => {
   try {
     const { event, payload, expectAck } = req.body || {};
     if (!event) return res.status(400).json({ ok: false, error: 'missing event' });
 
-    if (!socket || !socket.connected) {
-      return res.status(503).json({ ok: false, error: 'socket not connected' });
-    }
-
-    if (expectAck) {
-      // wait for ack with a timeout
-      const ackPromise = new Promise((resolve) => {
-        socket.emit(event, payload, (ack) => resolve({ ok: true, ack }));
-      });
-      const result = await Promise.race([
-        ackPromise,
-        new Promise((r) => setTimeout(() => r({ ok: false, error: 'ack timeout' }), 5000))
-      ]);
-      return res.json(result);
-    } else {
-      socket.emit(event, payload);
-      return res.json({ ok: true });
-    }
+    const { status, ...result } = await runAction(event, payload, expectAck);
+    return res.status(status || 200).json(result);
   } catch (err) {
     console.error('❌ send error', err);
     return res.status(500).json({ ok: false, error: err.message || String(err) });
@@ -61,14 +63,15 @@ app.post('/send', relayAuth, async (req, res) => {
 });
 
 // health endpoints
-app.get('/health', (req, res) => res.json({ ok: true, socketConnected: !!socket && socket.connected }));
+// connects counts socket (re)connections so Python can spot a reconnect between two health checks
+app.get('/health', (req, res) => res.json({ ok: true, socketConnected: !!socket && socket.connected, connects }));
 app.get('/ready', (req, res) => res.json({ ok: true }));
 app.get('/roomstate', (req, res) => {
   if (socket && socket.connected) {
     socket.emit('getRoomState', { roomUuid: ROOM_UUID }, (roomState) => {
       if (roomState) {
         // Forward to Python
-        axios.post(PY_WEBHOOK, { event: 'roomStateUpdated', payload: roomState }, { timeout: 5000 })
+        axios.post(PY_WEBHOOK, { event: 'roomStateUpdated', room: ROOM_UUID, payload: roomState }, { timeout: 5000 })
           .then(() => res.json({ ok: true, forwarded: true }))
           .catch(e => res.json({ ok: false, error: e.message }));
       } else {
@@ -84,9 +87,37 @@ const server = app.listen(RELAY_PORT, () => {
   console.log(`✅ Relay HTTP listening on http://127.0.0.1:${RELAY_PORT}`);
 });
 
+// Outbound over one persistent WebSocket: Python sends {id, event, payload, expectAck, timeoutMs}
+// frames without waiting, and each reply {id, ok, ack|error} comes back as soon as its action settles
+const actionServer = new WebSocketServer({
+  server,
+  path: '/actions',
+  verifyClient: ({ req }) => !RELAY_SECRET || req.headers['x-relay-secret'] === RELAY_SECRET,
+});
+actionServer.on('connection', (ws) => {
+  ws.on('message', async (data) => {
+    let msg;
+    try {
+      msg = JSON.parse(data.toString());
+    } catch (e) {
+      return;
+    }
+    const { id, event, payload, expectAck, timeoutMs } = msg;
+    let reply;
+    try {
+      reply = event ? await runAction(event, payload, expectAck, timeoutMs) : { ok: false, error: 'missing event' };
+    } catch (err) {
+      reply = { ok: false, error: err.message || String(err) };
+    }
+    delete reply.status;
+    if (ws.readyState === ws.OPEN) ws.send(JSON.stringify({ id, ...reply }));
+  });
+});
+
 // ttfm-socket wiring
 let socket = null;
 let roomStateRequested = false;
+let connects = 0;
 
 async function startSocket() {
   socket = new SocketClient(SOCKET_URL);
@@ -101,7 +132,7 @@ async function startSocket() {
         if (roomState) {
           console.info('✅ Room state received');
           // Forward initial room state to Python
-          axios.post(PY_WEBHOOK, { event: 'roomStateUpdated', payload: roomState }, { timeout: 5000 })
+          axios.post(PY_WEBHOOK, { event: 'roomStateUpdated', room: ROOM_UUID, payload: roomState }, { timeout: 5000 })
             .catch(e => console.warn('⚠️  Failed to forward initial room state', e.message));
         } else {
           console.warn('⚠️  Room state was empty');
@@ -114,6 +145,7 @@ async function startSocket() {
 
   socket.on('connect', () => {
     console.info('✅ ttfm-socket connected');
+    connects += 1;
     // Request room state when socket is actually connected
     setTimeout(requestRoomState, 500);
   });
@@ -128,11 +160,11 @@ async function startSocket() {
   });
 
   // register and forward events
-  const events = ['statefulMessage','statelessMessage','playedSong','roomStateUpdated','addedDj','removedDj','userJoined','userLeft'];
+  const events = ['statefulMessage','statelessMessage','playedSong','votedOnSong','roomStateUpdated','addedDj','removedDj','userJoined','userLeft'];
   events.forEach(evt => {
     socket.on(evt, (data) => {
       // best-effort forward
-      axios.post(PY_WEBHOOK, { event: evt, payload: data }, { timeout: 5000 }).catch(e => {
+      axios.post(PY_WEBHOOK, { event: evt, room: ROOM_UUID, payload: data }, { timeout: 5000 }).catch(e => {
         console.warn('⚠️  forward failed', evt, e.message || e);
       });
     });
@@ -0,0 +1,49 @@
+# tests/conftest.py
+# Placeholder settings (Settings() requires them) and a fresh cwd per test, since every
+# state file the bot writes is cwd-relative
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+DUMMY_ENV = {
+    "TTFM_API_TOKEN": "test",
+    "ROOM_UUID": "test-room",
+    "DISCOGS_USER_TOKEN": "test",
+    "SPOTIFY_CLIENT_ID": "test",
+    "SPOTIFY_CLIENT_SECRET": "test",
+    "COMETCHAT_APPID": "test",
+    "COMETCHAT_API_KEY": "test",
+    "COMETCHAT_UID": "test-bot",
+    "COMETCHAT_AUTH": "test",
+}
+for key, value in DUMMY_ENV.items():
+    os.environ.setdefault(key, value)
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cwd(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+class FakeClock:
+    """Settable stand-in for time.monotonic"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -0,0 +1,150 @@
+import asyncio
+
+import numpy as np
+from aiohttp import web
+
+from hangfm_bot.music.audio_features import FEATURE_DIM, AudioGenreHinter, FeatureStore
+from hangfm_bot.music.discovery import DiscoveryEngine
+from hangfm_bot.music.genre_classifier import GenreClassifier
+from hangfm_bot.music.metadata_service import MetadataService
+from hangfm_bot.music.recently_played import RecentlyPlayed
+
+
+def vector(value):
+    return np.full(FEATURE_DIM, value, dtype=np.float32) + np.linspace(0, 0.1, FEATURE_DIM, dtype=np.float32)
+
+
+def test_label_waits_for_the_vector(tmp_path):
+    store = FeatureStore(tmp_path)
+    store.label("t1", "Alternative Rock")  # Not analyzed yet
+    assert store.labeled()[1] == []
+    store.put("t1", vector(1.0))
+    vectors, labels = store.labeled()
+    assert labels == ["Alternative Rock"] and vectors.shape == (1, FEATURE_DIM)
+
+
+def test_hint_once_centroids_exist(tmp_path):
+    hinter = AudioGenreHinter(FeatureStore(tmp_path), max_distance=10.0)
+    hinter.store.put("unknown", vector(0.9))
+    assert asyncio.run(hinter.hint("unknown", "")) is None  # No labeled tracks yet
+
+    for i, value in enumerate((0.0, 0.1, 0.2)):
+        hinter.store.put(f"hiphop{i}", vector(value))
+        asyncio.run(hinter.learn(f"hiphop{i}", "Alternative Hip Hop"))
+    for i, value in enumerate((1.0, 1.1, 1.2)):
+        hinter.store.put(f"rock{i}", vector(value))
+        asyncio.run(hinter.learn(f"rock{i}", "Alternative Rock"))
+
+    assert asyncio.run(hinter.hint("unknown", "")) == "Alternative Rock"
+    classifier = GenreClassifier()
+    genres, _ = asyncio.run(hinter.classify_with_hint(classifier, {"genres": ["Rock"]}, "unknown", ""))
+    assert genres == {"Alternative Rock"}
+
+
+def test_preview_download(tmp_path):
+    clip = b"ID3" + bytes(2048)
+
+    async def preview(request):
+        if request.match_info["name"] == "missing":
+            return web.Response(status=404)
+        return web.Response(body=clip if request.match_info["name"] == "clip" else bytes(9000))
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get("/{name}", preview)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        hinter = AudioGenreHinter(FeatureStore(tmp_path), max_preview_bytes=4096)
+        try:
+            return (
+                await hinter.download("t1", f"{url}/clip"),
+                await hinter.download("t2", f"{url}/missing"),
+                await hinter.download("t3", f"{url}/huge"),
+            )
+        finally:
+            await hinter.close()
+            await runner.cleanup()
+
+    path, missing, huge = asyncio.run(scenario())
+    assert path.read_bytes() == clip
+    assert missing is None and huge is None
+
+
+class FakeMetadata:
+    def __init__(self, answers):
+        self.answers = answers
+
+    async def lookup(self, artist, track):
+        return self.answers[artist]
+
+    classify = staticmethod(MetadataService.classify)
+
+
+class FakeHinter:
+    def __init__(self, hinted=None):
+        self.hinted = hinted
+        self.learned = []
+        self.hints = []
+
+    async def learn(self, track_id, genre, preview=None):
+        self.learned.append((track_id, genre, preview))
+
+    async def classify_with_hint(self, classifier, metadata, track_id, preview):
+        self.hints.append((track_id, preview))
+        genres = list(metadata.get("genres") or []) + ([self.hinted] if self.hinted else [])
+        return classifier.filter_to_target_genres(genres, genres)
+
+
+def test_verify_labels_confirmed_previews_and_hints_the_rest():
+    metadata = FakeMetadata({
+        "Slowdive": {"genres": ["Alternative Rock"], "subgenres": ["Shoegaze"], "year": "1993"},
+        "Unknown": {"genres": [], "subgenres": [], "year": "1995"},
+        "NoClip": {"genres": ["Alternative Rock"], "subgenres": [], "year": "1995"},
+    })
+    hinter = FakeHinter(hinted="Alternative Rock")
+    engine = DiscoveryEngine(None, metadata, GenreClassifier(), RecentlyPlayed(), audio_hinter=hinter)
+
+    def verify(artist, preview=None):
+        candidate = {"artist": artist, "track": "Song", "key": artist.lower()}
+        if preview:
+            candidate["preview_url"] = preview
+        return asyncio.run(engine._verify("Alternative Rock", candidate))
+
+    assert verify("Slowdive", "https://p.scdn.co/mp3-preview/a")
+    assert verify("Unknown", "https://p.scdn.co/mp3-preview/b")
+    assert verify("NoClip")
+    assert hinter.learned == [("slowdive", "Alternative Rock", "https://p.scdn.co/mp3-preview/a")]
+    assert hinter.hints == [("unknown", "https://p.scdn.co/mp3-preview/b")]
+
+    hinter.hinted = None
+    assert not verify("Unknown", "https://p.scdn.co/mp3-preview/b")
+
+
+def test_metal_hint_confirms_with_a_nu_metal_subgenre(tmp_path):
+    hinter = AudioGenreHinter(FeatureStore(tmp_path), max_distance=10.0)
+    for i, value in enumerate((0.0, 0.1, 0.2)):
+        hinter.store.put(f"rock{i}", vector(value))
+        asyncio.run(hinter.learn(f"rock{i}", "Alternative Rock"))
+    for i, value in enumerate((2.0, 2.1, 2.2)):
+        hinter.store.put(f"metal{i}", vector(value))
+        asyncio.run(hinter.learn(f"metal{i}", "Alternative Metal"))
+    hinter.store.put("unknown", vector(2.05))
+
+    genres, subgenres = asyncio.run(hinter.classify_with_hint(GenreClassifier(), {"genres": []}, "unknown", ""))
+    assert genres == {"Alternative Metal"} and subgenres == {"Nu-Metal"}
+    assert DiscoveryEngine._in_genre("Alternative Metal", genres, subgenres)
+
+
+def test_store_writes_wait_for_save(tmp_path):
+    store = FeatureStore(tmp_path)
+    store.put("t1", vector(1.0), label="Alternative Rock")
+    assert store.dirty and not (tmp_path / "index.json").exists()
+    asyncio.run(asyncio.to_thread(store.save))
+    assert not store.dirty
+
+    reloaded = FeatureStore(tmp_path)
+    vectors, labels = reloaded.labeled()
+    assert labels == ["Alternative Rock"] and np.allclose(vectors[0], vector(1.0))
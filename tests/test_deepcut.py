@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+import aiohttp
+from aiohttp import web
+
+from hangfm_bot.message_queue import MessageQueue
+from hangfm_bot.platforms.deepcut import DeepcutAdapter, decode_frames, encode_frame
+
+
+def test_frames_round_trip():
+    frames = ["~h~7", '{"api":"room.speak","text":"héllo ~m~"}', ""]
+    assert decode_frames("".join(encode_frame(f) for f in frames)) == frames
+    assert decode_frames(encode_frame("ok") + "garbage") == ["ok"]
+
+
+def test_dj_changes_for_users_not_seen_yet():
+    adapter = DeepcutAdapter("room", MessageQueue(), None, socket_url="ws://x", userid="bot", auth="x")
+    assert adapter.translate({"command": "add_dj", "userid": "u123"}) == [("addedDj", {"name": "Unknown", "uuid": "u123"})]
+    adapter.translate({"command": "registered", "user": [{"userid": "u123", "name": "Amy"}]})
+    assert adapter.translate({"command": "rem_dj", "userid": "u123"}) == [("removedDj", {"name": "Amy", "uuid": "u123"})]
+    assert adapter.translate({"command": "add_dj", "user": [{"userid": "u9", "name": "Bob"}]}) == [("addedDj", {"name": "Bob", "uuid": "u9"})]
+
+
+class FakeDeepcut:
+    """Local socket answering like Deepcut: replies to room.speak out of order, closes on request"""
+
+    def __init__(self):
+        self.heartbeats = []
+        self.runner = None
+        self.url = ""
+
+    async def socket(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_str(encode_frame("~h~1"))
+        held = []
+
+        async def reply(req, **fields):
+            await ws.send_str(encode_frame(json.dumps({"msgid": req["msgid"], "success": True, **fields})))
+
+        async for msg in ws:
+            for frame in decode_frames(msg.data):
+                if frame.startswith("~h~"):
+                    self.heartbeats.append(frame)
+                    continue
+                req = json.loads(frame)
+                if req["api"] == "room.info":
+                    await reply(req, room={"metadata": {"djs": []}}, users=[])
+                    # More chat than the room queue holds
+                    for text in ("one", "two", "three"):
+                        await ws.send_str(encode_frame(json.dumps({"command": "speak", "userid": "u1", "name": "Amy", "text": text})))
+                elif req["api"] == "room.speak":
+                    held.append(req)
+                    if len(held) == 2:
+                        for r in reversed(held):
+                            await reply(r, echo=r["text"])
+                        held.clear()
+                elif req["api"] == "test.close":
+                    await ws.close()
+                else:
+                    await reply(req)
+        return ws
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/socket", self.socket)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/socket"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+async def eventually(predicate, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met"
+        await asyncio.sleep(0.01)
+
+
+def test_replies_correlate_by_msgid_and_never_wait_on_a_full_queue():
+    async def scenario():
+        async with FakeDeepcut() as server, aiohttp.ClientSession() as session:
+            queue = MessageQueue(maxsize=2)
+            adapter = DeepcutAdapter("room", queue, session, socket_url=server.url, userid="bot", auth="x")
+            await adapter.start(None)
+            try:
+                await eventually(lambda: adapter.connected and adapter.dropped == 1)
+                assert server.heartbeats == ["~h~1"]
+                # The queue is still full; replies reach the pending requests anyway, out of order
+                first, second = await asyncio.gather(
+                    adapter._request("room.speak", text="a", timeout=2),
+                    adapter._request("room.speak", text="b", timeout=2),
+                )
+                assert (first["echo"], second["echo"]) == ("a", "b")
+                events = [await queue.get() for _ in range(3)]
+                assert [e[1].get("text") for e in events[:2]] == ["one", "two"]
+                assert events[2][0] == "roomStateUpdated"  # Was waiting for room in the queue
+
+                try:
+                    await adapter._request("test.close", timeout=2)
+                except ConnectionError:
+                    pass
+                else:
+                    raise AssertionError("pending request survived the socket closing")
+                await eventually(lambda: not adapter.connected)
+            finally:
+                await adapter.stop(None)
+
+    asyncio.run(scenario())
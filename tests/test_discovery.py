@@ -0,0 +1,38 @@
+import asyncio
+
+from hangfm_bot.music.discovery import CandidateSource, DiscoveryEngine
+from hangfm_bot.music.genre_classifier import GenreClassifier
+from hangfm_bot.music.metadata_service import MetadataService
+from hangfm_bot.music.recently_played import RecentlyPlayed
+
+
+class FakeSource(CandidateSource):
+    async def fetch(self, genre, subgenre, year_start, year_end):
+        return [{"artist": f"Band {i}", "track": f"{genre} {i}"} for i in range(20)]
+
+
+class SlowMetadata:
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.lookups = 0
+
+    async def lookup(self, artist, track):
+        self.lookups += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        genre = track.rsplit(" ", 1)[0]
+        return {"genres": [genre], "subgenres": ["Nu-Metal"], "year": "1999"}
+
+    classify = staticmethod(MetadataService.classify)
+
+
+def test_refill_caps_lookups_in_flight():
+    metadata = SlowMetadata()
+    engine = DiscoveryEngine(FakeSource(), metadata, GenreClassifier(), RecentlyPlayed(), pool_size=20, verify_concurrency=3)
+    asyncio.run(engine.refill())
+    assert engine.pool_sizes() == {genre: 20 for genre in DiscoveryEngine.TARGET_GENRES}
+    assert metadata.lookups == 60
+    assert metadata.peak == 3
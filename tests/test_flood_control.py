@@ -0,0 +1,97 @@
+from hangfm_bot.utils.flood_control import FloodControl, SlidingWindow
+
+
+def make(clock, **kwargs):
+    options = dict(user_messages=3, user_window=10, ai_limit=2, ai_window=60, room_actions=4, room_window=10, mute_sec=30, mute_max_sec=100)
+    options.update(kwargs)
+    return FloodControl(clock=clock, **options)
+
+
+def test_sliding_window_frees_up_as_events_age_out():
+    window = SlidingWindow(2, 10)
+    assert window.hit(0) and window.hit(1)
+    assert not window.hit(5)
+    assert window.hit(10)  # The event at 0 left the window
+
+
+def test_user_flood_mutes(clock):
+    flood = make(clock)
+    assert [flood.check("u", False, False) for _ in range(3)] == [None, None, None]
+    assert flood.check("u", False, False) == "user_flood"
+    clock.advance(29)
+    assert flood.check("u", False, False) == "muted"
+    clock.advance(1)
+    assert flood.check("u", False, False) is None
+
+
+def test_ai_spam_mutes(clock):
+    flood = make(clock, user_messages=0)
+    assert flood.check("u", False, True) is None
+    clock.advance(5)
+    assert flood.check("u", False, True) is None
+    clock.advance(5)
+    assert flood.check("u", False, True) == "ai_spam"
+    assert flood.check("u", False, False) == "muted"
+
+
+def test_room_flood_drops_excess_without_muting(clock):
+    flood = make(clock, user_messages=0)
+    results = [flood.check(f"user{i}", True, False, room="r1") for i in range(5)]
+    assert results == [None, None, None, None, "room_flood"]
+    assert flood.check("user9", True, False, room="r2") is None  # Other rooms have their own window
+    assert flood.check("user9", False, False, room="r1") is None  # Plain chat isn't a room action
+    clock.advance(10)
+    assert flood.check("user4", True, False, room="r1") is None  # Not muted
+
+
+def test_mutes_double_up_to_the_cap(clock):
+    flood = make(clock, user_messages=1, mute_sec=30, mute_max_sec=100)
+    durations = []
+    for _ in range(4):
+        assert flood.check("u", False, False) is None
+        assert flood.check("u", False, False) == "user_flood"
+        muted_from = clock.now
+        while flood.check("u", False, False) == "muted":
+            clock.advance(1)
+        durations.append(clock.now - muted_from)
+        clock.advance(10)  # Let the message window empty; well inside the quiet spell
+    assert durations == [30, 60, 100, 100]
+
+
+def test_strikes_reset_after_a_quiet_spell(clock):
+    flood = make(clock, user_messages=1, mute_sec=30, mute_max_sec=100)
+    flood.check("u", False, False)
+    assert flood.check("u", False, False) == "user_flood"
+    clock.advance(129)
+    flood.check("u", False, False)
+    assert flood.check("u", False, False) == "user_flood"  # 99s after the mute ended: second strike
+    clock.advance(59)
+    assert flood.check("u", False, False) == "muted"
+    clock.advance(162)  # Longer than mute_max_sec since that mute ended
+    flood.check("u", False, False)
+    assert flood.check("u", False, False) == "user_flood"
+    clock.advance(29)
+    assert flood.check("u", False, False) == "muted"
+    clock.advance(1)
+    assert flood.check("u", False, False) is None  # Back to a first-offence mute
+
+
+def test_staff_are_exempt(clock):
+    flood = make(clock, is_exempt=lambda uuid: uuid == "mod")
+    assert all(flood.check("mod", True, True, room="r") is None for _ in range(50))
+
+
+def test_zero_limits_turn_checks_off(clock):
+    flood = make(clock, user_messages=0, ai_limit=0, room_actions=0)
+    assert all(flood.check("u", True, True) is None for _ in range(50))
+
+
+def test_state_is_bounded_and_pruned(clock):
+    flood = make(clock, max_users=3, max_rooms=2)
+    for i in range(10):
+        flood.check(f"u{i}", True, False, room=f"r{i}")
+    assert len(flood._users) == 3 and len(flood._rooms) == 2
+    assert set(flood._users) == {(f"r{i}", f"u{i}") for i in (7, 8, 9)}
+    clock.advance(1000)
+    assert flood.prune() == 3
+    assert not flood._users and not flood._rooms
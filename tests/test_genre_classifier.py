@@ -0,0 +1,26 @@
+from hangfm_bot.music.genre_classifier import GenreClassifier
+
+
+def test_batch_matches_per_row_and_matches_each_string_once():
+    rows = [
+        (["Alternative Rock", "Rock"], ["Shoegaze", "shoegaze ", "Synth-pop"]),
+        ("Alt Metal", ["Nu Metal"]),
+        (["Alternative Metal"], ["Industrial Metal"]),
+        (["alternative hip hop"], ["Trip Hop", None, {"name": "x"}]),
+        (None, None),
+    ]
+    classifier = GenreClassifier()
+    calls = []
+    categorize = classifier._categorize
+    classifier._categorize = lambda text: calls.append(text) or categorize(text)
+
+    batch = classifier.classify_batch(rows)
+    assert batch == [
+        ({"Alternative Rock"}, {"Shoegaze", "shoegaze "}),
+        ({"Alternative Metal"}, {"Nu-Metal"}),
+        (set(), set()),
+        ({"Alternative Hip Hop"}, {"Trip Hop"}),
+        (set(), set()),
+    ]
+    assert sorted(calls) == sorted(set(calls))  # "Shoegaze" and "shoegaze " share one match
+    assert batch[0] == classifier.filter_to_target_genres(*rows[0])
@@ -0,0 +1,86 @@
+import asyncio
+
+from aiohttp import web
+
+from hangfm_bot.utils import link_safety
+from hangfm_bot.utils.link_safety import LinkSafety, _domain_in, extract_urls, normalize_url
+
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://WWW.Example.com:443/Path/?utm_source=x&b=2&fbclid=y#top") == "https://example.com/Path?b=2"
+    assert normalize_url("http://example.com:8080") == "http://example.com:8080/"
+    assert normalize_url("https://example.com/song).") == "https://example.com/song"
+    assert normalize_url("ftp://example.com/file") is None
+    assert normalize_url("https://example.com:99999/") is None
+
+
+def test_extract_urls_dedupes_in_order():
+    text = "check https://b.com/x and http://www.a.com, also https://b.com/x/ again"
+    assert extract_urls(text) == ["https://b.com/x", "http://a.com/"]
+    assert extract_urls("no links here") == []
+
+
+def test_domain_rules_match_on_suffix_only():
+    assert _domain_in("music.youtube.com", link_safety.SAFE_DOMAINS)
+    assert _domain_in("youtube.com", link_safety.SAFE_DOMAINS)
+    assert not _domain_in("notyoutube.com", link_safety.SAFE_DOMAINS)
+    assert not _domain_in("youtube.com.evil.ru", link_safety.SAFE_DOMAINS)
+    assert LinkSafety.domain_rules("youtube.com.evil.ru").reason == "suspicious TLD"
+
+
+def test_verdicts_expire_after_their_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(link_safety.time, "time", lambda: now[0])
+    checker = LinkSafety(domain_ttl=100, url_ttl=10)
+    calls = []
+
+    async def remote_check(url):
+        calls.append(url)
+        return link_safety.SAFE
+
+    checker.remote_check = remote_check
+
+    async def scenario():
+        await checker.check("https://example.com/a")
+        await checker.check("https://example.com/a")
+        now[0] += 11  # URL verdict expired, domain verdict not
+        await checker.check("https://example.com/a")
+
+    asyncio.run(scenario())
+    assert calls == ["https://example.com/a", "https://example.com/a"]
+    assert "d:example.com" in checker.entries and checker.prune() == 0
+    now[0] += 100
+    assert checker.prune() == 2
+
+
+def test_failed_remote_check_is_not_cached(monkeypatch):
+    answers = [web.Response(status=503), web.json_response({"matches": [{"threatType": "MALWARE"}]})]
+    hits = []
+
+    async def find(request):
+        hits.append(request.query["key"])
+        return answers.pop(0)
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/find", find)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        monkeypatch.setattr(link_safety, "SAFE_BROWSING_URL", f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/find")
+        checker = LinkSafety(api_key="key")
+        try:
+            first = await checker.check("https://example.com/a")
+            second = await checker.check("https://example.com/a")
+            third = await checker.check("https://example.com/a")
+        finally:
+            await checker.close()
+            await runner.cleanup()
+        return checker, first, second, third
+
+    checker, first, second, third = asyncio.run(scenario())
+    assert first.verdict == "error" and not first.blocked
+    assert second.verdict == "suspicious" and second.reason == "malware"
+    assert third == second and len(hits) == 2  # The real verdict is cached
+    assert checker.entries["u:https://example.com/a"]["verdict"] == "suspicious"
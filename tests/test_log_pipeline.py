@@ -0,0 +1,86 @@
+import json
+import logging
+import sys
+
+from hangfm_bot.log_pipeline import JsonLinesFormatter, LazyQueueHandler, RateLimitFilter, _SuppressedNoteFilter
+
+
+def record(msg="played %s", args=("Ride",), level=logging.INFO, name="bot", **extra):
+    rec = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(rec, key, value)
+    return rec
+
+
+def test_rate_limit_spends_burst_then_refills(clock):
+    limiter = RateLimitFilter(rate_per_sec=2, burst=3, clock=clock)
+    assert [limiter.filter(record()) for _ in range(5)] == [True, True, True, False, False]
+    assert limiter.suppressed == 2
+
+    clock.advance(0.5)  # One token back
+    assert limiter.filter(record())
+    assert not limiter.filter(record())
+
+    clock.advance(60)  # Refill is capped at the burst size
+    assert [limiter.filter(record()) for _ in range(4)] == [True, True, True, False]
+
+
+def test_rate_limit_is_per_call_site_and_spares_warnings(clock):
+    limiter = RateLimitFilter(rate_per_sec=1, burst=1, clock=clock)
+    assert limiter.filter(record())
+    assert not limiter.filter(record(args=("Slowdive",)))  # Same template, same bucket
+    assert limiter.filter(record(msg="skipped %s"))
+    assert limiter.filter(record(name="other"))
+    assert limiter.filter(record(level=logging.WARNING))
+    assert limiter.filter(record(level=logging.ERROR))
+
+
+def test_suppressed_count_is_noted_once_allowed_again(clock):
+    limiter = RateLimitFilter(rate_per_sec=1, burst=1, clock=clock)
+    assert limiter.filter(record())
+    for _ in range(3):
+        assert not limiter.filter(record())
+    clock.advance(1)
+
+    allowed = record()
+    assert limiter.filter(allowed)
+    assert allowed.suppressed == 3
+
+    note = _SuppressedNoteFilter()
+    note.filter(allowed)
+    note.filter(allowed)  # Second output handler must not append it again
+    assert allowed.getMessage() == "played Ride (+3 similar suppressed)"
+
+    clock.advance(1)
+    quiet = record()
+    assert limiter.filter(quiet)
+    assert not hasattr(quiet, "suppressed")
+
+
+def test_json_lines_carry_extras():
+    rec = record(room="abc", suppressed=2)
+    entry = json.loads(JsonLinesFormatter().format(rec))
+    assert entry["msg"] == "played Ride"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "bot"
+    assert entry["room"] == "abc"
+    assert entry["suppressed"] == 2
+    assert "args" not in entry and "exc" not in entry
+
+
+def test_json_lines_include_exception():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        rec = logging.LogRecord("bot", logging.ERROR, __file__, 1, "failed", None, sys.exc_info())
+    entry = json.loads(JsonLinesFormatter().format(rec))
+    assert "ValueError: boom" in entry["exc"]
+
+
+def test_queue_handler_leaves_formatting_to_listener():
+    args = ("Ride",)
+    rec = record(args=args)
+    assert LazyQueueHandler(None).prepare(rec) is rec
+    assert rec.msg == "played %s"
+    assert rec.args is args
+    assert "message" not in vars(rec)
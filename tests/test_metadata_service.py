@@ -0,0 +1,206 @@
+import asyncio
+import time
+
+from aiohttp import web
+
+from hangfm_bot.music.metadata_service import (
+    DiscogsSource,
+    MetadataCache,
+    MetadataService,
+    MusicBrainzSource,
+    SpotifySource,
+    WikipediaSource,
+    parse_song_infobox,
+)
+from hangfm_bot.music.spotify_auth import SpotifyTokenManager
+
+WIKITEXT = """{{Short description|1991 song by Slint}}
+{{Infobox song
+| name     = Nosferatu Man
+| artist   = [[Slint]]
+| album    = ''[[Spiderland (album)|Spiderland]]''<ref>{{cite web|url=x|title=y}}</ref>
+| released = {{Start date|1991|3|27}}
+| genre    = {{flatlist|
+* [[Post-rock]]
+* [[math rock]]}}
+}}
+'''Nosferatu Man''' is a song recorded in 1990 for the album ''Tweez''."""
+
+
+class StandIn:
+    """Local aiohttp server answering like each metadata API, with per-source delays"""
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.hits = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.runner = None
+        self.url = ""
+
+    async def _answer(self, source, payload):
+        self.hits.append(source)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.get(source, 0))
+        finally:
+            self.in_flight -= 1
+        return web.json_response(payload)
+
+    async def token(self, request):
+        return web.json_response({"access_token": "tok", "expires_in": 3600})
+
+    async def spotify_search(self, request):
+        item = {
+            "album": {"name": "Spiderland (Remastered)", "release_date": "2014-04-15"},
+            "artists": [{"id": "slint"}],
+        }
+        return await self._answer("spotify", {"tracks": {"items": [item]}})
+
+    async def spotify_artist(self, request):
+        return web.json_response({"genres": ["post-rock", "Math Rock"]})
+
+    async def discogs(self, request):
+        release = {"title": "Slint - Spiderland", "year": "1991", "genre": ["Rock"], "style": ["Post Rock", "math rock"]}
+        return await self._answer("discogs", {"results": [release]})
+
+    async def musicbrainz(self, request):
+        recording = {"releases": [{"title": "Spiderland", "date": "1991-03-27"}]}
+        return await self._answer("musicbrainz", {"recordings": [recording]})
+
+    async def wikipedia(self, request):
+        if request.query["page"] != "Nosferatu Man (Slint song)":
+            return web.json_response({"error": {"code": "missingtitle"}})
+        return await self._answer("wikipedia", {"parse": {"wikitext": WIKITEXT}})
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/api/token", self.token)
+        app.router.add_get("/v1/search", self.spotify_search)
+        app.router.add_get("/v1/artists/{id}", self.spotify_artist)
+        app.router.add_get("/database/search", self.discogs)
+        app.router.add_get("/ws/2/recording", self.musicbrainz)
+        app.router.add_get("/w/api.php", self.wikipedia)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+    def service(self, cache=None, timeout=2.0):
+        tokens = SpotifyTokenManager("id", "secret", auth_url=f"{self.url}/api/token")
+        sources = [
+            SpotifySource("id", "secret", base_url=self.url, timeout=timeout, token_manager=tokens),
+            DiscogsSource("token", "test-agent", base_url=self.url, timeout=timeout),
+            MusicBrainzSource(base_url=self.url, timeout=timeout),
+            WikipediaSource(base_url=self.url, timeout=timeout),
+        ]
+        return MetadataService(sources, cache if cache is not None else MetadataCache())
+
+
+def test_sources_are_queried_concurrently():
+    async def scenario():
+        async with StandIn(delays={name: 0.2 for name in ("spotify", "discogs", "musicbrainz", "wikipedia")}) as api:
+            service = api.service()
+            started = time.monotonic()
+            result = await service.lookup("Slint", "Nosferatu Man")
+            elapsed = time.monotonic() - started
+            await service.close()
+            return api, result, elapsed
+
+    api, result, elapsed = asyncio.run(scenario())
+    assert result["sources"] == ["discogs", "musicbrainz", "spotify", "wikipedia"]
+    assert api.peak_in_flight == 4
+    assert elapsed < 0.6  # Well under the 0.8s the four delays add up to
+
+
+def test_slow_source_times_out_alone():
+    async def scenario():
+        async with StandIn(delays={"musicbrainz": 1.0}) as api:
+            service = api.service(timeout=0.2)
+            started = time.monotonic()
+            result = await service.lookup("Slint", "Nosferatu Man")
+            elapsed = time.monotonic() - started
+            await service.close()
+            return result, elapsed
+
+    result, elapsed = asyncio.run(scenario())
+    assert "musicbrainz" not in result["sources"]
+    assert result["sources"] == ["discogs", "spotify", "wikipedia"]
+    assert result["year"] == "1991"  # Discogs is next in line for the year
+    assert elapsed < 0.8
+
+
+def test_merge_follows_field_priority():
+    async def scenario():
+        async with StandIn() as api:
+            service = api.service()
+            result = await service.lookup("Slint", "Nosferatu Man")
+            await service.close()
+            return result
+
+    result = asyncio.run(scenario())
+    assert result["album"] == "Spiderland (Remastered)"  # Spotify first for album
+    assert result["year"] == "1991"  # MusicBrainz first for year, not Spotify's reissue date
+    assert result["genres"] == ["post-rock", "Math Rock", "Rock"]  # Case duplicates dropped
+    assert result["subgenres"] == ["post-rock", "Math Rock", "Post Rock"]
+
+
+def test_cached_replay_makes_no_network_calls():
+    async def scenario():
+        async with StandIn() as api:
+            service = api.service()
+            first = await service.lookup("Slint", "Nosferatu Man")
+            hits = len(api.hits)
+            again = await service.lookup("slint", "  Nosferatu Man ")
+            assert len(api.hits) == hits and service.cache_hits == 1
+            await service.close()  # Saves the cache file
+
+            restarted = api.service(cache=MetadataCache())
+            replay = await restarted.lookup("Slint", "Nosferatu Man")
+            await restarted.close()
+            return api, hits, first, again, replay, restarted
+
+    api, hits, first, again, replay, restarted = asyncio.run(scenario())
+    assert hits == 4
+    assert len(api.hits) == hits
+    assert first == again == replay
+    assert restarted.network_lookups == 0
+
+
+def test_song_infobox_fields():
+    fields = parse_song_infobox(WIKITEXT)
+    assert fields["artist"] == "[[Slint]]"
+    assert fields["released"] == "{{Start date|1991|3|27}}"
+    assert "math rock" in fields["genre"]
+    assert parse_song_infobox("'''Tweez''' is the 1989 debut album by Slint.") is None
+
+
+def test_rate_limited_source_spaces_lookups():
+    source = MusicBrainzSource(timeout=2.5)
+    assert [source.reserve_slot(now=100.0) for _ in range(4)] == [0.0, 1.0, 2.0, None]  # Fourth is past the timeout
+    assert source.reserve_slot(now=103.5) == 0.0
+    assert WikipediaSource().reserve_slot(now=100.0) == 0.0
+
+
+def test_rate_limit_queues_then_skips():
+    async def scenario():
+        async with StandIn() as api:
+            service = api.service(timeout=1.5)
+            service.sources = [s for s in service.sources if s.name == "musicbrainz"]
+            started = time.monotonic()
+            results = await asyncio.gather(*(service.lookup("Slint", f"Song {i}") for i in range(3)))
+            elapsed = time.monotonic() - started
+            await service.close()
+            return api, results, elapsed, service
+
+    api, results, elapsed, service = asyncio.run(scenario())
+    assert [r["sources"] for r in results] == [["musicbrainz"], ["musicbrainz"], []]
+    assert api.hits == ["musicbrainz", "musicbrainz"] and service.rate_limited == 1
+    assert 0.9 < elapsed < 1.5
@@ -0,0 +1,56 @@
+import json
+
+from hangfm_bot.play_history import PlayHistory, TopN
+
+
+def test_segments_roll_over_and_reload():
+    history = PlayHistory(segment_size=2)
+    for i in range(5):
+        history.record_play("Slowdive", f"Song {i % 2}", "amy", ts=1_700_000_000 + i)
+    assert [p.name for p in history._segments()] == ["segment-000001.jsonl", "segment-000002.jsonl", "segment-000003.jsonl"]
+
+    reloaded = PlayHistory(segment_size=2)
+    assert reloaded.summary() == history.summary()
+    reloaded.record_play("Ride", "Vapour Trail", "bob")
+    assert len(reloaded._segments()) == 3  # Last segment had room for one more
+    assert reloaded.plays_for_song("Slowdive", "Song 0") == 3
+
+
+def test_keys_ignore_case_and_spacing():
+    history = PlayHistory()
+    history.record_play("Slowdive", "Alison", "Amy")
+    history.record_play("slowdive ", "alison", "amy")
+    history.record_play("SLOWDIVE", "Alison  ", " AMY")
+    stats = history.summary()
+    assert stats["unique_songs"] == 1 and stats["unique_djs"] == 1 and stats["unique_artists"] == 1
+    assert stats["top_songs"] == [("Slowdive - Alison", 3)]
+    assert stats["top_djs"] == [("Amy", 3)]
+    assert history.plays_for_artist("sLowDive") == 3
+
+
+def test_malformed_lines_are_skipped_whole():
+    history = PlayHistory()
+    history.record_play("Slowdive", "Alison", "amy", ts=1_700_000_000)
+    history.record_play("Lush", "Sweetness and Light", "bob", ts=1_700_000_100)
+    with history._segment_path(1).open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"artist": "Ride", "track": "Taste"}) + "\n")  # No ts
+        f.write(json.dumps({"ts": 1_700_000_000, "track": "Taste"}) + "\n")  # No artist
+        f.write("[1, 2]\n")
+        f.write('{"ts": 1700000000, "artist": "Ri')  # Torn write
+
+    reloaded = PlayHistory()
+    assert reloaded.total_plays == 2
+    assert reloaded.plays_for_artist("Ride") == 0 and reloaded.plays_for_dj("bob") == 1
+
+
+def test_top_n_tracks_the_leaders():
+    history = PlayHistory(top_size=2)
+    for artist, plays in (("Ride", 1), ("Lush", 3), ("Slowdive", 2), ("Ride", 3)):
+        for _ in range(plays):
+            history.record_play(artist, "Song", "amy")
+    assert history.summary(top=2)["top_artists"] == [("Ride", 4), ("Lush", 3)]
+    assert history.top_artists.items == history.artist_plays.most_common(2)
+
+    top = TopN(history.artist_plays, 2)
+    top.rebuild()
+    assert top.items == history.top_artists.items
@@ -0,0 +1,132 @@
+import asyncio
+
+import aiohttp
+from aiohttp import web
+
+from hangfm_bot.connection.relay_actions import RelayActionClient
+
+
+class FakeRelay:
+    """
+    Local relay: /actions acks "pair" actions out of order, drops the socket on the
+    first try of any action whose payload says so, and never answers "silent" ones
+    the first time. With actions=False it only has POST /send, like an old relay.
+    """
+
+    def __init__(self, actions: bool = True):
+        self.actions = actions
+        self.received = []  # (event, id) per action that reached the relay
+        self.sent = []  # POST /send bodies
+        self.runner = None
+        self.url = ""
+
+    async def socket(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        held = []
+        async for msg in ws:
+            action = msg.json()
+            event, payload = action["event"], action["payload"]
+            tries = sum(1 for e, _ in self.received if e == event)
+            self.received.append((event, action["id"]))
+            if payload.get("drop") and not tries:
+                await ws.close()
+                break
+            if payload.get("silent") and not tries:
+                continue
+            if payload.get("pair"):
+                held.append(action)
+                if len(held) < 2:
+                    continue
+                for a in reversed(held):
+                    await ws.send_json({"id": a["id"], "ok": True, "ack": a["payload"]["pair"]})
+                held.clear()
+                continue
+            await ws.send_json({"id": action["id"], "ok": True, "ack": event})
+        return ws
+
+    async def send(self, request):
+        body = await request.json()
+        self.sent.append(body)
+        return web.json_response({"ok": True, "ack": body["event"]})
+
+    async def __aenter__(self):
+        app = web.Application()
+        if self.actions:
+            app.router.add_get("/actions", self.socket)
+        app.router.add_post("/send", self.send)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+def run(relay, scenario):
+    async def main():
+        async with relay, aiohttp.ClientSession() as session:
+            client = RelayActionClient(relay.url, session, secret="s")
+            try:
+                return await scenario(client)
+            finally:
+                await client.close()
+
+    return asyncio.run(main())
+
+
+def test_acks_are_matched_by_id_out_of_order():
+    relay = FakeRelay()
+
+    async def scenario(client):
+        return await asyncio.gather(
+            client.action("voteOnSong", {"pair": "first"}, timeout=2),
+            client.action("voteOnSong", {"pair": "second"}, timeout=2),
+        )
+
+    first, second = run(relay, scenario)
+    assert (first["ack"], second["ack"]) == ("first", "second")
+    assert relay.sent == []
+
+
+def test_dropped_socket_retries_idempotent_actions_only():
+    relay = FakeRelay()
+
+    async def scenario(client):
+        hop = await client.action("addDj", {"drop": True}, timeout=2, retries=2)
+        assert client.in_flight == 0
+        emote = await client.action("playOneTimeAnimation", {"drop": True}, timeout=2, retries=None)
+        return hop, emote
+
+    hop, emote = run(relay, scenario)
+    assert hop["ok"] and [e for e, _ in relay.received].count("addDj") == 2
+    assert not emote["ok"] and "closed" in emote["error"]
+    assert [e for e, _ in relay.received].count("playOneTimeAnimation") == 1
+
+
+def test_unanswered_action_times_out_then_retries():
+    relay = FakeRelay()
+
+    async def scenario(client):
+        return await client.action("removeDj", {"silent": True}, timeout=0.1, retries=1)
+
+    result = run(relay, scenario)
+    assert result["ok"]
+    ids = [i for e, i in relay.received if e == "removeDj"]
+    assert len(ids) == 2 and ids[0] != ids[1]
+
+
+def test_relay_without_actions_falls_back_to_send():
+    relay = FakeRelay(actions=False)
+
+    async def scenario(client):
+        result = await client.action("addDj", {}, timeout=1)
+        return client, result
+
+    client, result = run(relay, scenario)
+    assert result == {"ok": True, "ack": "addDj"}
+    assert client._http_only
+    assert relay.sent == [{"event": "addDj", "payload": {}, "expectAck": True}]
@@ -0,0 +1,24 @@
+import asyncio
+
+from hangfm_bot.connection.relay_monitor import RelayMonitor
+from hangfm_bot.metrics import RELAY_CONNECTED, ROOM_STATE_AGE
+from hangfm_bot.scheduler import Scheduler
+
+
+async def no_state() -> bool:
+    return False
+
+
+def test_rooms_sharing_a_prefix_keep_their_own_job_and_series():
+    first = RelayMonitor("abcdefgh-1111", "http://relay-1", None, no_state)
+    second = RelayMonitor("abcdefgh-2222", "http://relay-2", None, no_state)
+    scheduler = Scheduler()
+    first.start(scheduler)
+    second.start(scheduler)
+    assert set(scheduler.jobs) == {"relay_health:abcdefgh-1111", "relay_health:abcdefgh-2222"}
+
+    asyncio.run(first.stop(scheduler))
+    assert set(scheduler.jobs) == {"relay_health:abcdefgh-2222"}
+    assert [key for key, _ in RELAY_CONNECTED.children()] == [("abcdefgh-2222",)]
+    assert [key for key, _ in ROOM_STATE_AGE.children()] == [("abcdefgh-2222",)]
+    asyncio.run(second.stop(scheduler))
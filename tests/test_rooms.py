@@ -0,0 +1,31 @@
+import asyncio
+import json
+from pathlib import Path
+
+from hangfm_bot.rooms import RoomMusic, room_state_dir
+
+
+def test_room_state_dir_is_path_safe():
+    assert room_state_dir("deepcut:ABC/1", "rooms") == Path("rooms") / "deepcut_ABC_1"
+
+
+def test_each_room_keeps_its_own_music_state():
+    first = RoomMusic.open(room_state_dir("room-a", "rooms"))
+    second = RoomMusic.open(room_state_dir("room-b", "rooms"))
+    first.recently_played.add("Slowdive", "Alison")
+    first.taste_profiles.record_play("amy", "Slowdive", ["Shoegaze"])
+    asyncio.run(first.close())
+    asyncio.run(second.close())
+
+    assert RoomMusic.open(room_state_dir("room-a", "rooms")).taste_profiles.top_features("amy") == ["slowdive"]
+    reopened = RoomMusic.open(room_state_dir("room-b", "rooms"))
+    assert not reopened.taste_profiles.rows
+    assert not reopened.recently_played.was_played("Slowdive", "Alison")
+
+
+def test_primary_room_adopts_single_room_files():
+    Path("taste_profiles.json").write_text(json.dumps({"users": {"amy": {"artist:ride": 1.0}}}))
+    music = RoomMusic.open(room_state_dir("room-a", "rooms"), adopt_legacy=True)
+    assert not Path("taste_profiles.json").exists()
+    assert music.taste_profiles.top_features("amy") == ["ride"]
+    assert not RoomMusic.open(room_state_dir("room-b", "rooms")).taste_profiles.rows
@@ -0,0 +1,182 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import aiohttp
+
+from hangfm_bot.shared_store import SharedStore
+from hangfm_bot.sharding import HashRing, Supervisor, worker_state_path
+from hangfm_bot.user_memory import UserMemory
+
+
+def test_worker_state_paths_are_per_worker():
+    assert worker_state_path("recently_played.json") == Path("recently_played.json")
+    first = worker_state_path("recently_played.json", "w0")
+    second = worker_state_path("recently_played.json", "w1")
+    assert first == Path("workers/w0/recently_played.json") and first.parent.is_dir()
+    assert first != second
+    assert worker_state_path("data/play_history", "w0") == Path("data/workers/w0/play_history")
+
+
+def test_hash_ring_only_moves_the_removed_workers_rooms():
+    ring = HashRing(["w0", "w1", "w2"])
+    rooms = [f"room-{i}" for i in range(200)]
+    before = {room: ring.node_for(room) for room in rooms}
+    ring.remove("w1")
+    after = {room: ring.node_for(room) for room in rooms}
+    assert all(after[room] == owner for room, owner in before.items() if owner != "w1")
+    assert "w1" not in after.values()
+
+
+FAKE_WORKER = """
+import asyncio, os, sys
+from aiohttp import web
+sys.path.insert(0, os.environ["REPO_ROOT"])
+from hangfm_bot.shared_store import SharedStore
+
+async def main():
+    worker_id = os.environ["SHARD_WORKER_ID"]
+    store = SharedStore(os.environ["SHARED_STORE"])
+
+    async def event(request):
+        data = await request.json()
+        return web.json_response({"ok": True, "worker": worker_id, "room": data["room"]})
+
+    app = web.Application()
+    app.router.add_post("/events", event)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", int(os.environ["RELAY_RECEIVER_PORT"])).start()
+    while True:
+        store.set("workers", worker_id, {"pid": os.getpid()})
+        await asyncio.sleep(0.05)
+
+asyncio.run(main())
+"""
+
+
+def free_port() -> int:
+    import socket
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def check_until(supervisor, predicate, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "supervisor never got there"
+        await supervisor._check()
+        await asyncio.sleep(0.05)
+
+
+def test_supervisor_routes_rehomes_and_restarts_fake_workers(tmp_path):
+    script = tmp_path / "fake_worker.py"
+    script.write_text(FAKE_WORKER)
+    rooms = [(f"room-{i}", "http://relay") for i in range(8)]
+
+    async def scenario():
+        store = SharedStore(str(tmp_path / "shared.db"))
+        supervisor = Supervisor(
+            rooms, 2, store, free_port(), worker_port_base=free_port(), heartbeat_timeout=1.0,
+            worker_cmd=[sys.executable, str(script)], worker_env={"REPO_ROOT": str(Path(__file__).resolve().parent.parent)},
+        )
+        await supervisor.start()
+        try:
+            await check_until(supervisor, lambda: all(w.live for w in supervisor.workers.values()))
+            assert set(supervisor.owner) == {room for room, _ in rooms}
+            assignments = store.items("assignments")
+            assert sorted(room for rooms_ in assignments.values() for room, _ in rooms_) == sorted(supervisor.owner)
+
+            async with aiohttp.ClientSession() as session:
+                async def route(room):
+                    async with session.post(f"http://127.0.0.1:{supervisor.port}/events", json={"room": room}) as resp:
+                        return resp.status, await resp.json()
+
+                for room, owner in supervisor.owner.items():
+                    assert await route(room) == (200, {"ok": True, "worker": owner, "room": room})
+
+                # Crash w0: its rooms move to w1 and are served there, then w0 is restarted with backoff
+                victim = supervisor.workers["w0"]
+                moved = [room for room, owner in supervisor.owner.items() if owner == "w0"]
+                victim.proc.kill()
+                await victim.proc.wait()
+                await check_until(supervisor, lambda: not victim.live)
+                assert victim.crashes == 1 and victim.restart_at is not None
+                assert set(supervisor.owner.values()) == {"w1"}
+                assert store.get("assignments", "w0") == []
+                for room in moved:
+                    assert (await route(room))[1]["worker"] == "w1"
+
+                await check_until(supervisor, lambda: victim.live)  # Respawned after ~1s, heartbeated, rooms back
+                assert sorted(room for room, owner in supervisor.owner.items() if owner == "w0") == sorted(moved)
+                assert (await route(moved[0]))[1]["worker"] == "w0"
+        finally:
+            await supervisor.stop()
+            store.close()
+
+    asyncio.run(scenario())
+
+
+def test_supervisor_backoff_doubles_and_drops_silent_workers(tmp_path, monkeypatch):
+    store = SharedStore(str(tmp_path / "shared.db"))
+    supervisor = Supervisor([("room-a", "http://relay"), ("room-b", "http://relay")], 1, store, 0, heartbeat_timeout=1.0, max_backoff=4.0)
+    worker = supervisor.workers["w0"]
+    worker.proc = SimpleNamespace(returncode=None, kill=lambda: None)
+    killed = []
+
+    async def kill(w):
+        killed.append(w.worker_id)
+
+    async def spawn(w):
+        store.delete("workers", w.worker_id)
+        w.restart_at = None
+        w.spawned_at = time.monotonic()
+
+    monkeypatch.setattr(supervisor, "_kill", kill)
+    monkeypatch.setattr(supervisor, "_spawn", spawn)
+
+    async def scenario():
+        store.set("workers", "w0", {"pid": 1})
+        await supervisor._check()
+        assert worker.live and set(supervisor.owner.values()) == {"w0"}
+
+        with store._lock:  # Heartbeat went stale
+            store._db.execute("UPDATE kv SET ts = ts - 5 WHERE ns = 'workers'")
+        await supervisor._check()
+        assert killed == ["w0"] and not worker.live and supervisor.owner == {}
+
+        backoffs = []
+        for _ in range(4):
+            backoffs.append(round(worker.restart_at - time.monotonic()))
+            worker.restart_at = 0  # Due now
+            await supervisor._check()  # Respawn
+            worker.spawned_at -= 10  # ... and it never heartbeats
+            await supervisor._check()
+        backoffs.append(round(worker.restart_at - time.monotonic()))
+        return backoffs
+
+    assert asyncio.run(scenario()) == [1, 2, 4, 4, 4]
+    store.close()
+
+
+def test_user_memory_merges_concurrent_workers(tmp_path):
+    path = str(tmp_path / "shared.db")
+    first, second = UserMemory(store=SharedStore(path)), UserMemory(store=SharedStore(path))
+
+    async def scenario():
+        for memory, text in ((first, "hi from room a"), (second, "hi from room b")):
+            await memory.refresh("u1")
+            memory.update_sentiment("u1", text)
+            memory.add_to_context("u1", "user", text)
+        await first.flush()
+        await second.flush()
+        await first.refresh("u1")
+
+    asyncio.run(scenario())
+    row = first.users["u1"]
+    assert row["interactions"] == 2
+    assert [m["content"] for m in row["context"]] == ["hi from room a", "hi from room b"]
@@ -0,0 +1,162 @@
+import asyncio
+
+from hangfm_bot.stage import StageManager
+
+
+class FakePlatform:
+    room_id = "room-1234"
+    user_id = "bot"
+    connected = True
+
+    def __init__(self, hop_ok: bool = True):
+        self.hop_ok = hop_ok
+        self.calls = []
+        self.said = []
+
+    async def hop_up(self):
+        self.calls.append(("hop_up",))
+        return self.hop_ok
+
+    async def hop_down(self, user_id=None):
+        self.calls.append(("hop_down", user_id))
+        return self.hop_ok
+
+    async def vote(self, like=True):
+        self.calls.append(("vote", like))
+        return True
+
+    async def send_message(self, text):
+        self.said.append(text)
+        return True
+
+
+def make(clock, **kwargs):
+    platform = FakePlatform()
+    options = {"afk_timeout": 100.0, "afk_warning": 10.0}
+    options.update(kwargs)
+    return platform, StageManager(platform, clock=clock, **options)
+
+
+def run_due(stage):
+    asyncio.run(stage.run_due())
+
+
+def test_warns_at_afk_timeout(clock):
+    platform, stage = make(clock)
+    stage.dj_added("a", "Amy")
+    clock.advance(99)
+    run_due(stage)
+    assert platform.said == []
+    clock.advance(1)
+    run_due(stage)
+    assert len(platform.said) == 1 and "AFK Warning" in platform.said[0] and "@Amy" in platform.said[0]
+    assert stage.status()["afk_warned"] == 1
+    assert stage.next_due == clock.now + 10
+
+
+def test_removes_afk_warning_after_the_warning(clock):
+    platform, stage = make(clock)
+    stage.dj_added("a", "Amy")
+    clock.advance(100)
+    run_due(stage)
+    clock.advance(9)
+    run_due(stage)
+    assert platform.calls == []
+    clock.advance(1)
+    run_due(stage)
+    assert platform.calls == [("hop_down", "a")]
+    assert "a" not in stage.djs
+    assert "AFK Removal" in platform.said[-1]
+
+
+def test_activity_pushes_the_deadline_back(clock):
+    platform, stage = make(clock)
+    stage.dj_added("a", "Amy")
+    clock.advance(60)
+    stage.touch("a")
+    clock.advance(40)
+    run_due(stage)
+    assert platform.said == []
+    assert stage.next_due == clock.now + 60  # last activity + afk_timeout
+    clock.advance(60)
+    run_due(stage)
+    assert len(platform.said) == 1
+
+
+def test_activity_after_warning_cancels_removal(clock):
+    platform, stage = make(clock)
+    stage.dj_added("a", "Amy")
+    clock.advance(100)
+    run_due(stage)
+    clock.advance(5)
+    stage.handle_event("votedOnSong", {"uuid": "a", "like": True})
+    clock.advance(5)
+    run_due(stage)
+    assert platform.calls == []
+    assert stage.status()["afk_warned"] == 0
+    assert "a" in stage.djs
+
+
+def test_stale_stint_is_ignored_after_rehop(clock):
+    platform, stage = make(clock)
+    stage.dj_added("a", "Amy")
+    clock.advance(50)
+    stage.dj_removed("a")
+    stage.dj_added("a", "Amy")  # Back on stage at t+50: their clock starts over
+    clock.advance(50)
+    run_due(stage)  # The first stint's entry comes due here and must do nothing
+    assert platform.said == []
+    clock.advance(50)
+    run_due(stage)
+    assert len(platform.said) == 1
+
+
+def test_bot_is_never_afk(clock):
+    platform, stage = make(clock)
+    stage.dj_added("bot")
+    clock.advance(1000)
+    run_due(stage)
+    assert platform.said == [] and platform.calls == []
+
+
+def test_afk_off_schedules_nothing(clock):
+    platform, stage = make(clock, afk_timeout=0)
+    stage.dj_added("a", "Amy")
+    clock.advance(10_000)
+    run_due(stage)
+    assert platform.said == []
+
+
+def test_hop_cooldown(clock):
+    platform, stage = make(clock, afk_timeout=0, auto_stage=True, hop_up_max_djs=3, hop_down_humans=3, hop_cooldown=120)
+    stage.sync_djs([{"uuid": "a"}, {"uuid": "b"}])
+    run_due(stage)
+    assert platform.calls == [("hop_up",)] and stage.bot_on_stage
+
+    stage.dj_added("c")
+    run_due(stage)
+    assert platform.calls[-1] == ("hop_up",)  # Three humans, but the bot hasn't played yet
+
+    stage.song_played("bot")
+    run_due(stage)
+    assert platform.calls[-1] == ("hop_down", None) and not stage.bot_on_stage
+
+    stage.dj_removed("c")  # Room for the bot again, but inside the cooldown
+    run_due(stage)
+    assert platform.calls[-1] == ("hop_down", None)
+    assert stage.next_due == clock.now + 120
+
+    clock.advance(119)
+    run_due(stage)
+    assert platform.calls[-1] == ("hop_down", None)
+    clock.advance(1)
+    run_due(stage)
+    assert platform.calls[-1] == ("hop_up",)
+
+
+def test_glued_bot_stays_off_stage(clock):
+    platform, stage = make(clock, afk_timeout=0, auto_stage=True)
+    stage.glued = True
+    stage.dj_added("a")
+    run_due(stage)
+    assert platform.calls == []
@@ -0,0 +1,77 @@
+from collections import deque
+
+from hangfm_bot.music.discovery import DiscoveryEngine
+from hangfm_bot.music.recently_played import RecentlyPlayed
+from hangfm_bot.music.taste_profiles import TasteProfiles
+
+
+def song(artist, genre, key=None):
+    return {"artist": artist, "track": "Song", "genre": genre, "genres": [], "key": key or artist.lower()}
+
+
+def test_rows_only_hold_what_each_user_played():
+    taste = TasteProfiles()
+    taste.record_play("amy", "Slowdive", ["Shoegaze", "Dream Pop"])
+    taste.record_play("bob", "MF DOOM", ["Abstract Hip Hop"])
+    assert set(taste.rows["amy"]) == {"artist:slowdive", "genre:shoegaze", "genre:dream pop"}
+    assert set(taste.rows["bob"]) == {"artist:mf doom", "genre:abstract hip hop"}
+    assert set(taste.top_features("amy", "genre")) == {"shoegaze", "dream pop"}
+
+
+def test_older_plays_fade():
+    taste = TasteProfiles(decay=0.1)
+    for _ in range(3):
+        taste.record_play("amy", "Slowdive")
+    taste.record_play("amy", "Ride")
+    assert taste.top_features("amy") == ["ride", "slowdive"]
+
+
+def test_rank_prefers_the_lineup_taste():
+    taste = TasteProfiles()
+    for _ in range(3):
+        taste.record_play("amy", "Slowdive", ["Shoegaze"])
+    candidates = [song("MF DOOM", "Abstract Hip Hop"), song("Ride", "Shoegaze"), song("Slowdive", "Shoegaze")]
+    ranked = taste.rank(candidates, ["amy", "stranger"], top_k=2)
+    assert [c["artist"] for c, _ in ranked] == ["Slowdive", "Ride"]
+    assert taste.rank(candidates, ["stranger"], top_k=1)[0][1] == 0.0
+
+
+def test_save_and_reload(tmp_path):
+    path = tmp_path / "taste.json"
+    taste = TasteProfiles(data_file=path, decay=0.9)
+    taste.record_play("amy", "Slowdive", ["Shoegaze"])
+    taste.record_play("amy", "Ride", ["Shoegaze"])
+    taste.save()
+    assert not taste.dirty
+
+    reloaded = TasteProfiles(data_file=path, decay=0.9)
+    candidates = [song("Ride", "Shoegaze"), song("Slowdive", "Shoegaze")]
+    assert reloaded.rank(candidates, ["amy"]) == taste.rank(candidates, ["amy"])
+    assert reloaded.top_features("amy") == ["ride", "slowdive"]
+
+
+class CountingTaste(TasteProfiles):
+    builds = 0
+
+    def candidate_matrix(self, candidates):
+        self.builds += 1
+        return super().candidate_matrix(candidates)
+
+
+def test_lineup_picks_reuse_the_candidate_matrix_until_a_refill():
+    taste = CountingTaste()
+    taste.record_play("amy", "Slowdive", ["Shoegaze"])
+    engine = DiscoveryEngine(None, None, None, RecentlyPlayed(), pool_size=5, low_water=0)
+    pool = [song("Slowdive", "Alternative Rock"), song("Ride", "Alternative Rock"), song("Low", "Alternative Rock")]
+    engine.pools["Alternative Rock"] = deque(pool)
+    engine._pooled = {c["key"] for c in pool}
+
+    assert engine.pick_for_lineup(taste, ["amy"])["artist"] == "Slowdive"
+    assert engine.pick_for_lineup(taste, ["amy"])["artist"] in ("Ride", "Low")
+    assert engine.pick_for_lineup(taste, ["amy"], "Alternative Hip Hop") is None
+    assert taste.builds == 1
+    assert len(engine.pools["Alternative Rock"]) == 1
+
+    engine._ranking = None  # What refill() does once the pools are topped up
+    engine.pick_for_lineup(taste, ["amy"])
+    assert taste.builds == 2